@@ -1,5 +1,6 @@
 #include <chrono>
 #include <ctime>
+#include <map>
 
 #include "base/PlannerSettings.h"
 #include "base/environments/GridMaze.h"
@@ -126,25 +127,145 @@ void config_steering_and_run(std::size_t run_id, std::size_t start_id,
   }
 }
 
-int main(int argc, char **argv) {
-  std::string template_filename = "benchmark_template.json";
-  std::ofstream o(template_filename);
-  o << std::setw(2) << nlohmann::json(global::settings);
-  o.close();
-  std::cout << "Saved " << template_filename << "." << std::endl;
+/**
+ * Environments loaded from files (images, YAML maps, SVG polygon mazes) by
+ * the jobs of a persistent worker, keyed by the settings that select and
+ * convert their source file.
+ */
+struct CachedEnvironment {
+  std::shared_ptr<Environment> environment;
+  // whether creating the environment changed the start and goal of the
+  // settings, otherwise every job uses the start and goal of its own settings
+  bool defines_start_goal;
+  // start and goal after the environment was created (changed by queries)
+  Point start, goal;
+  double start_theta, goal_theta;
+  // value of environment_uses when the environment was last used
+  std::size_t last_used;
+};
+static bool cache_environments = false;
+static std::map<std::string, CachedEnvironment> environment_cache;
+static std::size_t environment_uses = 0;
+static const std::size_t max_cached_environments = 8;
 
-  if (argc <= 1) {
-    std::cout << "Usage: " << argv[0] << " configuration.json" << std::endl;
-    return EXIT_FAILURE;
+/**
+ * Key of the file-based environment selected by the environment settings.
+ * Settings that change between runs and queries (seed, start, goal) are not
+ * part of the key, the start and goal are set per job (see
+ * createEnvironment).
+ */
+std::string environmentCacheKey() {
+  const auto &env = global::settings.env;
+  nlohmann::json key = {{"type", env.type.value()}};
+  if (env.type.value() == "polygon") {
+    key["source"] = env.polygon.source.value();
+    key["scaling"] = env.polygon.scaling.value();
+  } else {
+    key["source"] = env.grid.image.source.value();
+    if (env.type.value() == "grid") {
+      key["occupancy_threshold"] = env.grid.image.occupancy_threshold.value();
+      key["desired_width"] = env.grid.image.desired_width.value();
+      key["desired_height"] = env.grid.image.desired_height.value();
+    }
   }
+  return key.dump();
+}
 
+void createEnvironment() {
+  auto &env = global::settings.env;
+  const bool from_file =
+      env.type.value() != "grid" || env.grid.generator.value() == "image";
+  if (!cache_environments || !from_file) {
+    env.createEnvironment();
+    return;
+  }
+  const std::string key = environmentCacheKey();
+  const auto it = environment_cache.find(key);
+  if (it == environment_cache.end()) {
+    const double start[] = {env.start.x, env.start.y, env.start.theta};
+    const double goal[] = {env.goal.x, env.goal.y, env.goal.theta};
+    env.createEnvironment();
+    if (environment_cache.size() >= max_cached_environments) {
+      // evict the least recently used environment
+      auto lru = environment_cache.begin();
+      for (auto entry = environment_cache.begin();
+           entry != environment_cache.end(); ++entry) {
+        if (entry->second.last_used < lru->second.last_used) lru = entry;
+      }
+      environment_cache.erase(lru);
+    }
+    const auto &environment = global::settings.environment;
+    const bool defines_start_goal =
+        environment->start().x != start[0] ||
+        environment->start().y != start[1] ||
+        environment->startTheta() != start[2] ||
+        environment->goal().x != goal[0] || environment->goal().y != goal[1] ||
+        environment->goalTheta() != goal[2];
+    environment_cache[key] = {environment,
+                              defines_start_goal,
+                              environment->start(),
+                              environment->goal(),
+                              environment->startTheta(),
+                              environment->goalTheta(),
+                              ++environment_uses};
+    return;
+  }
+  OMPL_INFORM("Reusing the environment loaded by a previous job.");
+  auto &cached = it->second;
+  cached.last_used = ++environment_uses;
+  global::settings.environment = cached.environment;
+  if (cached.defines_start_goal) {
+    global::settings.environment->setStart(cached.start);
+    global::settings.environment->setGoal(cached.goal);
+    global::settings.environment->setThetas(cached.start_theta,
+                                            cached.goal_theta);
+  } else {
+    // the start and goal of this job, which may differ from those of the job
+    // that loaded the environment
+    const Point start(env.start.x, env.start.y), goal(env.goal.x, env.goal.y);
+    const double start_theta = env.start.theta, goal_theta = env.goal.theta;
+    global::settings.environment->setStart(start);
+    global::settings.environment->setGoal(goal);
+    global::settings.environment->setThetas(start_theta, goal_theta);
+  }
+  if (env.type.value() != "polygon") {
+    env.grid.width = global::settings.environment->width();
+    env.grid.height = global::settings.environment->height();
+  }
+  env.collision.initializeCollisionModel();
+}
+
+/**
+ * Sets the start and goal of the environment to those of a query
+ * {"name": ..., "start": [x, y, theta], "goal": [x, y, theta]}.
+ */
+void setQuery(const nlohmann::json &query) {
+  const auto &start = query["start"];
+  const auto &goal = query["goal"];
+  auto &environment = global::settings.environment;
+  environment->setStart(
+      Point(start[0].get<double>(), start[1].get<double>()));
+  environment->setGoal(Point(goal[0].get<double>(), goal[1].get<double>()));
+  environment->setThetas(start.size() > 2 ? start[2].get<double>() : 0.,
+                         goal.size() > 2 ? goal[2].get<double>() : 0.);
+}
+
+/**
+ * Runs the benchmark of the configuration file and saves its results.
+ */
+int runBenchmark(const std::string &config_filename) {
   auto now = chrono::system_clock::to_time_t(chrono::system_clock::now());
   std::cout << "Time stamp: " << ctime(&now) << std::endl;
 
-  std::ifstream stream(argv[1]);
+  std::ifstream stream(config_filename);
+  if (!stream) {
+    std::cerr << "Could not open configuration " << config_filename << "."
+              << std::endl;
+    return EXIT_FAILURE;
+  }
   const nlohmann::json settings = nlohmann::json::parse(stream);
   global::settings.load(settings);
-  std::cout << "Loaded the following settings from " << argv[1] << ":"
+  std::cout << "Loaded the following settings from " << config_filename << ":"
             << std::endl
             << global::settings << std::endl;
 
@@ -183,16 +304,72 @@ int main(int argc, char **argv) {
                 << global::settings.benchmark.runs.value() << std::endl;
       std::cout << "##############################################"
                 << std::endl;
-      global::settings.env.createEnvironment();
+      createEnvironment();
       global::settings.env.grid.seed += 1;
 
       // global::settings.steer.initializeSteering();
 
-      nlohmann::json info;
-      config_steering_and_run(i, 0u, info);
+      const nlohmann::json queries =
+          global::settings.benchmark.queries.value();
+      if (queries.empty()) {
+        nlohmann::json info;
+        config_steering_and_run(i, 0u, info);
+      } else {
+        // evaluate all queries on the loaded environment
+        for (const auto &query : queries) {
+          std::cout << "# Query " << query["name"].get<std::string>()
+                    << std::endl;
+          setQuery(query);
+          nlohmann::json info = {{"query", query["name"]}};
+          config_steering_and_run(i, 0u, info);
+        }
+      }
       Log::save(global::settings.benchmark.log_file);
     }
   }
 
   return EXIT_SUCCESS;
 }
+
+/**
+ * Persistent worker: reads the file names of job configurations from stdin,
+ * one per line, and runs them one after another in this process. After each
+ * job, "<job_finished> code </job_finished>" is printed. The worker exits at
+ * the end of its input.
+ */
+int runWorker() {
+  cache_environments = true;
+  std::string config_filename;
+  while (std::getline(std::cin, config_filename)) {
+    if (config_filename.empty()) continue;
+    int code;
+    try {
+      code = runBenchmark(config_filename);
+    } catch (const std::exception &e) {
+      std::cerr << "Error while running " << config_filename << ": "
+                << e.what() << std::endl;
+      code = EXIT_FAILURE;
+    }
+    std::cout << "<job_finished> " << code << " </job_finished>" << std::endl;
+  }
+  return EXIT_SUCCESS;
+}
+
+int main(int argc, char **argv) {
+  std::string template_filename = "benchmark_template.json";
+  std::ofstream o(template_filename);
+  o << std::setw(2) << nlohmann::json(global::settings);
+  o.close();
+  std::cout << "Saved " << template_filename << "." << std::endl;
+
+  if (argc <= 1) {
+    std::cout << "Usage: " << argv[0] << " configuration.json" << std::endl;
+    std::cout << "       " << argv[0]
+              << " --worker  (reads configuration file names from stdin)"
+              << std::endl;
+    return EXIT_FAILURE;
+  }
+
+  if (std::string(argv[1]) == "--worker") return runWorker();
+  return runBenchmark(argv[1]);
+}
@@ -2,11 +2,11 @@ import datetime
 import time
 import yaml
 from mpb import MPB, MultipleMPB
+from sweep import Sweep
 import matplotlib as mpl
 
 mpl.rcParams['mathtext.fontset'] = 'cm'
 mpl.rcParams['pdf.fonttype'] = 42
-from copy import deepcopy
 from argparse import ArgumentParser
 from yaml.loader import SafeLoader
 import os
@@ -61,144 +61,37 @@ if __name__ == '__main__':
     mpb["mod.weight_gmmt"] = 0.1
     mpb["mod.weight_intensity"] = 0.2
 
-    for sgs in setup['sg']:
-        print("****************************************")
-        print("********* Running: {} *********".format(sgs["name"]))
-        print("****************************************")
-
-        mpbs = dict()
-        result_file_names = []
-
-        mpb.set_start(sgs["start"][0], sgs["start"][1], sgs["start"][2])
-        mpb.set_goal(sgs["goal"][0], sgs["goal"][1], sgs["goal"][2])
-        results_folder_prefix = sgs["name"]
-
-        for cost_fn in cost_fns:
-
-            if "dijkstra1" in sampling_functions or len(sampling_functions) == 0:
-                dijkstra_mpb = deepcopy(mpb)
-                dijkstra_mpb["ompl.sampler"] = "dijkstra"
-                dijkstra_mpb["mod.dijkstra_cell_size"] = 0.5
-                dijkstra_mpb["mod.sampling_bias"] = 0.05
-                dijkstra_mpb.set_id('{}-{}'.format(cost_fn, 'dijkstra1'))
-                dijkstra_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                dijkstra_mpb["ompl.optimization_objective"] = cost_fn
-                dijkstra_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'dijkstra1')] = dijkstra_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'dijkstra1'))
-
-            if "dijkstra2" in sampling_functions or len(sampling_functions) == 0:
-                dijkstra_mpb = deepcopy(mpb)
-                dijkstra_mpb["ompl.sampler"] = "dijkstra"
-                dijkstra_mpb["mod.dijkstra_cell_size"] = 1.0
-                dijkstra_mpb["mod.sampling_bias"] = 0.1
-                dijkstra_mpb.set_id('{}-{}'.format(cost_fn, 'dijkstra2'))
-                dijkstra_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                dijkstra_mpb["ompl.optimization_objective"] = cost_fn
-                dijkstra_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'dijkstra2')] = dijkstra_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'dijkstra2'))
-
-            if "dijkstra" in sampling_functions or len(sampling_functions) == 0:
-                dijkstra_mpb = deepcopy(mpb)
-                dijkstra_mpb["ompl.sampler"] = "dijkstra"
-                dijkstra_mpb["mod.dijkstra_cell_size"] = 0.5
-                dijkstra_mpb["mod.sampling_bias"] = 0.1
-                dijkstra_mpb.set_id('{}-{}'.format(cost_fn, 'dijkstra'))
-                dijkstra_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                dijkstra_mpb["ompl.optimization_objective"] = cost_fn
-                dijkstra_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'dijkstra')] = dijkstra_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'dijkstra'))
-
-            if "dijkstra3" in sampling_functions or len(sampling_functions) == 0:
-                dijkstra_mpb = deepcopy(mpb)
-                dijkstra_mpb["ompl.sampler"] = "dijkstra"
-                dijkstra_mpb["mod.dijkstra_cell_size"] = 1.0
-                dijkstra_mpb["mod.sampling_bias"] = 0.05
-                dijkstra_mpb.set_id('{}-{}'.format(cost_fn, 'dijkstra3'))
-                dijkstra_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                dijkstra_mpb["ompl.optimization_objective"] = cost_fn
-                dijkstra_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'dijkstra3')] = dijkstra_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'dijkstra3'))
-
-            if "uniform" in sampling_functions or len(sampling_functions) == 0:
-                uniform_mpb = deepcopy(mpb)
-                uniform_mpb["ompl.sampler"] = ""
-                uniform_mpb.set_id('{}-{}'.format(cost_fn, 'uniform'))
-                uniform_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                uniform_mpb["ompl.optimization_objective"] = cost_fn
-                uniform_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'uniform')] = uniform_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'uniform'))
-
-            if "ellipse" in sampling_functions or len(sampling_functions) == 0:
-                ellipse_mpb = deepcopy(mpb)
-                ellipse_mpb["ompl.sampler"] = "ellipse"
-                ellipse_mpb.set_id('{}-{}'.format(cost_fn, 'ellipse'))
-                ellipse_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                ellipse_mpb["ompl.optimization_objective"] = cost_fn
-                ellipse_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'ellipse')] = ellipse_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'ellipse'))
-
-            if "intensity" in sampling_functions or len(sampling_functions) == 0:
-                intensity_mpb = deepcopy(mpb)
-                intensity_mpb["ompl.sampler"] = "intensity"
-                intensity_mpb.set_id('{}-{}'.format(cost_fn, 'intensity'))
-                intensity_mpb["mod.sampling_bias"] = 0.05
-                intensity_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                intensity_mpb["ompl.optimization_objective"] = cost_fn
-                intensity_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'intensity')] = intensity_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'intensity'))
-
-            if "hybrid1" in sampling_functions or len(sampling_functions) == 0:
-                hybrid_mpb = deepcopy(mpb)
-                hybrid_mpb["ompl.sampler"] = "hybrid"
-                hybrid_mpb["mod.dijkstra_cell_size"] = 0.5
-                hybrid_mpb["mod.sampling_bias"] = 0.05
-                hybrid_mpb.set_id('{}-{}'.format(cost_fn, 'hybrid1'))
-                hybrid_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                hybrid_mpb["ompl.optimization_objective"] = cost_fn
-                hybrid_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'hybrid1')] = hybrid_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'hybrid1'))
-
-            if "hybrid2" in sampling_functions or len(sampling_functions) == 0:
-                hybrid_mpb = deepcopy(mpb)
-                hybrid_mpb["ompl.sampler"] = "hybrid"
-                hybrid_mpb["mod.dijkstra_cell_size"] = 1.0
-                hybrid_mpb["mod.sampling_bias"] = 0.1
-                hybrid_mpb.set_id('{}-{}'.format(cost_fn, 'hybrid2'))
-                hybrid_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                hybrid_mpb["ompl.optimization_objective"] = cost_fn
-                hybrid_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'hybrid2')] = hybrid_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'hybrid2'))
-
-            if "hybrid" in sampling_functions or len(sampling_functions) == 0:
-                hybrid_mpb = deepcopy(mpb)
-                hybrid_mpb["ompl.sampler"] = "hybrid"
-                hybrid_mpb["mod.dijkstra_cell_size"] = 0.5
-                hybrid_mpb["mod.sampling_bias"] = 0.1
-                hybrid_mpb.set_id('{}-{}'.format(cost_fn, 'hybrid'))
-                hybrid_mpb["ompl.intensity_map_file_name"] = intensity_map_file
-                hybrid_mpb["ompl.optimization_objective"] = cost_fn
-                hybrid_mpb["mod.mod_file_name"] = cost_fn_map[cost_fn]
-                mpbs['{}-{}-{}'.format(sgs["name"], cost_fn, 'hybrid')] = hybrid_mpb
-                result_file_names.append("{}/{}-{}_results.json".format(results_folder_prefix, cost_fn, 'hybrid'))
-
-        for mpb in mpbs.values():
-            pool.benchmarks.append(mpb)
-
-        # for key in mpbs:
-        #     print("Running {}".format(key))
-        #     mpbs[key].run(id=key, runs=int(setup['repeats']), subfolder=os.getcwd() + "/" + results_folder_prefix)
-        ts = time.time()
-        name = results_folder_prefix + "-" + datetime.datetime.fromtimestamp(ts).strftime(
-            '%Y-%m-%d_%H-%M-%S') + ''.join(
-            random.SystemRandom().choice(string.ascii_lowercase + string.digits) for _ in range(10))
-        pool.run_parallel(id=name, runs=int(setup['repeats']), use_subfolder=True, processes=int(args.processes),
-                          silence=True)
+    mpb["ompl.intensity_map_file_name"] = intensity_map_file
+
+    # every job evaluates all start-goal pairs on the loaded map, the runs are tagged with the pair's name
+    mpb.set_queries(setup['sg'])
+    results_folder_prefix = os.path.splitext(os.path.basename(args.setup_yaml_file))[0]
+
+    samplers = {
+        "dijkstra1": {"ompl.sampler": "dijkstra", "mod.dijkstra_cell_size": 0.5, "mod.sampling_bias": 0.05},
+        "dijkstra2": {"ompl.sampler": "dijkstra", "mod.dijkstra_cell_size": 1.0, "mod.sampling_bias": 0.1},
+        "dijkstra": {"ompl.sampler": "dijkstra", "mod.dijkstra_cell_size": 0.5, "mod.sampling_bias": 0.1},
+        "dijkstra3": {"ompl.sampler": "dijkstra", "mod.dijkstra_cell_size": 1.0, "mod.sampling_bias": 0.05},
+        "uniform": {"ompl.sampler": ""},
+        "ellipse": {"ompl.sampler": "ellipse"},
+        "intensity": {"ompl.sampler": "intensity", "mod.sampling_bias": 0.05},
+        "hybrid1": {"ompl.sampler": "hybrid", "mod.dijkstra_cell_size": 0.5, "mod.sampling_bias": 0.05},
+        "hybrid2": {"ompl.sampler": "hybrid", "mod.dijkstra_cell_size": 1.0, "mod.sampling_bias": 0.1},
+        "hybrid": {"ompl.sampler": "hybrid", "mod.dijkstra_cell_size": 0.5, "mod.sampling_bias": 0.1},
+    }
+    if len(sampling_functions) > 0:
+        samplers = {name: overrides for name, overrides in samplers.items() if name in sampling_functions}
+
+    # the benchmarks "<cost function>-<sampler>" are created one at a time while the pool runs them
+    sweep = Sweep(mpb, id_format=lambda index, labels, overrides: "-".join(labels))
+    sweep.variants({cost_fn: {"ompl.optimization_objective": cost_fn, "mod.mod_file_name": cost_fn_map[cost_fn]}
+                    for cost_fn in cost_fns})
+    sweep.variants(samplers)
+    pool.add_sweep(sweep)
+
+    ts = time.time()
+    name = results_folder_prefix + "-" + datetime.datetime.fromtimestamp(ts).strftime(
+        '%Y-%m-%d_%H-%M-%S') + ''.join(
+        random.SystemRandom().choice(string.ascii_lowercase + string.digits) for _ in range(10))
+    pool.run_parallel(id=name, runs=int(setup['repeats']), use_subfolder=True, processes=int(args.processes),
+                      silence=True)
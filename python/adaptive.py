@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Adaptive numbers of runs.
+
+Instead of running every planner for the same fixed number of runs, the runs of every (benchmark,
+planner, steer function) are started in batches. After each batch, the 95% confidence intervals of the
+chosen metrics are computed from the runs finished so far, and no further runs are started once every
+interval is narrower than its target (or the maximum number of runs is reached). Stable planners thus
+stop after a few runs while high-variance planners get as many runs as their statistics need.
+
+The run indices (and therefore the environments and seeds) of a planner are a prefix of those of the
+fixed-size benchmark, so the planners that run longer evaluate a superset of the environments of those
+that stopped earlier.
+"""
+import math
+import os
+import sys
+
+import numpy as np
+from scipy import stats
+
+from results_io import iter_runs
+
+# two-sided 95% quantile of the standard normal distribution
+Z_95 = float(stats.norm.ppf(0.975))
+
+SUCCESS_METRIC = "path_found"
+
+
+def t_quantile(df: int) -> float:
+    """
+    Returns the two-sided 95% quantile of Student's t-distribution with df degrees of freedom.
+    """
+    if df < 1:
+        return math.inf
+    return float(stats.t.ppf(0.975, df))
+
+
+def mean_half_width(values: [float]) -> float:
+    """
+    Returns the half-width of the 95% confidence interval of the mean of the values, relative to the
+    absolute value of the mean.
+    """
+    values = [v for v in values if v is not None and not np.isnan(v)]
+    if len(values) < 2:
+        return math.inf
+    mean = abs(np.mean(values))
+    half_width = t_quantile(len(values) - 1) * np.std(values, ddof=1) / math.sqrt(len(values))
+    if mean == 0:
+        return 0. if half_width == 0 else math.inf
+    return half_width / mean
+
+
+def wilson_half_width(successes: int, n: int) -> float:
+    """
+    Returns the half-width of the 95% Wilson score interval of a success rate, which (unlike the normal
+    approximation) does not collapse to zero if all or none of the runs succeeded.
+    """
+    if n == 0:
+        return math.inf
+    p = successes / n
+    return Z_95 / (1 + Z_95 ** 2 / n) * math.sqrt(p * (1 - p) / n + Z_95 ** 2 / (4 * n ** 2))
+
+
+def metric_value(stats: dict, metric: str):
+    """
+    Returns the value of a metric of a plan the way table.latex_table aggregates it.
+    """
+    if metric == SUCCESS_METRIC:
+        return int(stats[metric])
+    if metric == "cusps":
+        return len(stats[metric])
+    return stats.get(metric)
+
+
+class StoppingRule:
+    def __init__(self, targets: {str: float} = None, min_runs: int = 10, batch_size: int = 5,
+                 max_runs: int = 50):
+        """
+        :param targets: Target half-width of the 95% confidence interval per metric (key of the plan stats).
+            For the success rate ("path_found") the half-width is absolute, for all other metrics it is
+            relative to their mean. By default, the success rate to within 0.15 and the path length and
+            planning time to within 10% of their means.
+        :param min_runs: Number of runs of the first batch.
+        :param batch_size: Number of runs of every further batch.
+        :param max_runs: Maximum number of runs.
+        """
+        if targets is None:
+            targets = {SUCCESS_METRIC: 0.15, "path_length": 0.1, "planning_time": 0.1}
+        self.targets = targets  # type: {str: float}
+        self.min_runs = max(1, min(min_runs, max_runs))  # type: int
+        self.batch_size = max(1, batch_size)  # type: int
+        self.max_runs = max_runs  # type: int
+
+    def half_widths(self, values: {str: list}) -> {str: float}:
+        """
+        Returns the half-width of the confidence interval of every metric, given the metric values of the
+        finished runs.
+        """
+        widths = {}
+        found = values.get(SUCCESS_METRIC, [])
+        for metric in self.targets.keys():
+            if metric == SUCCESS_METRIC:
+                widths[metric] = wilson_half_width(sum(found), len(found))
+            elif found and sum(found) < 2:
+                # (almost) no paths were found, there is no mean to estimate
+                widths[metric] = 0.
+            else:
+                widths[metric] = mean_half_width(values.get(metric, []))
+        return widths
+
+    def converged(self, values: {str: list}) -> bool:
+        widths = self.half_widths(values)
+        return all(widths[metric] <= target for metric, target in self.targets.items())
+
+
+class AdaptiveRuns:
+    def __init__(self, rule: StoppingRule, jobs: list):
+        """
+        Decides which jobs (see scheduler.PlannerJob) of the run-granularity scheduler are started: the jobs of
+        every (benchmark, planner, steer function) group are released in batches of increasing run index
+        until the stopping rule is met. The jobs that are never released are dropped.
+        """
+        self.rule = rule  # type: StoppingRule
+        self.groups = {}  # type: {tuple: dict}
+        for job in sorted(jobs, key=lambda j: j.run):
+            key = self.key(job)
+            if key not in self.groups:
+                self.groups[key] = {"jobs": [], "released": 0, "finished": 0, "values": {}, "stopped": None}
+            self.groups[key]["jobs"].append(job)
+
+    @staticmethod
+    def key(job) -> tuple:
+        return job.mpb.id, job.planner, job.steer_function
+
+    def _release(self, group: dict, n: int) -> list:
+        jobs = group["jobs"][group["released"]:group["released"] + n]
+        group["released"] += len(jobs)
+        return jobs
+
+    def initial(self) -> list:
+        """
+        Returns the jobs of the first batch of every group.
+        """
+        jobs = []
+        for group in self.groups.values():
+            jobs += self._release(group, self.rule.min_runs)
+        return jobs
+
+    def _record(self, group: dict, job):
+        values = group["values"]
+        if job.code == -9:
+            # killed after its timeout, recorded as a failed plan
+            values.setdefault(SUCCESS_METRIC, []).append(0)
+            return
+        if job.code != 0 or not os.path.exists(job.results_filename):
+            return
+        for _, run in iter_runs(job.results_filename, skip_trajectories=True, skip_intermediary=True):
+            for plan in (run.get("plans") or {}).values():
+                stats = plan.get("stats") or {}
+                for metric in set(self.rule.targets.keys()) | {SUCCESS_METRIC}:
+                    if metric in stats:
+                        values.setdefault(metric, []).append(metric_value(stats, metric))
+
+    def finished(self, job) -> (list, list):
+        """
+        Records the metrics of a finished job. Once all released jobs of its group have finished, either
+        the next batch is released or the remaining jobs are dropped.
+        :return: Tuple of the released and the dropped jobs.
+        """
+        group = self.groups[self.key(job)]
+        group["finished"] += 1
+        self._record(group, job)
+        if group["finished"] < group["released"]:
+            return [], []
+        if group["released"] < len(group["jobs"]) and not self.rule.converged(group["values"]):
+            return self._release(group, self.rule.batch_size), []
+        dropped = group["jobs"][group["released"]:]
+        group["jobs"] = group["jobs"][:group["released"]]
+        group["stopped"] = self.rule.half_widths(group["values"])
+        return [], dropped
+
+    def stopped(self, job) -> dict:
+        """
+        Returns the description of the runs of a group after its remaining runs were dropped.
+        """
+        group = self.groups[self.key(job)]
+        return {"runs": group["released"], "half_widths": group["stopped"]}
+
+    def print_summary(self, file=sys.stdout):
+        for (id, planner, steer_function), group in self.groups.items():
+            widths = group["stopped"]
+            if widths is None:
+                continue
+            print("%s: planner %s (steer function %s) stopped after %i runs (CI half-widths: %s)." % (
+                id, planner, steer_function, group["released"],
+                ", ".join("%s %.3f" % (metric, width) for metric, width in widths.items())), file=file)
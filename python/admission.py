@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Memory-aware admission control for parallel benchmark runs.
+
+Instead of limiting the address space of every binary, the resident memory of all running binaries
+is watched. A new binary is only started when the memory in use plus its expected peak memory fits
+into the budget, and if the running binaries exceed the budget nonetheless (e.g. a planner leaking
+memory), the largest one is stopped and retried later on.
+"""
+import asyncio
+import os
+from typing import Optional
+
+# cgroup v2 and v1 files holding the memory limit of the container
+CGROUP_LIMIT_FILES = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+CGROUP_USAGE_FILES = ('/sys/fs/cgroup/memory.current', '/sys/fs/cgroup/memory/memory.usage_in_bytes')
+
+
+def _read_bytes(filenames) -> Optional[int]:
+    for filename in filenames:
+        try:
+            with open(filename, 'r') as f:
+                value = f.read().strip()
+        except (OSError, IOError):
+            continue
+        if value == 'max':
+            return None
+        try:
+            value = int(value)
+        except ValueError:
+            continue
+        # cgroup v1 reports a huge number if no limit is set
+        if value >= 1 << 60:
+            return None
+        return value
+    return None
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    """
+    Returns the memory limit in bytes of the cgroup this process runs in, or None if it is unlimited.
+    """
+    return _read_bytes(CGROUP_LIMIT_FILES)
+
+
+def cgroup_memory_usage() -> Optional[int]:
+    """
+    Returns the memory in bytes used by the cgroup this process runs in, or None if it is unknown.
+    """
+    return _read_bytes(CGROUP_USAGE_FILES)
+
+
+def memory_budget(available: float, fraction: float = 0.9) -> float:
+    """
+    Computes the memory budget in bytes for all benchmark binaries from the available system memory,
+    honoring the memory limit of the container (cgroup) if there is one.
+    :param available: Available system memory in bytes.
+    :param fraction: Fraction of the available memory to use.
+    """
+    budget = available
+    limit = cgroup_memory_limit()
+    if limit is not None:
+        usage = cgroup_memory_usage() or 0
+        budget = min(budget, max(0, limit - usage))
+    return budget * fraction
+
+
+class MemoryAdmission:
+    def __init__(self, budget: float, max_retries: int = 2, grace_period: float = 5.,
+                 check_interval: float = 0.5):
+        """
+        :param budget: Memory in bytes available to all running binaries.
+        :param max_retries: How often a job that was stopped for exceeding the budget is retried.
+        :param grace_period: Seconds between asking a binary to terminate and killing it.
+        :param check_interval: Seconds between checks whether a waiting job can be admitted.
+        """
+        self.budget = budget  # type: float
+        self.max_retries = max_retries  # type: int
+        self.grace_period = grace_period  # type: float
+        self.check_interval = check_interval  # type: float
+
+    @staticmethod
+    def expected_memory(job) -> float:
+        """
+        Memory in bytes a job is expected to need: its predicted peak memory, or the peak it reached
+        before it was stopped.
+        """
+        return max(getattr(job, 'memory_estimate', 0) or 0, job.peak_memory)
+
+    @staticmethod
+    def resident_memory(job) -> float:
+        """
+        Memory in bytes a running job currently holds, including the memory a persistent worker held
+        before the job (e.g. its cached environments), which is freed as well when the job is stopped.
+        """
+        return (getattr(job, 'base_memory', 0) or 0) + job.memory
+
+    @staticmethod
+    def used_memory(running: dict) -> float:
+        """
+        Memory in bytes used by the running jobs, counting jobs that have not reached their expected
+        peak memory yet with that peak.
+        """
+        return sum((getattr(job, 'base_memory', 0) or 0) + max(job.memory, MemoryAdmission.expected_memory(job))
+                   for job in running.values())
+
+    async def admit(self, job, running: dict):
+        """
+        Waits until the job fits into the memory budget next to the running jobs. A job is always
+        admitted if no other job is running.
+        """
+        while running and self.used_memory(running) + self.expected_memory(job) > self.budget:
+            await asyncio.sleep(self.check_interval)
+
+    def victim(self, running: dict):
+        """
+        Returns the job to stop if the running jobs exceed the budget, i.e. the one using the most memory.
+        A single running job is never stopped.
+        """
+        if len(running) < 2 or sum(self.resident_memory(job) for job in running.values()) <= self.budget:
+            return None
+        return max(running.values(), key=self.resident_memory)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Checkpoints of benchmark sweeps.
+
+A manifest (JSON lines file) records every completed (benchmark, planner, steer function, run) job
+together with the results file it wrote, and every benchmark whose results have been assembled.
+When a sweep is resumed, jobs that are recorded with an unchanged configuration and whose results
+file still exists are skipped, so that only the missing jobs run before the results are merged.
+"""
+import hashlib
+import json
+import os
+from typing import Optional
+
+CHECKPOINT_EXTENSION = '_checkpoint.jsonl'
+
+
+def config_hash(config: dict) -> str:
+    """
+    Returns a hash of a job configuration, used to detect whether a recorded job is still valid.
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+class CheckpointManifest:
+    def __init__(self, filename: str, resume: bool = True):
+        """
+        :param filename: JSON lines file the completed jobs are recorded in.
+        :param resume: Load the jobs recorded by a previous sweep, otherwise the manifest is started anew.
+        """
+        self.filename = filename  # type: str
+        # (benchmark id, planner, steer function, run) -> record
+        self.jobs = {}  # type: {(str, str, str, int): dict}
+        # benchmark id -> record
+        self.benchmarks = {}  # type: {str: dict}
+        if not resume:
+            if os.path.exists(filename):
+                os.remove(filename)
+            return
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # the sweep died while writing this record
+                    continue
+                self._add(record)
+
+    @staticmethod
+    def _job_key(benchmark: str, planner: str, steer_function, run: int) -> (str, str, str, int):
+        return benchmark, planner, str(steer_function), int(run)
+
+    def _add(self, record: dict):
+        if record.get("planner") is None:
+            self.benchmarks[record["benchmark"]] = record
+        else:
+            key = self._job_key(record["benchmark"], record["planner"], record["steer_function"], record["run"])
+            self.jobs[key] = record
+
+    def _write(self, record: dict):
+        self._add(record)
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_job(self, job):
+        """
+        Records a job (scheduler.PlannerJob) that has finished successfully.
+        """
+        self._write({
+            "benchmark": job.mpb.id,
+            "planner": job.planner,
+            "steer_function": str(job.steer_function),
+            "run": job.run,
+            "results": os.path.abspath(job.results_filename),
+            "config": config_hash(job.config)
+        })
+
+    def record_benchmark(self, benchmark: str, results_filename: str):
+        """
+        Records a benchmark whose jobs have all finished and whose results have been assembled.
+        """
+        self._write({
+            "benchmark": benchmark,
+            "results": os.path.abspath(results_filename)
+        })
+
+    def completed_job(self, job) -> Optional[str]:
+        """
+        Returns the results file of a job if it has been completed with the same configuration before.
+        """
+        record = self.jobs.get(self._job_key(job.mpb.id, job.planner, job.steer_function, job.run))
+        if record is None or record["config"] != config_hash(job.config) or not os.path.exists(record["results"]):
+            return None
+        return record["results"]
+
+    def completed_benchmark(self, benchmark: str) -> Optional[str]:
+        """
+        Returns the results file of a benchmark if its results have been assembled before.
+        """
+        record = self.benchmarks.get(benchmark)
+        if record is None or not os.path.exists(record["results"]):
+            return None
+        return record["results"]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import json
+import os
+
+import pytest
+
+import mpb as mpb_module
+
+PYTHON_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_FILENAME = os.path.join(PYTHON_DIR, '..', 'benchmark_template.json')
+STUB_BINARY = os.path.join(PYTHON_DIR, 'stub_benchmark.py')
+
+
+@pytest.fixture
+def make_mpb(monkeypatch, tmp_path):
+    """
+    Returns a factory of benchmarks that run the given planners on the pure-Python stand-in of the
+    benchmark binary (see stub_benchmark.py).
+    """
+    monkeypatch.setattr(mpb_module, 'MPB_BINARY', STUB_BINARY)
+    monkeypatch.setattr(mpb_module, 'MPB_BINARY_DIR', PYTHON_DIR)
+
+    def make(planners: [str], runs: int = 2, id: str = 'test') -> mpb_module.MPB:
+        m = mpb_module.MPB(config_file=TEMPLATE_FILENAME)
+        m.set_planners(planners)
+        m.set_smoothers([])
+        m["benchmark.runs"] = runs
+        m.set_id(id)
+        m.set_subfolder(str(tmp_path))
+        return m
+
+    return make
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """
+    Returns a factory of configuration files that run the given planners and log to <name>_results.json.
+    """
+    def make(name: str, planners: [str] = ('rrt',), runs: int = 1) -> str:
+        with open(TEMPLATE_FILENAME, 'r') as f:
+            config = json.load(f)["settings"]
+        for planner in config["benchmark"]["planning"].keys():
+            config["benchmark"]["planning"][planner] = planner in planners
+        config["benchmark"]["runs"] = runs
+        config["benchmark"]["log_file"] = str(tmp_path / (name + "_results.json"))
+        config_filename = str(tmp_path / (name + "_config.json"))
+        with open(config_filename, 'w') as f:
+            json.dump({"settings": config}, f)
+        return config_filename
+
+    return make
@@ -179,3 +179,9 @@ planner_internal_names = {
     'fprrt': 'FP RRT',
     'fppdst': 'FP PDST'
 }
+
+# Number of threads used by multi-threaded planners (keys from planner_internal_names), all other planners
+# use a single thread. Parallel benchmark runs reserve as many cores for these planners.
+planner_threads = {
+    'cforest': 4
+}
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Structured progress events of benchmark sweeps.
+
+The executor reports every binary it starts, every planner run the binary finishes (its "<stats>"
+lines) and every binary that exits as one JSON line in the event log of the sweep, e.g.
+
+    {"time": 1700000000.0, "event": "job_finished", "job": "b0 with planner rrt", "benchmark": "b0",
+     "planner": "rrt", "code": 0, "duration": 12.3, "peak_memory": 123456789, ...}
+
+A ProgressView aggregates these events into a single progress bar with the number of finished planner
+runs, running and failed jobs and the estimated time remaining. The event log of a running sweep can be
+followed from another terminal (or machine) with `python events.py <sweep>_events.jsonl`.
+"""
+import json
+import sys
+import time
+from typing import Callable, Iterator, Optional
+
+import click
+
+EVENTS_EXTENSION = '_events.jsonl'
+
+
+class EventLog:
+    def __init__(self, filename: Optional[str], listeners: [Callable[[dict], None]] = ()):
+        """
+        :param filename: JSON lines file the events are appended to (None to only notify the listeners).
+        :param listeners: Called with every event.
+        """
+        self.filename = filename  # type: Optional[str]
+        self.listeners = list(listeners)  # type: [Callable[[dict], None]]
+        self._file = open(filename, 'a') if filename is not None else None
+
+    def emit(self, event: str, job=None, **fields) -> dict:
+        """
+        Records an event, with the description of the job (see BinaryJob.info) if one is given.
+        """
+        record = {"time": time.time(), "event": event}
+        if job is not None:
+            record["job"] = job.label
+            record.update(job.info)
+        record.update(fields)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+        for listener in self.listeners:
+            listener(record)
+        return record
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_events(filename: str) -> Iterator[dict]:
+    """
+    Iterates over the events of an event log, skipping a partially written last line.
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class ProgressView:
+    def __init__(self, total: int = 0, desc: str = 'runs'):
+        """
+        Live progress of a sweep aggregated from its events.
+        :param total: Number of planner runs of the sweep (updated by "sweep_started" events).
+        """
+        from tqdm import tqdm
+        self.bar = tqdm(total=total, desc=desc, unit='run')
+        self.running = set()  # type: {str}
+        self.jobs = 0  # type: int
+        self.failed = 0  # type: int
+        self.peak_memory = 0  # type: int
+        self._job_runs = {}  # type: {str: int}
+
+    def __call__(self, record: dict):
+        event = record.get("event")
+        job = record.get("job")
+        if event == "sweep_started":
+            self.bar.total = (self.bar.total or 0) + record.get("total", 0)
+            self.bar.refresh()
+        elif event == "runs_skipped":
+            # completed by a previous (resumed) sweep
+            self.bar.update(record.get("runs", 0))
+        elif event == "runs_stopped":
+            # runs the adaptive stopping rule did not need
+            self.bar.update(record.get("dropped", 0))
+        elif event == "job_started":
+            self.running.add(job)
+            self._job_runs[job] = 0
+        elif event == "run_finished":
+            self._job_runs[job] = self._job_runs.get(job, 0) + 1
+            self.bar.update(1)
+        elif event == "job_retried":
+            # the runs of the stopped binary are run again
+            self.running.discard(job)
+            self.bar.update(-self._job_runs.pop(job, 0))
+        elif event == "job_finished":
+            self.running.discard(job)
+            self.jobs += 1
+            if record.get("code") != 0:
+                self.failed += 1
+            self.peak_memory = max(self.peak_memory, record.get("peak_memory") or 0)
+            # count the runs a failed or killed binary did not finish, so that the remaining time stays accurate
+            missing = (record.get("expected_runs") or 0) - self._job_runs.pop(job, record.get("runs", 0))
+            if missing > 0:
+                self.bar.update(missing)
+        else:
+            return
+        self.bar.set_postfix(running=len(self.running), jobs=self.jobs, failed=self.failed,
+                             peak_gb="%.2f" % (self.peak_memory / 1e9), refresh=False)
+        self.bar.refresh()
+
+    def close(self):
+        self.bar.close()
+
+
+@click.command()
+@click.argument('events_file', type=click.Path(exists=True))
+@click.option('--interval', default=1., help='Seconds between checks for new events.', type=float)
+def main(events_file: str, interval: float):
+    """
+    Shows the live progress of the sweep writing EVENTS_FILE until it has finished.
+    """
+    view = ProgressView()
+    position = 0
+    finished = False
+    try:
+        while not finished:
+            with open(events_file, 'r') as f:
+                f.seek(position)
+                while True:
+                    line = f.readline()
+                    if not line.endswith('\n'):
+                        # wait until the line has been written completely
+                        break
+                    position = f.tell()
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    view(record)
+                    finished = record.get("event") == "sweep_finished"
+            if not finished:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        view.close()
+    print("%i jobs finished, %i failed." % (view.jobs, view.failed), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Asynchronous execution of the benchmark binary.
+
+A single coordinator process launches the benchmark binaries directly as asyncio subprocesses,
+reads their output concurrently and enforces timeouts in the event loop, keeping up to N binaries
+busy at the same time.
+
+With persistent workers, the binaries are started once in worker mode (`benchmark --worker`) and
+kept running: the file name of every job configuration is written to the stdin of an idle worker,
+which runs the job and prints "<job_finished> code </job_finished>" when it is done. This saves the
+start-up of the binary and the loading of environments from files for every job. A worker that is
+killed (e.g. after a timeout) is replaced by a new one for the next job.
+"""
+import asyncio
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import psutil
+
+# maximum length of a line printed by the benchmark binary (e.g. the settings it loaded)
+LINE_LIMIT = 1 << 24
+# interval in seconds at which the memory usage of running binaries is sampled
+MEMORY_SAMPLING_INTERVAL = 0.5
+# argument that starts the binary as persistent worker, and the line it prints after every job
+WORKER_ARGUMENT = '--worker'
+WORKER_JOB_FINISHED = '<job_finished>'
+
+
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine to completion and returns its result. If an event loop is already running in
+    this thread (e.g. in a Jupyter notebook), the coroutine is run in a separate thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+
+async def closing(executor, coroutine):
+    """
+    Awaits the coroutine and stops the persistent workers of the executor afterwards.
+    """
+    try:
+        return await coroutine
+    finally:
+        if executor is not None:
+            await executor.close()
+
+
+class BinaryJob:
+    def __init__(self, config_filename: str, label: str = '', timeout: Optional[float] = None,
+                 memory_limit=0, on_line: Callable[[str], None] = None, threads: int = 1,
+                 run_timeout: Optional[float] = None, info: dict = None):
+        """
+        One invocation of the benchmark binary.
+        :param config_filename: Configuration file passed to the binary.
+        :param label: Description of the job used in messages, e.g. "<MPB ID> with planner rrt".
+        :param timeout: Wall time in seconds after which the binary is killed (None to never kill it).
+        :param memory_limit: Tuple (soft, hard) of the address space limit of the binary, or 0.
+        :param on_line: Called with every line the binary prints.
+        :param threads: Number of threads (cores) the binary uses.
+        :param run_timeout: Wall time in seconds a single planner run may take, i.e. the time between two
+                            consecutive "<stats>" lines (None to never kill a run).
+        :param info: Description of the job included in its progress events, e.g. {"benchmark": ...,
+                     "planner": ..., "expected_runs": ...} (see events.py).
+        """
+        self.config_filename = config_filename  # type: str
+        self.label = label  # type: str
+        self.timeout = timeout  # type: Optional[float]
+        self.run_timeout = run_timeout  # type: Optional[float]
+        self.info = dict(info or {})  # type: dict
+        self.memory_limit = memory_limit
+        self.on_line = on_line  # type: Optional[Callable[[str], None]]
+        self.threads = threads  # type: int
+        # CPUs reserved for the binary while it runs
+        self.cpus = []  # type: [int]
+        self.pid = None  # type: Optional[int]
+        self.code = None  # type: Optional[int]
+        self.timed_out = False  # type: bool
+        # whether the binary was killed because a single run exceeded the run timeout
+        self.run_timed_out = False  # type: bool
+        # number of planner runs the binary has finished (lines containing "<stats>")
+        self.runs = 0  # type: int
+        self.start_time = None  # type: Optional[float]
+        self.end_time = None  # type: Optional[float]
+        # resident memory of the binary in bytes, sampled while it runs (for persistent workers, the increase
+        # over base_memory, so that environments cached by earlier jobs are not charged to this job)
+        self.memory = 0  # type: int
+        self.peak_memory = 0  # type: int
+        # resident memory in bytes of the persistent worker before it started the job (0 for a new binary)
+        self.base_memory = 0  # type: int
+        # expected peak memory in bytes (used by memory admission control)
+        self.memory_estimate = 0  # type: float
+        # whether the binary was stopped to stay within the memory budget, and how often it was retried
+        self.evicted = False  # type: bool
+        self.retries = 0  # type: int
+
+    @property
+    def duration(self) -> float:
+        if self.start_time is None:
+            return 0.
+        return (self.end_time or time.time()) - self.start_time
+
+
+class AsyncExecutor:
+    def __init__(self, processes: int = os.cpu_count(), binary: str = './benchmark', binary_dir: str = '../bin',
+                 admission=None, pin_cpus: bool = False, events=None, persistent: bool = False):
+        """
+        :param processes: Number of cores the binaries may use at the same time. A binary reserves as many
+                          cores as it uses threads (see BinaryJob.threads).
+        :param binary: Path of the benchmark binary relative to binary_dir.
+        :param binary_dir: Working directory of the binary.
+        :param admission: Optional admission.MemoryAdmission that delays starting binaries and stops
+                          binaries to keep the running ones within a memory budget.
+        :param pin_cpus: Restrict every binary to the CPUs of its reserved cores, so that binaries running
+                         at the same time do not compete for the same CPUs.
+        :param events: Optional events.EventLog that the start, finished planner runs and exit of every
+                       binary are reported to.
+        :param persistent: Run the jobs on persistent workers instead of starting the binary for every job.
+        """
+        self.processes = max(1, processes)  # type: int
+        self.binary = binary  # type: str
+        self.binary_dir = binary_dir  # type: str
+        self.admission = admission
+        self.pin_cpus = pin_cpus and hasattr(os, 'sched_setaffinity')  # type: bool
+        self.events = events
+        self.persistent = persistent  # type: bool
+        # idle persistent workers
+        self._workers = []  # type: list
+        if hasattr(os, 'sched_getaffinity'):
+            self.cpus = sorted(os.sched_getaffinity(0))  # type: [int]
+        else:
+            self.cpus = list(range(os.cpu_count()))
+        self.running = {}  # type: {int: BinaryJob}
+        # indices of the unreserved cores, core i runs on CPU self.cpus[i % len(self.cpus)]
+        self._free_cores = list(range(self.processes))  # type: [int]
+        self._cores_changed = None  # type: Optional[asyncio.Condition]
+
+    def threads(self, job: BinaryJob) -> int:
+        """
+        Number of cores reserved for a job, at most all cores of the executor.
+        """
+        return max(1, min(job.threads, self.processes))
+
+    def reserved_threads(self, threads: int) -> Optional[int]:
+        """
+        Number of cores a job using the given number of threads is restricted to, or None if the jobs
+        are not pinned to their reserved cores.
+        """
+        if not self.pin_cpus:
+            return None
+        return max(1, min(threads, self.processes))
+
+    def available(self, job: BinaryJob) -> bool:
+        """
+        Whether enough cores are free to start the job right away.
+        """
+        return len(self._free_cores) >= self.threads(job)
+
+    @property
+    def free_cores(self) -> int:
+        return len(self._free_cores)
+
+    async def _reserve(self, job: BinaryJob) -> [int]:
+        if self._cores_changed is None:
+            self._cores_changed = asyncio.Condition()
+        async with self._cores_changed:
+            await self._cores_changed.wait_for(lambda: self.available(job))
+            cores = self._free_cores[:self.threads(job)]
+            del self._free_cores[:self.threads(job)]
+        job.cpus = sorted(set(self.cpus[core % len(self.cpus)] for core in cores))
+        return cores
+
+    async def _release(self, cores: [int]):
+        async with self._cores_changed:
+            self._free_cores = sorted(self._free_cores + cores)
+            self._cores_changed.notify_all()
+
+    async def run_job(self, job: BinaryJob) -> int:
+        """
+        Runs the job as soon as enough cores for its threads are free and returns its exit code
+        (-9 if it was killed after its timeout).
+        """
+        while True:
+            cores = await self._reserve(job)
+            try:
+                if self.admission is not None:
+                    await self.admission.admit(job, self.running)
+                code = await self._execute(job)
+            finally:
+                await self._release(cores)
+            if not job.evicted or job.retries >= self.admission.max_retries:
+                if self.events is not None:
+                    self.events.emit("job_finished", job, code=code, runs=job.runs, duration=job.duration,
+                                     peak_memory=job.peak_memory, timed_out=job.timed_out,
+                                     run_timed_out=job.run_timed_out, evicted=job.evicted)
+                return code
+            if self.events is not None:
+                self.events.emit("job_retried", job, runs=job.runs, peak_memory=job.peak_memory,
+                                 retry=job.retries + 1)
+            # retry the job once enough memory for its observed peak is available
+            job.retries += 1
+            job.evicted = False
+            job.runs = 0
+            job.memory_estimate = max(job.memory_estimate, job.peak_memory)
+
+    async def _worker(self, job: BinaryJob):
+        """
+        Returns an idle persistent worker (starting a new one if there is none), restricted to the CPUs and
+        memory limit of the job.
+        """
+        while True:
+            job.base_memory = 0
+            if self._workers:
+                proc = self._workers.pop()
+                try:
+                    job.base_memory = psutil.Process(proc.pid).memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            else:
+                proc = await asyncio.create_subprocess_exec(
+                    self.binary, WORKER_ARGUMENT, stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                    cwd=os.path.abspath(self.binary_dir), limit=LINE_LIMIT)
+            try:
+                if self.pin_cpus:
+                    os.sched_setaffinity(proc.pid, job.cpus or self.cpus)
+                if hasattr(resource, 'prlimit'):
+                    hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+                    soft = int(job.memory_limit[0]) if job.memory_limit != 0 else hard
+                    resource.prlimit(proc.pid, resource.RLIMIT_AS, (soft, hard))
+                proc.stdin.write((os.path.abspath(job.config_filename) + '\n').encode())
+                await proc.stdin.drain()
+                return proc
+            except (ProcessLookupError, BrokenPipeError, ConnectionResetError):
+                # the worker has exited in the meantime
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+
+    async def close(self):
+        """
+        Stops the idle persistent workers.
+        """
+        workers, self._workers = self._workers, []
+        for proc in workers:
+            if proc.returncode is None:
+                proc.stdin.close()
+                await proc.wait()
+
+    async def _execute(self, job: BinaryJob) -> int:
+        pin_cpus = self.pin_cpus and len(job.cpus) > 0
+
+        def preexec_fn():
+            if job.memory_limit != 0:
+                resource.setrlimit(resource.RLIMIT_AS, job.memory_limit)
+            if pin_cpus:
+                os.sched_setaffinity(0, job.cpus)
+        if self.persistent:
+            proc = await self._worker(job)
+        else:
+            proc = await asyncio.create_subprocess_exec(
+                self.binary, os.path.abspath(job.config_filename),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                cwd=os.path.abspath(self.binary_dir), preexec_fn=preexec_fn, limit=LINE_LIMIT)
+        job.pid = proc.pid
+        job.start_time = time.time()
+        self.running[proc.pid] = job
+        if self.events is not None:
+            self.events.emit("job_started", job, pid=proc.pid, cpus=job.cpus, retry=job.retries)
+        loop = asyncio.get_running_loop()
+        kill_handle = None
+        if job.timeout is not None:
+            kill_handle = loop.call_later(job.timeout, self._kill, proc, job)
+        run_kill_handle = None
+        if job.run_timeout is not None:
+            run_kill_handle = loop.call_later(job.run_timeout, self._kill_run, proc, job)
+        sampler = asyncio.ensure_future(self._sample_memory(proc, job))
+        code = None
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                line = line.decode('UTF-8', errors='replace')
+                if self.persistent and line.startswith(WORKER_JOB_FINISHED):
+                    code = int(line.split()[1])
+                    break
+                if '<stats>' in line:
+                    job.runs += 1
+                    if self.events is not None:
+                        self.events.emit("run_finished", job, runs=job.runs, duration=job.duration)
+                    if run_kill_handle is not None:
+                        # the next run starts now
+                        run_kill_handle.cancel()
+                        run_kill_handle = loop.call_later(job.run_timeout, self._kill_run, proc, job)
+                if job.on_line is not None:
+                    job.on_line(line)
+            if code is None:
+                code = await proc.wait()
+        finally:
+            sampler.cancel()
+            if kill_handle is not None:
+                kill_handle.cancel()
+            if run_kill_handle is not None:
+                run_kill_handle.cancel()
+            if code is not None and self.persistent and proc.returncode is None \
+                    and not job.timed_out and not job.evicted:
+                # the worker finished the job and waits for the next one
+                self._workers.append(proc)
+            elif proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            del self.running[proc.pid]
+            job.end_time = time.time()
+        if job.timed_out:
+            job.code = -9
+        elif job.evicted:
+            job.code = -15
+        else:
+            job.code = code
+        return job.code
+
+    async def _sample_memory(self, proc, job: BinaryJob):
+        try:
+            process = psutil.Process(proc.pid)
+            while True:
+                job.memory = max(0, process.memory_info().rss - job.base_memory)
+                job.peak_memory = max(job.peak_memory, job.memory)
+                if self.admission is not None and not job.evicted and \
+                        self.admission.victim(self.running) is job:
+                    self._evict(proc, job)
+                await asyncio.sleep(MEMORY_SAMPLING_INTERVAL)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+    def _evict(self, proc, job: BinaryJob):
+        """
+        Stops a binary that uses the most memory while the running binaries exceed the memory budget,
+        first asking it to terminate and killing it after the grace period.
+        """
+        job.evicted = True
+        retry = job.retries < self.admission.max_retries
+        print("Stopping %s using %.2f GB to stay within the memory budget of %.2f GB%s." % (
+            job.label, self.admission.resident_memory(job) / 1e9, self.admission.budget / 1e9,
+            " (retry %i / %i follows)" % (job.retries + 1, self.admission.max_retries) if retry else ""),
+              file=sys.stderr)
+        try:
+            proc.terminate()
+        except ProcessLookupError:
+            return
+
+        def kill():
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+
+        asyncio.get_running_loop().call_later(self.admission.grace_period, kill)
+
+    @staticmethod
+    def _kill_run(proc, job: BinaryJob):
+        try:
+            proc.kill()
+            job.timed_out = True
+            job.run_timed_out = True
+            print("Killed %s after run %i exceeded the run timeout of %.2fs." % (
+                job.label, job.runs + 1, job.run_timeout))
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _kill(proc, job: BinaryJob):
+        try:
+            proc.kill()
+            job.timed_out = True
+            print("Killed %s after %.2fs exceeded timeout." % (job.label, job.duration))
+        except ProcessLookupError:
+            pass
+        except:
+            print('Error occurred while trying to kill %s.' % job.label, file=sys.stderr)
+            job.timed_out = True
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+History of the wall time and peak memory of benchmark jobs.
+
+Measurements are grouped by planner, environment type and steer function, and are used to predict
+the resources of future jobs (see scheduler.PredictiveScheduler). The history is stored as a JSON
+lines file that grows with every finished job and can be seeded from existing results files.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from definitions import planner_internal_names, robot_models, steer_functions
+from results_io import iter_runs
+
+HISTORY_FILENAME = 'mpb_history.jsonl'
+
+# quantile of the recorded peak memory used as prediction, to be on the safe side when packing jobs
+MEMORY_QUANTILE = 0.9
+
+# planner names of the configuration (under which jobs are recorded) by the names used in results files
+_config_planner_names = {internal: name for name, internal in planner_internal_names.items()}
+
+
+def steer_function_name(config: dict, index=None) -> str:
+    """
+    Returns the name of the steer function (or robot model for control-based planning) with the given
+    index, or the one selected in the configuration if index is None.
+    """
+    try:
+        if config["benchmark"]["control_planners_on"]:
+            if index is None:
+                index = config["forwardpropagation"]["forward_propagation_type"]
+            return robot_models[index]
+        if index is None:
+            index = config["steer"]["steering_type"]
+        return steer_functions[index]
+    except (KeyError, IndexError, TypeError):
+        return ''
+
+
+class RuntimeHistory:
+    def __init__(self, filename: Optional[str] = HISTORY_FILENAME):
+        """
+        :param filename: JSON lines file the measurements are read from and appended to (None to only
+                         keep them in memory).
+        """
+        self.filename = filename  # type: Optional[str]
+        # (planner, environment type, steer function) -> {"time": [...], "memory": [...]}
+        self.records = {}  # type: {(str, str, str): {str: [float]}}
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._add(record)
+
+    def __len__(self) -> int:
+        return sum(len(r["time"]) for r in self.records.values())
+
+    def _add(self, record: dict):
+        key = (record["planner"], record.get("environment", ''), record.get("steer_function", ''))
+        entry = self.records.setdefault(key, {"time": [], "memory": []})
+        if record.get("time") is not None:
+            entry["time"].append(float(record["time"]))
+        if record.get("memory"):
+            entry["memory"].append(float(record["memory"]))
+
+    def add(self, planner: str, environment: str, steer_function: str, time: Optional[float],
+            memory: Optional[float] = None, persist: bool = True):
+        """
+        Records the wall time (in seconds) of a single evaluation of a planner (one run, steer function and
+        start-goal query) and the peak memory (in bytes) of the process that ran it.
+        """
+        record = {
+            "planner": planner,
+            "environment": environment,
+            "steer_function": steer_function,
+            "time": time,
+            "memory": memory
+        }
+        self._add(record)
+        if persist and self.filename is not None:
+            with open(self.filename, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def learn_from_results(self, results_filename: str, persist: bool = True) -> int:
+        """
+        Adds the planning and smoothing times of all plans in a results file to the history.
+        These times are lower bounds of the wall time of the jobs, and the results hold no memory usage.
+        :return: Number of plans added.
+        """
+        count = 0
+        header = {}
+        for _, run in iter_runs(results_filename, skip_trajectories=True, skip_intermediary=True, header=header):
+            if run is None or not run.get("plans"):
+                continue
+            settings = run.get("settings", header.get("settings", {}))
+            environment = (run.get("environment") or {}).get("type", '')
+            steer_function = steer_function_name(settings)
+            for plan_name, plan in run["plans"].items():
+                if plan is None or plan.get("stats") is None:
+                    continue
+                planner = _config_planner_names.get(plan_name, plan_name)
+                time = plan["stats"].get("planning_time") or 0.
+                for smoothing in (plan.get("smoothing") or {}).values():
+                    if smoothing is not None:
+                        time += smoothing.get("time") or 0.
+                self.add(planner, environment, steer_function, time, persist=persist)
+                count += 1
+        return count
+
+    def _values(self, planner: str, environment: str, steer_function: str, name: str) -> [float]:
+        # fall back to less specific categories if there are no measurements
+        for env, steer in ((environment, steer_function), (environment, None), (None, None)):
+            values = []
+            for (p, e, s), entry in self.records.items():
+                if p == planner and (env is None or e == env) and (steer is None or s == steer):
+                    values += entry[name]
+            if values:
+                return values
+        return []
+
+    def predict_time(self, planner: str, environment: str, steer_function: str,
+                     default: float = None) -> Optional[float]:
+        """
+        Predicts the wall time of a single evaluation of a planner as the mean of the recorded times.
+        """
+        values = self._values(planner, environment, steer_function, "time")
+        if not values:
+            return default
+        return float(np.mean(values))
+
+    def predict_memory(self, planner: str, environment: str, steer_function: str,
+                       default: float = 0.) -> float:
+        """
+        Predicts the peak memory of a run of a planner as a high quantile of the recorded peaks.
+        """
+        values = self._values(planner, environment, steer_function, "memory")
+        if not values:
+            return default
+        return float(np.quantile(values, MEMORY_QUANTILE))
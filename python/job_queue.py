@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Distribution of benchmark jobs over several machines.
+
+The coordinator (MultipleMPB.run_parallel(job_queue=...)) decomposes the benchmarks into fine-grained
+jobs (see scheduler.py) and puts them into a job queue in a directory that all machines share (e.g. via
+NFS).
+Workers on any machine claim jobs, run them with their local benchmark binary and upload the results
+to the shared directory, while the coordinator assembles the results of each benchmark as soon as
+all of its jobs have arrived.
+
+The queue directory holds one file per job, and a job moves between the subdirectories by atomic
+renames, so that every job is claimed by exactly one worker:
+
+    pending/<job>.json            jobs waiting for a worker
+    claimed/<job>@<worker>.json   jobs being run, the worker touches the file as heartbeat
+    done/<job>.json               return code and measurements of finished jobs
+    results/<job>_results.json    results uploaded by the workers
+    closed                        created by the coordinator once all jobs are done
+
+Claims whose heartbeat is older than the heartbeat timeout (e.g. because the machine died) are put
+back into pending/ by the coordinator.
+"""
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sys
+import time
+import uuid
+from typing import Optional
+
+import click
+
+from executor import AsyncExecutor, BinaryJob, closing, run_coroutine
+
+HEARTBEAT_INTERVAL = 10.
+# claims without a heartbeat for this many seconds are put back into the queue
+HEARTBEAT_TIMEOUT = 60.
+POLL_INTERVAL = 1.
+
+
+def _write_json(filename: str, data: dict):
+    """
+    Writes a JSON file atomically, so that other machines never read a partial file.
+    """
+    tmp_filename = "%s.%s.tmp" % (filename, uuid.uuid4().hex)
+    with open(tmp_filename, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_filename, filename)
+
+
+class FileJobQueue:
+    def __init__(self, directory: str):
+        """
+        :param directory: Queue directory shared by the coordinator and all workers.
+        """
+        self.directory = os.path.abspath(directory)  # type: str
+        for folder in ("pending", "claimed", "done", "results"):
+            os.makedirs(os.path.join(self.directory, folder), exist_ok=True)
+
+    def _path(self, *parts) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def results_filename(self, name: str) -> str:
+        return self._path("results", name + "_results.json")
+
+    def put(self, name: str, config: dict, timeout: Optional[float] = None, threads: int = 1):
+        """
+        Adds a job running the binary with the given configuration.
+        """
+        if os.path.exists(self._path("done", name + ".json")):
+            os.remove(self._path("done", name + ".json"))
+        _write_json(self._path("pending", name + ".json"), {
+            "name": name,
+            "config": config,
+            "timeout": timeout,
+            "threads": threads
+        })
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Claims a pending job for the given worker.
+        :return: The job, or None if no job is pending.
+        """
+        for filename in sorted(os.listdir(self._path("pending"))):
+            if not filename.endswith(".json"):
+                continue
+            name = filename[:-len(".json")]
+            claim_filename = self._path("claimed", "%s@%s.json" % (name, worker))
+            try:
+                # only one worker succeeds in moving the file
+                os.rename(self._path("pending", filename), claim_filename)
+            except FileNotFoundError:
+                continue
+            os.utime(claim_filename)
+            try:
+                with open(claim_filename, 'r') as f:
+                    job = json.load(f)
+                job["config"], job["timeout"], job["threads"]
+            except (json.JSONDecodeError, KeyError):
+                print("Skipping invalid job %s." % name, file=sys.stderr)
+                os.remove(claim_filename)
+                continue
+            job["claim"] = claim_filename
+            return job
+        return None
+
+    def heartbeat(self, job: dict):
+        try:
+            os.utime(job["claim"])
+        except FileNotFoundError:
+            pass
+
+    def complete(self, job: dict, results_filename: Optional[str], code: int, **measurements):
+        """
+        Uploads the results of a claimed job and marks it as done.
+        """
+        if results_filename is not None and os.path.exists(results_filename):
+            tmp_filename = "%s.%s.tmp" % (self.results_filename(job["name"]), uuid.uuid4().hex)
+            shutil.copyfile(results_filename, tmp_filename)
+            os.replace(tmp_filename, self.results_filename(job["name"]))
+        record = {"name": job["name"], "code": code}
+        record.update(measurements)
+        _write_json(self._path("done", job["name"] + ".json"), record)
+        try:
+            os.remove(job["claim"])
+        except FileNotFoundError:
+            pass
+
+    def done(self) -> {str: dict}:
+        """
+        Returns the records of the finished jobs, keyed by job name.
+        """
+        records = {}
+        for filename in os.listdir(self._path("done")):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(self._path("done", filename), 'r') as f:
+                    record = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            records[record["name"]] = record
+        return records
+
+    def requeue_stale(self, timeout: float = HEARTBEAT_TIMEOUT) -> [str]:
+        """
+        Puts claimed jobs whose worker has not sent a heartbeat within the timeout back into the queue.
+        :return: Names of the requeued jobs.
+        """
+        requeued = []
+        now = time.time()
+        for filename in os.listdir(self._path("claimed")):
+            if not filename.endswith(".json"):
+                continue
+            claim_filename = self._path("claimed", filename)
+            try:
+                if now - os.path.getmtime(claim_filename) < timeout:
+                    continue
+                name = filename[:filename.rindex("@")]
+                os.rename(claim_filename, self._path("pending", name + ".json"))
+            except (FileNotFoundError, ValueError):
+                continue
+            requeued.append(name)
+        return requeued
+
+    def close(self):
+        """
+        Tells the workers that no more jobs will be added.
+        """
+        open(self._path("closed"), 'w').close()
+
+    @property
+    def closed(self) -> bool:
+        return os.path.exists(self._path("closed"))
+
+
+def worker_id() -> str:
+    return "%s-%i-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+
+
+async def work(queue: FileJobQueue, executor: AsyncExecutor, working_dir: str, worker: str = None,
+               heartbeat_interval: float = HEARTBEAT_INTERVAL, poll_interval: float = POLL_INTERVAL,
+               exit_when_empty: bool = False, silence: bool = False) -> int:
+    """
+    Claims and runs jobs from the queue on the local executor until the queue is closed.
+    :param working_dir: Local directory of the configuration and results files of the running jobs.
+    :param exit_when_empty: Stop as soon as no job is pending, instead of waiting for the queue to close.
+    :return: Number of jobs run.
+    """
+    worker = worker or worker_id()
+    os.makedirs(working_dir, exist_ok=True)
+    claimed = {}  # type: {str: dict}
+    count = 0
+
+    async def heartbeats():
+        while True:
+            for job in list(claimed.values()):
+                queue.heartbeat(job)
+            await asyncio.sleep(heartbeat_interval)
+
+    async def run(job: dict):
+        nonlocal count
+        config = job["config"]
+        results_filename = os.path.join(working_dir, job["name"] + "_results.json")
+        config_filename = os.path.join(working_dir, job["name"] + "_config.json")
+        config["benchmark"]["log_file"] = os.path.abspath(results_filename)
+        if os.path.exists(results_filename):
+            os.remove(results_filename)
+        with open(config_filename, 'w') as f:
+            json.dump({"settings": config}, f, indent=2)
+        binary_job = BinaryJob(config_filename, label="job %s" % job["name"], timeout=job["timeout"],
+                               threads=job["threads"])
+        job["binary_job"] = binary_job
+        if not silence:
+            print("Worker %s running job %s." % (worker, job["name"]))
+        code = await executor.run_job(binary_job)
+        queue.complete(job, results_filename if code == 0 else None, code, worker=worker,
+                       time=binary_job.duration, memory=binary_job.peak_memory or None)
+        del claimed[job["name"]]
+        count += 1
+        for filename in (config_filename, results_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    heartbeat_task = asyncio.ensure_future(heartbeats())
+    tasks = set()
+    try:
+        while True:
+            # only claim jobs while the claimed ones have all got their cores, leaving the others to other workers
+            while executor.free_cores > 0 and all(
+                    "binary_job" in job and len(job["binary_job"].cpus) > 0 for job in claimed.values()):
+                job = queue.claim(worker)
+                if job is None:
+                    break
+                claimed[job["name"]] = job
+                tasks.add(asyncio.ensure_future(run(job)))
+                await asyncio.sleep(0)
+            if not tasks and (queue.closed or exit_when_empty):
+                break
+            if tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            else:
+                await asyncio.sleep(poll_interval)
+    finally:
+        heartbeat_task.cancel()
+    return count
+
+
+async def distribute(benchmarks: list, queue: FileJobQueue, subfolder: str = '',
+                     executor: Optional[AsyncExecutor] = None, kill_after_timeout: bool = True,
+                     silence: bool = False, show_progress_bar: bool = True,
+                     heartbeat_timeout: float = HEARTBEAT_TIMEOUT, poll_interval: float = POLL_INTERVAL,
+                     events=None) -> [int]:
+    """
+    Coordinates the distributed run of the benchmarks: puts their jobs into the queue, puts jobs of
+    workers that stopped sending heartbeats back into the queue, and assembles the results file of each
+    benchmark as soon as all of its jobs are done.
+    :param executor: If given, this process also works on the queue with the executor's cores.
+    :param events: Optional events.EventLog that the finished jobs of all workers are reported to.
+    :return: Return code per benchmark (0 if all of its jobs succeeded, otherwise the first error code).
+    """
+    from scheduler import decompose, finish_benchmark
+
+    jobs_per_benchmark = []
+    for mpb in benchmarks:
+        jobs_folder = os.path.join(subfolder, mpb.id + "_jobs")
+        jobs_per_benchmark.append(decompose(mpb, jobs_folder, kill_after_timeout))
+    if os.path.exists(queue._path("closed")):
+        os.remove(queue._path("closed"))
+    jobs = {}
+    for i, benchmark_jobs in enumerate(jobs_per_benchmark):
+        for job in benchmark_jobs:
+            job.results_filename = queue.results_filename(job.name)
+            queue.put(job.name, job.config, job.timeout, job.threads)
+            jobs[job.name] = (i, job)
+    if not silence:
+        print("Queued %i jobs of %i benchmarks in %s." % (len(jobs), len(benchmarks), queue.directory))
+
+    pbar = None
+    if show_progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(jobs), desc="jobs")
+    worker = None
+    if executor is not None:
+        worker = asyncio.ensure_future(work(queue, executor, os.path.join(subfolder, "worker"), silence=True))
+    remaining = [len(benchmark_jobs) for benchmark_jobs in jobs_per_benchmark]
+    codes = [0] * len(benchmarks)
+    finished = set()
+    try:
+        while len(finished) < len(jobs):
+            for name, record in queue.done().items():
+                if name in finished or name not in jobs:
+                    continue
+                finished.add(name)
+                i, job = jobs[name]
+                job.code = record["code"]
+                if events is not None:
+                    events.emit("job_finished", job, code=job.code, duration=record.get("time"),
+                                peak_memory=record.get("memory"), worker=record.get("worker"))
+                if pbar is not None:
+                    pbar.update(1)
+                if job.code != 0:
+                    print("Error (%i) occurred for job %s on worker %s." % (
+                        job.code, name, record.get("worker", "unknown")), file=sys.stderr)
+                    if codes[i] == 0:
+                        codes[i] = job.code
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    finish_benchmark(benchmarks[i], jobs_per_benchmark[i], subfolder, silence)
+            for name in queue.requeue_stale(heartbeat_timeout):
+                if not silence:
+                    print("Requeued job %s whose worker stopped sending heartbeats." % name, file=sys.stderr)
+            if worker is not None and worker.done():
+                worker.result()
+            await asyncio.sleep(poll_interval)
+    finally:
+        queue.close()
+        if worker is not None:
+            await worker
+        if pbar is not None:
+            pbar.close()
+    return codes
+
+
+@click.command()
+@click.argument('queue_dir', type=click.Path(exists=True))
+@click.option('--processes', default=os.cpu_count(), help='Number of cores to run jobs on.', type=int)
+@click.option('--binary', default='./benchmark', help='Path of the benchmark binary relative to binary_dir.')
+@click.option('--binary_dir', default='../bin', help='Working directory of the benchmark binary.')
+@click.option('--working_dir', default=None, help='Local directory of the files of running jobs.')
+@click.option('--exit_when_empty', default=False, type=bool, help='Stop once no job is pending.')
+@click.option('--persistent', default=False, type=bool, help='Run the jobs on persistent binary workers.')
+def main(queue_dir: str, processes: int, binary: str, binary_dir: str, working_dir: Optional[str],
+         exit_when_empty: bool, persistent: bool):
+    """
+    Runs a worker that claims jobs from the queue in QUEUE_DIR.
+    """
+    worker = worker_id()
+    working_dir = working_dir or os.path.join("mpb_worker", worker)
+    executor = AsyncExecutor(processes, binary, binary_dir, pin_cpus=True, persistent=persistent)
+    count = run_coroutine(closing(executor, work(FileJobQueue(queue_dir), executor, working_dir, worker,
+                                                 exit_when_empty=exit_when_empty)))
+    shutil.rmtree(working_dir, ignore_errors=True)
+    print("Worker %s ran %i jobs." % (worker, count), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
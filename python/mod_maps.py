@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Loaders for the Maps of Dynamics (MoD) used by the MoD cost functions and samplers:
+CLiFF maps, GMMT maps and intensity maps (see maps/*_cliff.xml, *_gmmt.xml, *_intensity1m.xml).
+
+The XML files are parsed once into NumPy arrays which are stored in a binary cache keyed by the
+SHA-1 hash of the XML file, so that later loads only read the cached arrays.
+"""
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# increase when the cached arrays change, so that outdated caches are not used
+CACHE_VERSION = 1
+CACHE_DIR = os.environ.get('MPB_MOD_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'mpb', 'mod'))
+
+
+def _float(element, path: str, default: float = np.nan) -> float:
+    child = element.find(path)
+    if child is None or child.text is None or child.text.strip() == '':
+        return default
+    return float(child.text)
+
+
+def _parameters(root) -> {str: float}:
+    parameters = root.find('parameters')
+    if parameters is None:
+        return {}
+    return {child.tag: float(child.text) for child in parameters if child.text is not None and child.text.strip()}
+
+
+class CLiFFMap:
+    """
+    Circular-linear flow field map: a mixture of semi-wrapped normal distributions over
+    (heading th, speed r) per location. The distributions of all locations are stored in flat arrays;
+    the distributions of location i are those in the range offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self):
+        self.x_min = 0.0
+        self.x_max = 0.0
+        self.y_min = 0.0
+        self.y_max = 0.0
+        self.step = 1.0
+        self.radius = 1.0
+        self.wind = 1.0
+        self.ids = np.zeros(0, dtype=np.int64)  # type: np.ndarray
+        self.positions = np.zeros((0, 2))  # type: np.ndarray
+        self.p = np.zeros(0)  # type: np.ndarray
+        self.q = np.zeros(0)  # type: np.ndarray
+        self.offsets = np.zeros(1, dtype=np.int64)  # type: np.ndarray
+        self.clusters = np.zeros(0, dtype=np.int64)  # type: np.ndarray
+        self.weights = np.zeros(0)  # type: np.ndarray
+        self.means = np.zeros((0, 2))  # type: np.ndarray
+        self.covariances = np.zeros((0, 2, 2))  # type: np.ndarray
+
+    def distributions(self, location: int) -> slice:
+        """
+        Returns the index range of the distributions of the given location (index, not ID).
+        """
+        return slice(self.offsets[location], self.offsets[location + 1])
+
+    def parse(self, filename: str):
+        ids, positions, ps, qs, offsets = [], [], [], [], [0]
+        clusters, weights, means, covariances = [], [], [], []
+        for _, element in ET.iterparse(filename, events=('end',)):
+            if element.tag == 'parameters':
+                parameters = {child.tag: float(child.text) for child in element
+                              if child.text is not None and child.text.strip()}
+                self.x_min = parameters.get('x_min', self.x_min)
+                self.x_max = parameters.get('x_max', self.x_max)
+                self.y_min = parameters.get('y_min', self.y_min)
+                self.y_max = parameters.get('y_max', self.y_max)
+                self.step = parameters.get('step', self.step)
+                self.radius = parameters.get('radious', parameters.get('radius', self.radius))
+                self.wind = parameters.get('wind', self.wind)
+            elif element.tag == 'location':
+                ids.append(int(_float(element, 'id', -1)))
+                positions.append((_float(element, 'pose/x'), _float(element, 'pose/y')))
+                ps.append(_float(element, 'p'))
+                qs.append(_float(element, 'q'))
+                for distribution in element.iter('distribution'):
+                    clusters.append(int(_float(distribution, 'Cluster', -1)))
+                    weights.append(_float(distribution, 'P'))
+                    means.append((_float(distribution, 'M/th'), _float(distribution, 'M/r')))
+                    covariances.append(((_float(distribution, 'Cov/e_11'), _float(distribution, 'Cov/e_12')),
+                                        (_float(distribution, 'Cov/e_21'), _float(distribution, 'Cov/e_22'))))
+                offsets.append(len(weights))
+                element.clear()
+        self.ids = np.array(ids, dtype=np.int64)
+        self.positions = np.array(positions, dtype=np.float64).reshape((-1, 2))
+        self.p = np.array(ps, dtype=np.float64)
+        self.q = np.array(qs, dtype=np.float64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.clusters = np.array(clusters, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+        self.means = np.array(means, dtype=np.float64).reshape((-1, 2))
+        self.covariances = np.array(covariances, dtype=np.float64).reshape((-1, 2, 2))
+
+
+class GMMTMap:
+    """
+    Gaussian mixture model over trajectories: M clusters with weights pi, each described by K mean
+    points (x, y) sharing the standard deviation stddev.
+    """
+
+    def __init__(self):
+        self.M = 0
+        self.K = 0
+        self.stddev = 0.0
+        self.pi = np.zeros(0)  # type: np.ndarray
+        self.means = np.zeros((0, 0, 2))  # type: np.ndarray
+
+    def parse(self, filename: str):
+        root = ET.parse(filename).getroot()
+        parameters = _parameters(root)
+        self.M = int(parameters.get('M', 0))
+        self.K = int(parameters.get('K', 0))
+        self.stddev = parameters.get('stddev', 0.0)
+        pis, means = [], []
+        for cluster in root.iter('cluster'):
+            pis.append(_float(cluster, 'pi'))
+            means.append([(_float(point, 'x'), _float(point, 'y')) for point in cluster.iter('point')])
+        if len(set(len(m) for m in means)) > 1:
+            raise Exception("GMMT map %s has clusters with different numbers of mean points." % filename)
+        self.pi = np.array(pis, dtype=np.float64)
+        self.means = np.array(means, dtype=np.float64).reshape((len(means), -1, 2))
+        if self.M == 0:
+            self.M = self.means.shape[0]
+        if self.K == 0:
+            self.K = self.means.shape[1]
+
+
+class IntensityMap:
+    """
+    Grid of human-presence intensities. values[row, col] holds the intensity of the cell at
+    x = x_min + col * cell_size, y = y_min + row * cell_size; cells missing in the file are NaN.
+    """
+
+    def __init__(self):
+        self.cell_size = 1.0
+        self.x_min = 0.0
+        self.y_min = 0.0
+        self.x_max = 0.0
+        self.y_max = 0.0
+        self.values = np.zeros((0, 0))  # type: np.ndarray
+
+    def value(self, x: float, y: float) -> float:
+        """
+        Returns the intensity at the given position, or NaN outside of the map.
+        """
+        col = int(np.floor((x - self.x_min) / self.cell_size))
+        row = int(np.floor((y - self.y_min) / self.cell_size))
+        if row < 0 or col < 0 or row >= self.values.shape[0] or col >= self.values.shape[1]:
+            return np.nan
+        return self.values[row, col]
+
+    def parse(self, filename: str):
+        rows, cols, values = [], [], []
+        for _, element in ET.iterparse(filename, events=('end',)):
+            if element.tag == 'parameters':
+                parameters = {child.tag: float(child.text) for child in element
+                              if child.text is not None and child.text.strip()}
+                self.cell_size = parameters.get('cell_size', self.cell_size)
+                self.x_min = parameters.get('x_min', self.x_min)
+                self.y_min = parameters.get('y_min', self.y_min)
+                self.x_max = parameters.get('x_max', self.x_max)
+                self.y_max = parameters.get('y_max', self.y_max)
+            elif element.tag == 'cell':
+                rows.append(int(_float(element, 'row')))
+                cols.append(int(_float(element, 'col')))
+                values.append(_float(element, 'value'))
+                element.clear()
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        shape = (
+            max(int(round((self.y_max - self.y_min) / self.cell_size)) + 1, rows.max() + 1 if len(rows) else 0),
+            max(int(round((self.x_max - self.x_min) / self.cell_size)) + 1, cols.max() + 1 if len(cols) else 0))
+        self.values = np.full(shape, np.nan)
+        self.values[rows, cols] = values
+
+
+MAP_TYPES = {
+    'cliff': CLiFFMap,
+    'gmmt': GMMTMap,
+    'intensity': IntensityMap
+}
+
+
+def file_hash(filename: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def detect_map_type(filename: str) -> str:
+    """
+    Determines the MoD type of an XML map from the first element that distinguishes the formats.
+    """
+    for _, element in ET.iterparse(filename, events=('start',)):
+        if element.tag in ('locations', 'location'):
+            return 'cliff'
+        if element.tag in ('clusters', 'cluster'):
+            return 'gmmt'
+        if element.tag in ('cells', 'cell', 'cell_size'):
+            return 'intensity'
+    raise Exception("Could not determine the MoD type of %s." % filename)
+
+
+def load_mod_map(filename: str, map_type: str = None, cache_dir: str = None, use_cache: bool = True):
+    """
+    Loads a CLiFF, GMMT or intensity map, parsing the XML file only if it is not cached yet.
+    :param filename: XML file of the map.
+    :param map_type: One of "cliff", "gmmt", "intensity"; detected from the file if None.
+    :param cache_dir: Directory of the binary cache (default: $MPB_MOD_CACHE or ~/.cache/mpb/mod).
+    :param use_cache: Read and write the binary cache.
+    :return: CLiFFMap, GMMTMap or IntensityMap instance.
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    cache_filename = None
+    if use_cache:
+        cache_filename = os.path.join(cache_dir, '%s_v%i.npz' % (file_hash(filename), CACHE_VERSION))
+        if os.path.exists(cache_filename):
+            with np.load(cache_filename, allow_pickle=False) as cached:
+                mod_map = MAP_TYPES[str(cached['map_type'])]()
+                for key in cached.files:
+                    if key == 'map_type':
+                        continue
+                    value = cached[key]
+                    setattr(mod_map, key, value.item() if value.ndim == 0 else value)
+            if map_type is None or isinstance(mod_map, MAP_TYPES[map_type]):
+                return mod_map
+
+    if map_type is None:
+        map_type = detect_map_type(filename)
+    if map_type not in MAP_TYPES:
+        raise Exception('Unknown MoD type "%s" (must be one of %s).' % (map_type, ', '.join(MAP_TYPES)))
+    mod_map = MAP_TYPES[map_type]()
+    mod_map.parse(filename)
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_filename = cache_filename + '.tmp.npz'
+        np.savez(tmp_filename, map_type=np.array(map_type), **vars(mod_map))
+        os.replace(tmp_filename, cache_filename)
+    return mod_map
+
+
+def load_cliff_map(filename: str, **kwargs) -> CLiFFMap:
+    return load_mod_map(filename, 'cliff', **kwargs)
+
+
+def load_gmmt_map(filename: str, **kwargs) -> GMMTMap:
+    return load_mod_map(filename, 'gmmt', **kwargs)
+
+
+def load_intensity_map(filename: str, **kwargs) -> IntensityMap:
+    return load_mod_map(filename, 'intensity', **kwargs)
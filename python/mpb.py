@@ -9,12 +9,20 @@ import sys
 import psutil
 import resource
 import json
-from typing import Optional, Union
-from threading import Timer
-from copy import deepcopy
+from typing import Callable, Iterator, Optional, Union
+import asyncio
+from copy import copy, deepcopy
 
 from utils import *
-from multiprocessing import Pool
+from definitions import planner_internal_names, planner_threads
+from results_io import PlanLog, merge_results, compact_results, load_results, externalize_arrays, count_runs, \
+    fill_missing_environments, ResultsWriter
+from executor import AsyncExecutor, BinaryJob, closing, run_coroutine
+from admission import MemoryAdmission, memory_budget
+from result_cache import ResultCache
+from adaptive import StoppingRule
+from racing import RacingRule, RACE_EXTENSION
+from run_layout import evaluations, query_names, run_indices, steer_axis, timed_out_runs
 from tqdm.notebook import tqdm as tqdm_notebook
 from tqdm import tqdm
 
@@ -23,6 +31,8 @@ MPB_BINARY_DIR = '../bin'
 
 # limit memory by this fraction of available memory if activated for parallel MPB execution
 MEMORY_LIMIT_FRACTION = min(0.9, 5. / os.cpu_count())
+# fraction of available memory the jobs of predictive scheduling are packed into
+MEMORY_BUDGET_FRACTION = 0.9
 
 
 class MPB:
@@ -49,6 +59,12 @@ class MPB:
         self.config_filename = config_file  # type: Optional[str]
         self.results_filename = None  # type: Optional[str]
         self.log_filename = None  # type: Optional[str]
+        # store results without whitespace, compressed if compression is set ("gz", "bz2", "xz" or "zst")
+        self.compact_results = False  # type: bool
+        self.compression = None  # type: Optional[str]
+        # ids of the config dictionaries that may be modified in place if the config shares the other
+        # dictionaries with another MPB (copy-on-write overlay, see overlay()), None if nothing is shared
+        self._owned = None  # type: Optional[set]
 
     def __getitem__(self, item: str) -> Union[str, int, float, dict]:
         c = self.config
@@ -60,11 +76,35 @@ class MPB:
         c = self.config
         splits = item.split('.')
         for s in splits[:-1]:
+            if self._owned is not None and id(c[s]) not in self._owned:
+                # copy the shared dictionary before modifying it
+                c[s] = dict(c[s])
+                self._owned.add(id(c[s]))
             c = c[s]
         c[splits[-1]] = value
         self._update_pss()
         return value
 
+    def overlay(self, overrides: dict = None, id: str = None) -> 'MPB':
+        """
+        Returns a copy of this benchmark whose configuration shares all unchanged parts with this one
+        instead of being a deep copy. Setting values on the copy only copies the dictionaries along the
+        modified keys (copy-on-write), so that many variants of a large configuration are cheap.
+        This benchmark must not be modified while the copy is used (nested dictionaries of the copy's
+        config must not be modified directly either, only via mpb[key] = value).
+        :param overrides: Values to set on the copy, keyed by dotted configuration keys.
+        :param id: ID of the copy.
+        """
+        copied = copy(self)
+        copied.config = dict(self.config)
+        # the top-level dictionary is always owned
+        copied._owned = set()
+        copied.id = id
+        for key, value in (overrides or {}).items():
+            copied[key] = value
+        copied._update_pss()
+        return copied
+
     def update(self, config: dict) -> dict:
         for key, value in config.items():
             self[key] = value
@@ -161,6 +201,19 @@ class MPB:
         self["env.goal.y"] = y
         self["env.goal.theta"] = theta
 
+    def set_queries(self, queries: [dict]):
+        """
+        Lets every run evaluate the planners on several start-goal queries in the same environment, instead
+        of the start and goal of the environment settings. The results contain one run per query (and steer
+        function), tagged with the name of the query in the run's "query" field.
+        :param queries: Dictionaries {"name": str, "start": [x, y, theta], "goal": [x, y, theta]}.
+        """
+        self["benchmark.queries"] = [{
+            "name": str(query.get("name", i)),
+            "start": [float(v) for v in query["start"]],
+            "goal": [float(v) for v in query["goal"]]
+        } for i, query in enumerate(queries)]
+
     def set_planners(self, planners: [str]):
         planners = list(
             set(itertools.chain.from_iterable(map(parse_planners, planners))))
@@ -214,12 +267,45 @@ class MPB:
             print("Error: Some smoother could not be unified. Selected smoothers:", self._smoothers,
                   file=sys.stderr)
 
-    def save_settings(self, filename: str):
+    def save_settings(self, filename: str, config: dict = None):
         with open(filename, 'w') as f:
             json.dump({
-                "settings": self.config
+                "settings": self.config if config is None else config
             }, f, indent=2)
 
+    def planner_config(self, planner: str, results_filename: str, reserved_threads: Optional[int] = None) -> dict:
+        """
+        Returns a copy of the configuration that only runs the given planner and logs its results
+        to the given file.
+        :param reserved_threads: Number of cores the planner is restricted to (see
+            AsyncExecutor.reserved_threads). An empty "num_threads" setting is set to it so that the planner
+            does not start more threads than it has cores; otherwise the planner chooses its thread count.
+        """
+        config = deepcopy(self.config)
+        for p in config["benchmark"]["planning"].keys():
+            config["benchmark"]["planning"][p] = p == planner
+        config["benchmark"]["log_file"] = os.path.abspath(results_filename)
+        if reserved_threads is not None and planner in planner_internal_names:
+            settings = config["ompl"]["geometric_planner_settings"].get(planner_internal_names[planner], {})
+            if settings.get("num_threads") == "":
+                settings["num_threads"] = str(reserved_threads)
+        return config
+
+    def planner_threads(self, planner: str) -> int:
+        """
+        Returns the number of threads the given planner uses, i.e. its "num_threads" setting if one is
+        configured, otherwise its entry in definitions.planner_threads (1 for single-threaded planners).
+        """
+        if planner not in planner_internal_names:
+            return 1
+        try:
+            num_threads = self["ompl.geometric_planner_settings.%s.num_threads" % planner_internal_names[planner]]
+            if num_threads not in ("", None):
+                return max(1, int(num_threads))
+        except (KeyError, TypeError, ValueError):
+            pass
+        return planner_threads.get(planner, 1)
+
     def set_id(self, id: str):
         self.id = id
 
@@ -228,7 +314,10 @@ class MPB:
             subfolder, self.id) + "_config.json"
         self.results_filename = os.path.join(
             subfolder, self.id) + "_results.json"
+        # the benchmark binary always writes uncompressed results
         self["benchmark.log_file"] = os.path.abspath(self.results_filename)
+        if self.compression:
+            self.results_filename += '.' + self.compression
 
     @staticmethod
     def get_memory():
@@ -246,7 +335,85 @@ class MPB:
 
     def run(self, id: str = None, runs: Optional[int] = None, subfolder: str = '',
             show_progress_bar: bool = True, shuffle_planners: bool = True,
-            kill_after_timeout: bool = True, silence: bool = False) -> int:
+            kill_after_timeout: bool = True, silence: bool = False,
+            incremental_merge: bool = False, compact: Optional[bool] = None,
+            compression: Optional[str] = None, use_cache: Union[bool, ResultCache] = False,
+            adaptive: Optional[StoppingRule] = None, persistent_workers: bool = False) -> int:
+        """
+        Runs the benchmark binary once per planner and merges the results into one file.
+        :param incremental_merge: Append the plans of each planner to a log and splice them into the
+            results file in a single pass at the end, instead of rewriting the accumulated results
+            file after every planner.
+        :param compact: Store the results without whitespace (overrides self.compact_results).
+        :param compression: Compress the results file, one of "gz", "bz2", "xz", "zst" (overrides
+            self.compression).
+        :param use_cache: Copy the results from the result cache if a benchmark with the same
+            configuration, seeds, binary and map files has been run before, and cache the results
+            otherwise. Either True to use the default ResultCache, or a ResultCache instance.
+        :param adaptive: Run the planners in batches of runs until the confidence intervals of their
+            metrics meet the stopping rule, up to its maximum number of runs (see adaptive.py). The runs
+            are scheduled as independent jobs (see scheduler.py), the result cache is not used.
+        :param persistent_workers: Run the planners one after another on the same binary process in worker
+            mode instead of starting the binary for every planner (see executor.py).
+        """
+        if adaptive is not None:
+            return self._run_adaptive(adaptive, id=id, subfolder=subfolder, show_progress_bar=show_progress_bar,
+                                      kill_after_timeout=kill_after_timeout, silence=silence, compact=compact,
+                                      compression=compression, persistent_workers=persistent_workers)
+        cache = None
+        if isinstance(use_cache, ResultCache):
+            cache = use_cache
+        elif use_cache:
+            cache = ResultCache()
+        executor = AsyncExecutor(1, MPB_BINARY, MPB_BINARY_DIR, persistent=persistent_workers)
+        return run_coroutine(closing(executor, self.run_async(executor, id=id, runs=runs, subfolder=subfolder,
+                                                              show_progress_bar=show_progress_bar,
+                                                              shuffle_planners=shuffle_planners,
+                                                              kill_after_timeout=kill_after_timeout,
+                                                              silence=silence, incremental_merge=incremental_merge,
+                                                              compact=compact, compression=compression,
+                                                              cache=cache)))
+
+    def _run_adaptive(self, adaptive: StoppingRule, id: str = None, subfolder: str = '',
+                      show_progress_bar: bool = True, kill_after_timeout: bool = True, silence: bool = False,
+                      compact: Optional[bool] = None, compression: Optional[str] = None,
+                      persistent_workers: bool = False) -> int:
+        from scheduler import Scheduler, run_benchmarks
+        if compact is not None:
+            self.compact_results = compact
+        if compression is not None:
+            self.compression = compression
+        self["benchmark.runs"] = adaptive.max_runs
+        if not id:
+            id = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d_%H-%M-%S')
+        self.set_id(id)
+        self.set_subfolder(subfolder)
+        if not silence:
+            print("Running MPB with ID %s adaptively (log file at %s)..." % (
+                self.id, os.path.join(subfolder, self.id + ".log")))
+        executor = AsyncExecutor(1, MPB_BINARY, MPB_BINARY_DIR, persistent=persistent_workers)
+        codes = run_coroutine(closing(executor, run_benchmarks([self], Scheduler(executor), subfolder,
+                                                               kill_after_timeout, silence=silence,
+                                                               show_progress_bar=show_progress_bar,
+                                                               adaptive=adaptive)))
+        return codes[0]
+
+    async def run_async(self, executor: AsyncExecutor, id: str = None, runs: Optional[int] = None,
+                        subfolder: str = '', show_progress_bar: bool = True, shuffle_planners: bool = True,
+                        kill_after_timeout: bool = True, silence: bool = False,
+                        incremental_merge: bool = False, compact: Optional[bool] = None,
+                        compression: Optional[str] = None, memory_limit=0,
+                        cache: Optional[ResultCache] = None) -> int:
+        """
+        Coroutine version of `run` which runs the binaries on the given executor, so that one process
+        can run many benchmarks concurrently (see MultipleMPB.run_parallel).
+        :param memory_limit: Tuple (soft, hard) of the address space limit of each binary, or 0.
+        :param cache: Result cache to look up and store the results in.
+        """
+        if compact is not None:
+            self.compact_results = compact
+        if compression is not None:
+            self.compression = compression
         if runs:
             self["benchmark.runs"] = runs
         else:
@@ -257,27 +424,40 @@ class MPB:
                 ts).strftime('%Y-%m-%d_%H-%M-%S')
         self.set_id(id)
         self.set_subfolder(subfolder)
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(self, executor.binary, executor.binary_dir)
+            if cache.fetch(cache_key, self.results_filename, log_file=self["benchmark.log_file"],
+                           compact=self.compact_results):
+                if not silence:
+                    print("Using cached results for MPB with ID %s (%s)." % (self.id, self.results_filename))
+                return 0
+        raw_results_filename = os.path.join(subfolder, self.id) + "_results.json"
         self.log_filename = os.path.join(subfolder, self.id + ".log")
         logfile = open(self.log_filename, 'w+')
         if not silence:
             print("Running MPB with ID %s (log file at %s)..." %
                   (self.id, self.log_filename))
-        num_planners = len(self._planners)
-        total_iterations = num_planners * len(self._steer_functions) * runs
+        planners = list(self._planners)
+        num_planners = len(planners)
+        total_iterations = num_planners * len(self._steer_functions) * runs * len(query_names(self.config))
         if show_progress_bar:
             pbar = tqdm(range(total_iterations), desc=self.id)  # , ncols='100%')
         success = True
+        timed_out = False
         code = 0
         results_filenames = []
         if shuffle_planners:
             # shuffle planners to avoid multiple parallel MPBs run the same heavy-load planners
             # (e.g. CForest takes all available threads, SBPL leaks memory) at the same time
-            random.shuffle(self._planners)
+            random.shuffle(planners)
 
-        for ip, planner in enumerate(self._planners):
-            run = 0
+        plan_log = None
+        if incremental_merge:
+            plan_log = PlanLog(os.path.join(subfolder, self.id + "_results.plans"), raw_results_filename)
 
-            def pbar_prompt():
+        for ip, planner in enumerate(planners):
+            def pbar_prompt(run: int = 0):
                 if not show_progress_bar:
                     return
                 if runs > 1:
@@ -290,59 +470,26 @@ class MPB:
             pbar_prompt()
 
             if ip == 0:
-                results_filename = self.results_filename
+                results_filename = raw_results_filename
             else:
                 results_filename = os.path.join(
                     subfolder, self.id + "_results_%s.json" % planner)
-            self["benchmark.log_file"] = os.path.abspath(results_filename)
-            for p in self["benchmark.planning"].keys():
-                self["benchmark.planning." + p] = p == planner
-            self.save_settings(self.config_filename)
-            tsk = subprocess.Popen([MPB_BINARY, os.path.abspath(self.config_filename)],
-                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                   cwd=os.path.abspath(MPB_BINARY_DIR))
-            proc = psutil.Process(tsk.pid)
-            create_time = time.time()
-            kill_timer = None
-            if kill_after_timeout:
-                # kill process after 2 * max planning time
-                def kill_process():
-                    nonlocal success, code
-                    try:
-                        proc.kill()
-                        print("Killed %s with planner %s after %.2fs exceeded timeout."
-                              % (self.id, planner, time.time() - create_time))
-                        success = False
-                        code = -9
-                    except psutil.NoSuchProcess:
-                        pass
-                    except:
-                        print('Error occurred while trying to kill %s with planner %s.'
-                              % (self.id, planner), file=sys.stderr)
-                        success = False
-                        code = -9
-
-                kill_timer = Timer(
-                    self["max_planning_time"] * self["benchmark.runs"] * 2, kill_process)
-                kill_timer.start()
-            while True:
-                line = tsk.stdout.readline()
-                if line is None:
-                    break
-                line = line.decode('UTF-8')
-                if line == '':
-                    break
+
+            def on_line(line: str, finished_runs: int):
                 if '<stats>' in line:
-                    run += 1
                     # some planner (and its smoothers) has finished
                     if show_progress_bar:
                         pbar.update(1)
-                        pbar_prompt()
+                        pbar_prompt(finished_runs)
                 logfile.write(line)
-            code = tsk.poll()
-            if code is None:
-                code = 0
-            if code is not None and code != 0:
+
+            def on_timeout(run: int):
+                nonlocal timed_out
+                timed_out = True
+
+            code = await self._run_planner(executor, planner, results_filename, kill_after_timeout,
+                                           memory_limit, on_line, on_timeout)
+            if code != 0:
                 print("Error (%i) occurred for MPB with ID %s using planner %s." % (
                     code, self.id, convert_planner_name(planner)),
                       file=sys.stderr)
@@ -350,15 +497,27 @@ class MPB:
                 continue
             if ip > 0:
                 results_filenames.append(results_filename)
-                MPB.merge([self.results_filename, results_filename],
-                          self.results_filename, silence=True)
-            # if show_progress_bar:
-            #     pbar.update(1)
-            if kill_timer is not None:
-                kill_timer.cancel()
+                if plan_log is not None:
+                    plan_log.append(results_filename, silence=True)
+                else:
+                    MPB.merge([raw_results_filename, results_filename],
+                              raw_results_filename, silence=True)
+        if plan_log is not None:
+            plan_log.splice_into(silence=True)
+            plan_log.close()
+        if os.path.exists(raw_results_filename):
+            # runs of the first planner that were killed hold no environment, take it from the other planners
+            fill_missing_environments(raw_results_filename, results_filenames)
+        if (self.compact_results or self.compression) and os.path.exists(raw_results_filename):
+            compact_results(raw_results_filename, self.results_filename)
+            if raw_results_filename != self.results_filename:
+                os.remove(raw_results_filename)
         if show_progress_bar:
             pbar.close()
         logfile.close()
+        if cache_key is not None and success and not timed_out:
+            # results with runs that were killed after their timeout are not cached
+            cache.store(cache_key, self.results_filename)
         # remove partial results files
         for results_filename in results_filenames:
             try:
@@ -368,15 +527,106 @@ class MPB:
                       results_filename, file=sys.stderr)
         return code
 
+    async def _run_planner(self, executor: AsyncExecutor, planner: str, results_filename: str,
+                           kill_after_timeout: bool = True, memory_limit=0,
+                           on_line: Callable[[str, int], None] = None,
+                           on_timeout: Callable[[int], None] = None) -> int:
+        """
+        Runs all runs of a single planner and writes its results to results_filename.
+        With kill_after_timeout, the binary is killed once a single run takes longer than twice the
+        maximum planning time. The runs the binary completed before are kept, the killed run is recorded
+        with failed plans (stats "timed_out": true), and the binary is restarted with the remaining runs.
+        :param on_line: Called with every line the binary prints and the number of finished planner runs.
+        :param on_timeout: Called with the index of every run that was killed after its timeout.
+        :return: Return code of the last binary process (0 if a run was killed but the others succeeded).
+        """
+        axis, steer_functions = steer_axis(self.config)
+        queries = query_names(self.config)
+        total_runs = len(run_indices(self.config))
+        # results the binary writes per run (environment)
+        runs_per_environment = len(steer_functions) * len(queries)
+        plan_name = planner_internal_names.get(planner, planner)
+        segment_filenames = []
+        completed = 0
+        code = 0
+        while completed < total_runs:
+            if completed == 0:
+                segment_filename = results_filename
+            else:
+                segment_filename = "%s.part%i.json" % (os.path.splitext(results_filename)[0], completed)
+            config = self.planner_config(planner, segment_filename,
+                                         executor.reserved_threads(self.planner_threads(planner)))
+            if completed > 0:
+                # continue after the killed run with the environment the binary would have created
+                if config["benchmark"]["moving_ai"]["active"]:
+                    config["benchmark"]["moving_ai"]["start"] += completed
+                else:
+                    config["benchmark"]["runs"] = total_runs - completed
+                    config["env"]["grid"]["seed"] += completed
+            if os.path.exists(segment_filename):
+                os.remove(segment_filename)
+            self.save_settings(self.config_filename, config)
+
+            job = BinaryJob(self.config_filename, label="%s with planner %s" % (self.id, planner),
+                            memory_limit=memory_limit, threads=self.planner_threads(planner),
+                            info={"benchmark": self.id, "planner": planner, "first_run": completed,
+                                  "expected_runs": (total_runs - completed) * runs_per_environment})
+            if kill_after_timeout:
+                # kill process after a run took 2 * max planning time
+                job.run_timeout = self["max_planning_time"] * 2
+            if on_line is not None:
+                offset = completed * runs_per_environment
+                job.on_line = lambda line, job=job, offset=offset: on_line(line, offset + job.runs)
+            code = await executor.run_job(job)
+            if not job.run_timed_out:
+                if code == 0:
+                    segment_filenames.append(segment_filename)
+                break
+            # the binary saves the results after all queries and steer functions of a run have finished
+            saved = 0
+            if os.path.exists(segment_filename):
+                try:
+                    saved = count_runs(segment_filename) // runs_per_environment
+                    segment_filenames.append(segment_filename)
+                except json.JSONDecodeError:
+                    # killed while saving
+                    pass
+            failed_filename = "%s.failed%i.json" % (os.path.splitext(results_filename)[0], completed + saved)
+            with ResultsWriter(failed_filename) as writer:
+                for run in timed_out_runs(config, [plan_name], steer_functions):
+                    writer.write_run(run)
+                writer.header["settings"] = config
+            segment_filenames.append(failed_filename)
+            if on_timeout is not None:
+                on_timeout(completed + saved)
+            completed += saved + 1
+            code = 0
+        if segment_filenames and segment_filenames != [results_filename]:
+            merge_results(segment_filenames, results_filename, make_separate_runs=True, silence=True)
+        for filename in segment_filenames:
+            if filename != results_filename and os.path.exists(filename):
+                os.remove(filename)
+        return code
+
     def print_info(self):
         if not os.path.exists(self.results_filename):
             print("No results file exists for MPB %s." % self.id)
             return
-        with open(self.results_filename, "r") as f:
-            data = json.load(f)
-            run_ids = list(range(len(data["runs"])))
-            for run_id in run_ids:
-                print_run_info(data, run_id, run_ids)
+        data = load_results(self.results_filename, skip_trajectories=True, skip_intermediary=True)
+        run_ids = list(range(len(data["runs"])))
+        for run_id in run_ids:
+            print_run_info(data, run_id, run_ids)
+
+    def externalize_arrays(self, compact: bool = False) -> str:
+        """
+        Moves the trajectories and paths of the results file into a memory-mappable binary sidecar file.
+        :param compact: Rewrite the results file in the compact format.
+        :return: Name of the sidecar file.
+        """
+        if not os.path.exists(self.results_filename):
+            print("No results file exists for MPB %s." % self.id)
+            return None
+        return externalize_arrays(self.results_filename, compact=compact or self.compact_results)
 
     def visualize_trajectories(self, **kwargs):
         if not os.path.exists(self.results_filename):
@@ -412,7 +662,7 @@ class MPB:
         import matplotlib.pyplot as plt
         import json
         import numpy as np
-        data = json.load(open(self.results_filename, "r"))
+        data = load_results(self.results_filename, skip_trajectories=True, skip_intermediary=True)
         for run_id in range(len(data["runs"])):
             plt.figure("Run %i" % run_id)
             planners, total_times, steering_times, collision_times = [], [], [], []
@@ -446,7 +696,7 @@ class MPB:
         for cost_fn in costfns:
             for sampling_fn in sampfns:
                 filename = glob.glob(("{}/{}-{}" + from_pattern).format(folder, cost_fn, sampling_fn))[0]
-                res = json.load(open(filename))
+                res = load_results(filename)
                 res_to_write = deepcopy(res)
                 name_components = filename.split("_")[-2]
                 name_components = name_components[name_components.rfind("/") + 1:]
@@ -487,9 +737,11 @@ class MPB:
 
     @staticmethod
     def merge(mpbs, target_filename: str, make_separate_runs: bool = False, silence: bool = False,
-              plan_names: [str] = None):
+              plan_names: [str] = None, compact: bool = False, deduplicate_environments: bool = False):
         """
         Merges results of the given MPB instances into one file.
+        The target file is compressed if its name ends with .gz, .bz2, .xz or .zst.
+        With deduplicate_environments=True, each distinct environment is stored only once.
         """
         results_filenames = []
         for i, m in enumerate(mpbs):
@@ -502,7 +754,8 @@ class MPB:
                     "MPB.merge requires list of MPB instances or filenames.")
 
         plan_index = 0
-        target = None
+        existing_filenames = []
+        existing_plan_names = []
         for i, m in enumerate(mpbs):
             if results_filenames[i] is None:
                 print("No results file exists for MPB %s. Skipping." % str(m))
@@ -510,61 +763,21 @@ class MPB:
             if not os.path.exists(results_filenames[i]):
                 if not silence:
                     print("No results file exists for MPB %s. Skipping." % str(m))
-                if 'mpb.MPB' in str(type(m)):
-                    plan_index += len(m._planners)
-                continue
-            with open(results_filenames[i]) as res_file:
-                try:
-                    res = json.load(res_file)
-                    if res is None or "runs" not in res:
-                        print("Benchmark %s has empty results file %s. Skipping."
-                              % (str(m), results_filenames[i]), file=sys.stderr)
-                        continue
-                    if i == 0 or target is None:
-                        target = deepcopy(res)
-                        target["runs"] = []
-                    if target is None:
-                        continue
-
-                    # TODO check settings, environments are the same for each run before merging
-                    for run_id, run in enumerate(res["runs"]):
-                        if make_separate_runs:
-                            target["runs"].append(run)
-                            continue
-                        if i == 0:
-                            target["runs"].append(deepcopy(run))
-                            target["runs"][run_id]["plans"] = {}
-
-                        if run_id >= len(target["runs"]) and i != 0:
-                            if not silence:
-                                print("Run #%i does not exist in %s but in %s. Skipping."
-                                      % (run_id, results_filenames[i - 1], results_filenames[i]), file=sys.stderr)
-                        else:
-                            if "plans" not in run or run["plans"] is None:
-                                continue
-                            for pi, (planner, plan) in enumerate(run["plans"].items()):
-                                if plan_names:
-                                    target["runs"][run_id]["plans"][plan_names[plan_index + i]] = plan
-                                    continue
-                                if planner in target["runs"][run_id]["plans"]:
-                                    if not silence:
-                                        print("Planner %s already exists in %s and in %s. Skipping."
-                                              % (planner, results_filenames[i - 1], results_filenames[i]),
-                                              file=sys.stderr)
-                                else:
-                                    target["runs"][run_id]["plans"][planner] = plan
-                except json.decoder.JSONDecodeError:
-                    print("Error while decoding JSON file %s." %
-                          results_filenames[i], file=sys.stderr)
-
+            else:
+                existing_filenames.append(results_filenames[i])
+                if plan_names:
+                    existing_plan_names.append(plan_names[plan_index + i])
             if 'mpb.MPB' in str(type(m)):
                 plan_index += len(m._planners)
 
-        with open(target_filename, "w") as target_file:
-            json.dump(target, target_file, indent=2)
-            if not silence:
-                print("Successfully merged [%s] into %s." % (
-                    ", ".join(results_filenames), target_filename))
+        # inputs are streamed one run at a time, so that memory usage does not grow with the
+        # number and size of the results files
+        merged = merge_results(existing_filenames, target_filename, make_separate_runs=make_separate_runs,
+                               plan_names=existing_plan_names if plan_names else None, compact=compact,
+                               silence=silence, deduplicate=deduplicate_environments)
+        if not silence:
+            print("Successfully merged [%s] into %s." % (
+                ", ".join(merged), target_filename))
         m = MPB()
         m.results_filename = target_filename
         m.set_id(os.path.basename(os.path.splitext(target_filename)[0]))
@@ -575,6 +788,10 @@ class MultipleMPB:
     def __init__(self):
         self.id = None  # type: Optional[str]
         self.benchmarks = []  # type: [MPB]
+        # parameter sweeps whose benchmarks are only created when they are run (see add_sweep)
+        self.sweeps = []  # type: list
+        # results files of the benchmarks of the sweeps, known once they have been run
+        self.sweep_results_filenames = []  # type: [str]
         self.subfolder = ''
 
     def __getitem__(self, item: str, index: int = 0) -> dict:
@@ -583,35 +800,69 @@ class MultipleMPB:
     def __setitem__(self, item: str, value):
         for i in range(len(self.benchmarks)):
             self.benchmarks[i][item] = value
+        for sweep in self.sweeps:
+            sweep.base[item] = value
 
     def update(self, config: dict):
         for m in self.benchmarks:
             m.update(config)
+        for sweep in self.sweeps:
+            sweep.base.update(config)
 
     def merge(self, *args, **kwargs):
-        MPB.merge(self.benchmarks, *args, **kwargs)
+        MPB.merge(self.benchmarks + self.sweep_results_filenames, *args, **kwargs)
+
+    def add_sweep(self, sweep) -> int:
+        """
+        Adds the benchmarks of a parameter sweep (see sweep.Sweep). They are created as copy-on-write
+        overlays of the sweep's base benchmark one at a time while the benchmarks are run, after the
+        benchmarks in self.benchmarks.
+        :return: Number of benchmarks added.
+        """
+        self.sweeps.append(sweep)
+        return len(sweep)
+
+    def iter_benchmarks(self) -> Iterator[MPB]:
+        """
+        Iterates over the benchmarks in self.benchmarks followed by the benchmarks of the sweeps.
+        """
+        yield from self.benchmarks
+        for sweep in self.sweeps:
+            yield from sweep
 
     @staticmethod
-    def run_(arg) -> int:
-        config_filename, index, mpb_id, subfolder, memory_limit, runs, silence = arg
-        if memory_limit != 0:
-            resource.setrlimit(resource.RLIMIT_AS, memory_limit)
-        mpb = MPB(config_file=config_filename)
-        code = mpb.run(id=mpb_id,
-                       runs=runs,
-                       subfolder=subfolder,
-                       show_progress_bar=not silence,
-                       silence=silence)
+    async def run_benchmark(index: int, mpb: MPB, executor: AsyncExecutor, subfolder: str, memory_limit, runs: int,
+                            silence: bool, incremental_merge: bool, compact: bool, compression: Optional[str],
+                            show_progress_bar: bool = None) -> int:
+        """
+        Runs one of the benchmarks on the shared executor.
+        """
+        if show_progress_bar is None:
+            show_progress_bar = not silence
+        try:
+            code = await mpb.run_async(executor,
+                                       id=mpb.id,
+                                       runs=runs,
+                                       subfolder=subfolder,
+                                       show_progress_bar=show_progress_bar,
+                                       silence=silence,
+                                       incremental_merge=incremental_merge,
+                                       compact=compact,
+                                       compression=compression,
+                                       memory_limit=memory_limit)
+        except Exception as e:
+            print("Benchmark %i (%s) failed with exception: %s" % (index, mpb.id, e), file=sys.stderr)
+            return None
         if not silence:
             if code == 0:
                 print("Benchmark %i (%s) finished successfully." %
-                      (index, mpb_id))
+                      (index, mpb.id))
             elif code is not None:
                 print("Benchmark %i (%s) failed. Return code: %i." %
-                      (index, mpb_id, code), file=sys.stderr)
+                      (index, mpb.id, code), file=sys.stderr)
             else:
                 print("Benchmark %i (%s) failed. Unknown return code." %
-                      (index, mpb_id), file=sys.stderr)
+                      (index, mpb.id), file=sys.stderr)
         return code
 
     def run_parallel(self,
@@ -620,15 +871,89 @@ class MultipleMPB:
                      runs: int = 1,
                      silence: bool = False,
                      processes: int = os.cpu_count(),
-                     limit_memory: bool = True,
-                     show_plot: bool = True) -> bool:
+                     limit_memory: Union[bool, str] = True,
+                     show_plot: bool = True,
+                     incremental_merge: bool = False,
+                     compact: bool = False,
+                     compression: Optional[str] = None,
+                     job_granularity: str = 'benchmark',
+                     scheduling: str = 'fifo',
+                     history_filename: str = None,
+                     pin_cpus: bool = True,
+                     resume: bool = False,
+                     job_queue: Optional[str] = None,
+                     show_progress: bool = True,
+                     adaptive: Optional[StoppingRule] = None,
+                     racing: Optional[RacingRule] = None,
+                     persistent_workers: bool = False) -> bool:
+        """
+        Runs all benchmarks in parallel.
+        :param job_granularity: "benchmark" runs the planners of each benchmark one after another,
+            "run" decomposes the benchmarks into independent (planner, steer function, run) jobs with
+            deterministic seeds that share the processes (see scheduler.py).
+        :param scheduling: "fifo" starts the jobs in order, "predictive" starts the jobs with the longest
+            predicted wall time first and packs them within the available memory, based on the
+            measurements of previous jobs (implies job_granularity="run").
+        :param history_filename: File of the wall time and memory measurements used by predictive
+            scheduling (default: history.HISTORY_FILENAME in the working directory).
+        :param limit_memory: If True, processes are only started while the resident memory of all processes
+            stays within MEMORY_BUDGET_FRACTION of the available memory (and the container's memory limit),
+            and the largest process is stopped and retried later if they exceed it (see admission.py).
+            "address_space" instead limits the address space of each process to MEMORY_LIMIT_FRACTION of
+            the available memory.
+        :param processes: Number of cores the benchmark processes share. Multi-threaded planners reserve
+            as many cores as they use threads (see definitions.planner_threads), so fewer processes
+            run at the same time while they do.
+        :param pin_cpus: Pin every process to the CPUs of its reserved cores so that the timings of
+            processes running at the same time do not interfere.
+        :param resume: Resume the sweep with the given ID: the jobs recorded as completed in its checkpoint
+            manifest (<id>_checkpoint.jsonl, written by job_granularity="run") are skipped and only the
+            missing ones run before the results are merged (implies job_granularity="run").
+        :param job_queue: Directory of a job queue shared with other machines (see job_queue.py). The jobs
+            are put into the queue, workers on any machine run them (`python job_queue.py <job_queue>`),
+            and the results of each benchmark are assembled as soon as its jobs are done. This process
+            works on the queue with the given number of processes as well (0 to only coordinate).
+        :param show_progress: Show the progress of the whole sweep (finished planner runs, running and
+            failed jobs, remaining time) in a single progress bar, also if silence is True. The progress
+            events are written to <id>_events.jsonl in any case (see events.py).
+        :param adaptive: Run the planners of every benchmark in batches of runs until the confidence
+            intervals of their metrics meet the stopping rule, up to its maximum number of runs, which
+            replaces `runs` (see adaptive.py; implies job_granularity="run").
+        :param racing: Race the planners of every benchmark run by run on the same environments and seeds,
+            and stop running the planners that are significantly worse than the best one on the objective
+            of the rule, up to `runs` rounds (see racing.py; implies job_granularity="run"). Where each
+            planner was eliminated is saved to <id>_race.json.
+        :param persistent_workers: Keep the benchmark binaries running in worker mode and stream the job
+            configurations to them, instead of starting the binary for every job (see executor.py). This
+            saves the start-up of the binary and the loading of environments from files, which dominate
+            the wall time of jobs with short planning times.
+        """
+        if resume:
+            if not id:
+                raise Exception("The ID of the sweep to resume has to be given.")
+            job_granularity = 'run'
+        if adaptive is not None:
+            if job_queue is not None:
+                raise Exception("Adaptive runs are not supported with a job queue.")
+            runs = adaptive.max_runs
+            job_granularity = 'run'
+        if racing is not None:
+            if job_queue is not None:
+                raise Exception("Racing is not supported with a job queue.")
+            job_granularity = 'run'
         memory_limit = 0
-        if limit_memory:
+        admission = None
+        if limit_memory == 'address_space':
             print("Available memory: %.2f GB, limiting each MPB process to %.1f%% usage (%.2f GB)." %
                   (MPB.get_memory() / 1e6, MEMORY_LIMIT_FRACTION * 100, MPB.get_memory() / 1e6 * MEMORY_LIMIT_FRACTION))
             soft, hard = resource.getrlimit(resource.RLIMIT_AS)
             memory_limit = (MPB.get_memory() * 1024 *
                             MEMORY_LIMIT_FRACTION, hard)
+        elif limit_memory:
+            budget = memory_budget(MPB.get_memory() * 1024, MEMORY_BUDGET_FRACTION)
+            print("Available memory: %.2f GB, running processes within a memory budget of %.2f GB." %
+                  (MPB.get_memory() / 1e6, budget / 1e9))
+            admission = MemoryAdmission(budget)
 
         self["benchmark.runs"] = runs
         ts = time.time()
@@ -642,90 +967,155 @@ class MultipleMPB:
                 os.mkdir(self.id)
             self.subfolder = self.id
 
-        ids = []
-        config_files = []
-        log_files = []
-        subfolder_id = os.path.join(self.subfolder, self.id)
-        for i, mpb in enumerate(self.benchmarks):
+        def prepare(i: int, mpb: MPB) -> MPB:
             if mpb.id is None:
-                filename = "%s_%i_config.json" % (subfolder_id, i)
                 mpb.set_id("%s_%i" % (self.id, i))
-                log_files.append("%s_%i.log" % (subfolder_id, i))
-            else:
-                filename = os.path.join(
-                    self.subfolder, mpb.id + "_config.json")
-                log_files.append(os.path.join(self.subfolder, mpb.id + ".log"))
-            mpb.save_settings(filename)
-            config_files.append(filename)
-            ids.append(mpb.id)
+            mpb.compact_results = compact
+            mpb.compression = compression
+            mpb["benchmark.runs"] = runs
             mpb.set_subfolder(self.id if use_subfolder else '')
-        processes = min(processes, len(self.benchmarks))
-        print("Creating pool of %i processes." % processes)
-        sys.stdout.flush()
-        with Pool(processes) as pool:
-            results = pool.map(MultipleMPB.run_,
-                               zip(config_files,
-                                   range(len(self.benchmarks)),
-                                   ids,
-                                   [self.subfolder] * len(self.benchmarks),
-                                   [memory_limit] * len(self.benchmarks),
-                                   [runs] * len(self.benchmarks),
-                                   [silence] * len(self.benchmarks)))
-
-            if show_plot:
-                try:
-                    import matplotlib.pyplot as plt
-                    from plot_aggregate import plot_aggregate_stats
-                    from utils import get_aggregate_stats
-                    f, (a0, a1) = plt.subplots(1, 2, gridspec_kw={
-                        'width_ratios': [1, 4]}, figsize=(10, 3))
-                    plt.title(self.id, loc="left", fontweight="bold")
-                    plt.title(str(datetime.datetime.now()), loc="right")
-                    counts = {}
-                    known_codes = {
-                        -9: "timeout",
-                        0: "success"
-                    }
-                    for code in results:
-                        if code is None:
-                            code_name = "unknown error"
-                        else:
-                            code_name = known_codes.get(
-                                code, "error %d" % code)
-                        counts[code_name] = counts.get(code_name, 0) + 1
-                    total = sum(counts.values())
-                    a0.pie(list(counts.values()), labels=list(counts.keys()),
-                           autopct=lambda p: '{:.0f}'.format(p * total / 100))
-
-                    aggregate = get_aggregate_stats(
-                        [m.results_filename for m in self.benchmarks])
-                    plot_aggregate_stats(a1,
-                                         aggregate["total"],
-                                         aggregate["found"],
-                                         aggregate["collision_free"],
-                                         aggregate["exact"],
-                                         show_aggregate_title=False)
-                    plt.tight_layout()
-                    plt.subplots_adjust(0., 0.1, 1, 0.9, 0.3, 0.4)
-                except Exception as e:
-                    print(
-                        "Error while plotting benchmark progress overview:", e, file=sys.stderr)
-
-            if all([r == 0 for r in results]):
-                print("All benchmarks succeeded.")
+            return mpb
+
+        def benchmarks() -> Iterator[MPB]:
+            # the benchmarks of sweeps are created one at a time when they are scheduled
+            for i, mpb in enumerate(self.iter_benchmarks()):
+                mpb = prepare(i, mpb)
+                mpb.save_settings(os.path.join(self.subfolder, mpb.id + "_config.json"))
+                yield mpb
+
+        # IDs, results files and number of planner runs of all benchmarks, without keeping the benchmarks
+        # of the sweeps
+        descriptions = [(m.id, m.results_filename, len(m._planners) * evaluations(m.config))
+                        for m in (prepare(i, m) for i, m in enumerate(self.iter_benchmarks()))]
+        ids = [id for id, _, _ in descriptions]
+        log_files = [os.path.join(self.subfolder, id + ".log") for id in ids]
+        results_filenames = [filename for _, filename, _ in descriptions]
+        total = sum(evaluations for _, _, evaluations in descriptions)
+        self.sweep_results_filenames = results_filenames[len(self.benchmarks):]
+
+        from events import EventLog, ProgressView, EVENTS_EXTENSION
+        progress = ProgressView(desc=self.id) if show_progress else None
+        events = EventLog(os.path.join(self.subfolder, self.id + EVENTS_EXTENSION),
+                          [progress] if progress is not None else [])
+        events.emit("sweep_started", id=self.id, benchmarks=ids, total=total)
+        # the sweep's progress bar replaces the progress bars of the benchmarks and jobs
+        show_progress_bar = not silence and not show_progress
+        if job_queue is not None:
+            from job_queue import FileJobQueue, distribute
+            executor = None
+            if processes > 0:
+                executor = AsyncExecutor(processes, MPB_BINARY, MPB_BINARY_DIR, admission, pin_cpus,
+                                         persistent=persistent_workers)
+            results = run_coroutine(closing(executor, distribute(list(benchmarks()), FileJobQueue(job_queue),
+                                                                 self.subfolder, executor, silence=silence,
+                                                                 show_progress_bar=show_progress_bar,
+                                                                 events=events)))
+        elif job_granularity == 'run' or scheduling == 'predictive':
+            from scheduler import Scheduler, PredictiveScheduler, run_benchmarks
+            from checkpoint import CheckpointManifest, CHECKPOINT_EXTENSION
+            checkpoint = CheckpointManifest(os.path.join(self.subfolder, self.id + CHECKPOINT_EXTENSION), resume)
+            print("Running up to %i benchmark processes." % processes)
+            sys.stdout.flush()
+            executor = AsyncExecutor(processes, MPB_BINARY, MPB_BINARY_DIR, admission, pin_cpus, events,
+                                     persistent_workers)
+            if scheduling == 'predictive':
+                from history import RuntimeHistory, HISTORY_FILENAME
+                history = RuntimeHistory(history_filename or HISTORY_FILENAME)
+                scheduler = PredictiveScheduler(executor, history, memory_budget=memory_budget(
+                    MPB.get_memory() * 1024, MEMORY_BUDGET_FRACTION))
             else:
-                print("Error(s) occurred, not all benchmarks succeeded.",
-                      file=sys.stderr)
-                for i, code in enumerate(results):
-                    if code == 0:
-                        continue
-                    elif code is None:
-                        print("Benchmark %i failed with unknown return code. See log file %s."
-                              % (i, log_files[i]), file=sys.stderr)
+                scheduler = Scheduler(executor)
+            results = run_coroutine(closing(executor, run_benchmarks(
+                list(benchmarks()), scheduler, self.subfolder, memory_limit=memory_limit, silence=silence,
+                show_progress_bar=show_progress_bar, checkpoint=checkpoint, resume=resume, adaptive=adaptive,
+                racing=racing, race_filename=os.path.join(self.subfolder, self.id + RACE_EXTENSION))))
+        else:
+            print("Running up to %i benchmark processes." % min(processes, len(ids)))
+            sys.stdout.flush()
+            # a single coordinator runs the benchmark binaries of all MPBs as asyncio subprocesses
+            executor = AsyncExecutor(processes, MPB_BINARY, MPB_BINARY_DIR, admission, pin_cpus, events,
+                                     persistent_workers)
+
+            async def run_all():
+                # only as many benchmarks as processes are started at a time, so that the benchmarks of
+                # sweeps are created when the executor can run them
+                codes = [None] * len(ids)
+                running = {}
+
+                async def collect(return_when: str):
+                    done, _ = await asyncio.wait(running.keys(), return_when=return_when)
+                    for finished in done:
+                        codes[running.pop(finished)] = finished.result()
+
+                for i, mpb in enumerate(benchmarks()):
+                    running[asyncio.ensure_future(MultipleMPB.run_benchmark(
+                        i, mpb, executor, self.subfolder, memory_limit, runs, silence, incremental_merge, compact,
+                        compression, show_progress_bar))] = i
+                    if len(running) >= max(1, processes):
+                        await collect(asyncio.FIRST_COMPLETED)
+                if running:
+                    await collect(asyncio.ALL_COMPLETED)
+                return codes
+
+            results = run_coroutine(closing(executor, run_all()))
+        events.emit("sweep_finished", id=self.id, codes=results)
+        events.close()
+        if progress is not None:
+            progress.close()
+        if show_plot:
+            try:
+                import matplotlib.pyplot as plt
+                from plot_aggregate import plot_aggregate_stats
+                from utils import get_aggregate_stats
+                f, (a0, a1) = plt.subplots(1, 2, gridspec_kw={
+                    'width_ratios': [1, 4]}, figsize=(10, 3))
+                plt.title(self.id, loc="left", fontweight="bold")
+                plt.title(str(datetime.datetime.now()), loc="right")
+                counts = {}
+                known_codes = {
+                    -9: "timeout",
+                    -15: "memory budget",
+                    0: "success"
+                }
+                for code in results:
+                    if code is None:
+                        code_name = "unknown error"
                     else:
-                        print("Benchmark %i failed with return code %i. See log file %s."
-                              % (i, code, log_files[i]), file=sys.stderr)
-                return False
+                        code_name = known_codes.get(
+                            code, "error %d" % code)
+                    counts[code_name] = counts.get(code_name, 0) + 1
+                total = sum(counts.values())
+                a0.pie(list(counts.values()), labels=list(counts.keys()),
+                       autopct=lambda p: '{:.0f}'.format(p * total / 100))
+
+                aggregate = get_aggregate_stats(results_filenames)
+                plot_aggregate_stats(a1,
+                                     aggregate["total"],
+                                     aggregate["found"],
+                                     aggregate["collision_free"],
+                                     aggregate["exact"],
+                                     show_aggregate_title=False)
+                plt.tight_layout()
+                plt.subplots_adjust(0., 0.1, 1, 0.9, 0.3, 0.4)
+            except Exception as e:
+                print(
+                    "Error while plotting benchmark progress overview:", e, file=sys.stderr)
+
+        if all([r == 0 for r in results]):
+            print("All benchmarks succeeded.")
+        else:
+            print("Error(s) occurred, not all benchmarks succeeded.",
+                  file=sys.stderr)
+            for i, code in enumerate(results):
+                if code == 0:
+                    continue
+                elif code is None:
+                    print("Benchmark %i failed with unknown return code. See log file %s."
+                          % (i, log_files[i]), file=sys.stderr)
+                else:
+                    print("Benchmark %i failed with return code %i. See log file %s."
+                          % (i, code, log_files[i]), file=sys.stderr)
+            return False
         return True
 
     def visualize_trajectories(self, **kwargs):
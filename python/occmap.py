@@ -1,7 +1,52 @@
 import yaml
 from matplotlib import image as mimage
 from matplotlib import pyplot as plotty
+import hashlib
+import math
 import os
+import numpy as np
+
+# directory of the memory-mapped decoded images (see OccMap.load)
+CACHE_DIR = os.environ.get('MPB_OCCMAP_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'mpb', 'occmap'))
+
+# decoded maps of this process, keyed by (yaml path, yaml mtime, image mtime)
+_loaded = {}
+
+
+def _cached_image(image_filename: str) -> np.ndarray:
+    """
+    Returns the decoded image, memory-mapped from the on-disk cache if the image has been decoded before.
+    """
+    key = '%s:%f' % (os.path.abspath(image_filename), os.path.getmtime(image_filename))
+    cache_filename = os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + '.npy')
+    if os.path.exists(cache_filename):
+        try:
+            return np.load(cache_filename, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+    image = mimage.imread(image_filename)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_filename = cache_filename + '.tmp.npy'
+        np.save(tmp_filename, image)
+        os.replace(tmp_filename, cache_filename)
+    except OSError:
+        return image
+    return np.load(cache_filename, mmap_mode='r')
+
+
+def _downsample(image: np.ndarray) -> np.ndarray:
+    """
+    Halves the resolution of an image by averaging blocks of 2x2 pixels.
+    """
+    h, w = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    if h == 0 or w == 0:
+        return image
+    blocks = np.asarray(image[:h, :w], dtype=np.float32)
+    blocks = (blocks[0::2, 0::2] + blocks[1::2, 0::2] + blocks[0::2, 1::2] + blocks[1::2, 1::2]) / 4
+    if np.issubdtype(image.dtype, np.integer):
+        return np.round(blocks).astype(image.dtype)
+    return blocks.astype(image.dtype)
 
 
 class OccMap:
@@ -15,16 +60,31 @@ class OccMap:
         self.y_min = 0.0
         self.x_max = 0.0
         self.y_max = 0.0
-        
-    def load(self, map_yaml_filename):
+        # resolution pyramid, level i is downsampled by a factor of 2^i (level 0 is the image itself)
+        self.levels = []
+
+    def load(self, map_yaml_filename, use_cache=True):
+        """
+        Loads the map described by a YAML file. Decoded maps are shared within the process and the decoded
+        image is memory-mapped from a cache on disk, both keyed by the file paths and modification times.
+        """
         if not isinstance(map_yaml_filename, str):
             print("yamlToOccMapMsg needs a yaml file name as a string. Please provide the right parameters.")
 
-        occmap_file_object = open(map_yaml_filename, 'r+')
-        yaml_dict = yaml.load(occmap_file_object, Loader=yaml.CLoader)
+        key = None
+        if use_cache:
+            key = (os.path.abspath(map_yaml_filename), os.path.getmtime(map_yaml_filename))
+            if key in _loaded and os.path.getmtime(_loaded[key].image_path) == _loaded[key].image_mtime:
+                self.__dict__.update(_loaded[key].__dict__)
+                return
+
+        with open(map_yaml_filename, 'r') as occmap_file_object:
+            yaml_dict = yaml.load(occmap_file_object, Loader=yaml.CLoader)
 
         self.image_file_name = yaml_dict['image']
-        self.image = mimage.imread(map_yaml_filename[:map_yaml_filename.rfind(os.path.sep)] + os.path.sep + self.image_file_name)
+        image_path = os.path.join(os.path.dirname(map_yaml_filename), self.image_file_name)
+        self.image = _cached_image(image_path) if use_cache else mimage.imread(image_path)
+        self.levels = [self.image]
         self.resolution = yaml_dict['resolution']
         self.origin_x = yaml_dict['origin'][0]
         self.origin_y = yaml_dict['origin'][1]
@@ -36,12 +96,43 @@ class OccMap:
         self.y_max = self.origin_y + (
                 self.image.shape[0] * self.resolution) + 1.0
 
-    def plot(self, axis=None, alpha=1.0):
+        if key is not None:
+            self.image_path = image_path
+            self.image_mtime = os.path.getmtime(image_path)
+            _loaded[key] = self
+
+    def level(self, level: int) -> np.ndarray:
+        """
+        Returns the image at the given level of the resolution pyramid, computing missing levels on demand.
+        """
+        if len(self.levels) == 0:
+            self.levels = [self.image]
+        while len(self.levels) <= level:
+            self.levels.append(_downsample(self.levels[-1]))
+        return self.levels[level]
+
+    def level_for_width(self, width_pixels: float) -> int:
+        """
+        Returns the coarsest pyramid level whose image is at least the given number of pixels wide.
+        """
+        if width_pixels is None or width_pixels <= 0:
+            return 0
+        return max(0, int(math.floor(math.log2(self.image.shape[1] / width_pixels))))
+
+    def plot(self, axis=None, alpha=1.0, level=None):
+        """
+        Plots the map. By default, the pyramid level is chosen to match the width of the axis in pixels
+        instead of rendering the full-resolution image.
+        """
+        ax = axis if axis is not None else plotty.gca()
+        if level is None:
+            level = self.level_for_width(ax.get_window_extent().width)
+        image = self.level(level)
         if axis is not None:
-            axis.imshow(self.image, extent=[self.x_min, self.x_max, self.y_min, self.y_max], cmap='gray', alpha=alpha)
+            axis.imshow(image, extent=[self.x_min, self.x_max, self.y_min, self.y_max], cmap='gray', alpha=alpha)
             axis.set_xlim([self.x_min, self.x_max])
             axis.set_ylim([self.y_min, self.y_max])
         else:
-            plotty.imshow(self.image, extent=[self.x_min, self.x_max, self.y_min, self.y_max], cmap='gray', alpha=alpha)
+            plotty.imshow(image, extent=[self.x_min, self.x_max, self.y_min, self.y_max], cmap='gray', alpha=alpha)
             plotty.xlim([self.x_min, self.x_max])
-            plotty.ylim([self.y_min, self.y_max])
\ No newline at end of file
+            plotty.ylim([self.y_min, self.y_max])
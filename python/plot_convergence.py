@@ -7,6 +7,7 @@ import sys
 from color import get_color
 
 from utils import group, parse_metrics, parse_run_ids, print_run_info
+from results_io import load_results
 from definitions import stat_names
 
 
@@ -45,9 +46,7 @@ def plot_convergence(json_file: str, run_id: str = 'all',
     mpl.rcParams['mathtext.fontset'] = 'cm'
     mpl.rcParams['pdf.fonttype'] = 42  # make sure to not use Level-3 fonts
 
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     if combine_views:
@@ -5,9 +5,10 @@ import math
 import click
 import json
 import sys
-from bitarray import bitarray
+from functools import lru_cache
 
 from utils import add_options
+from results_io import load_results, SHARED_ENVIRONMENT_KEY
 
 plot_env_options = [
     click.option('--show_distances', default=False, type=bool),
@@ -17,6 +18,40 @@ plot_env_options = [
 ]
 
 
+# decoded grid maps of shared environments, keyed by their content hash
+_grid_maps = {}
+
+
+@lru_cache(maxsize=32)
+def decode_map(map_string: str, width: int, height: int) -> np.ndarray:
+    """
+    Decodes the bit string of a grid map ("0" free, "1" occupied) into a read-only uint8 array of
+    shape (height, width) without creating a Python object per cell.
+    """
+    map_data = np.frombuffer(map_string.encode('ascii'), dtype=np.uint8)
+    if map_data.size != width * height:
+        # drop separators such as whitespace
+        map_data = map_data[(map_data == ord('0')) | (map_data == ord('1'))]
+    map_data = (map_data - ord('0')).reshape((height, width))
+    map_data.flags.writeable = False
+    return map_data
+
+
+def grid_map(env) -> np.ndarray:
+    """
+    Returns the occupancy grid of a grid environment as an array of shape (height, width).
+    Decoded maps are memoized, maps of shared environments (see results_io.deduplicate_environments)
+    by their content hash.
+    """
+    key = env.get(SHARED_ENVIRONMENT_KEY)
+    if key is not None and key in _grid_maps:
+        return _grid_maps[key]
+    map_data = decode_map(env["map"], env["width"], env["height"])
+    if key is not None:
+        _grid_maps[key] = map_data
+    return map_data
+
+
 @add_options(plot_env_options)
 def plot_env(env, run_id: int = -1, colors=('b', 'r'),
              draw_start_goal=True, draw_start_goal_thetas=False,
@@ -71,7 +106,7 @@ def plot_env(env, run_id: int = -1, colors=('b', 'r'),
                 click.echo(map_data)
                 click.echo("Maximum distance:", map_data.max())
                 plt.imshow(np.flip(map_data, axis=0), cmap='jet', vmin=0, vmax=map_data.max(), extent=[0, w, 0, h])
-        map_data = np.array(list(bitarray(env["map"]))).reshape((h, w))
+        map_data = grid_map(env)
         map_data = 1. - np.flip(map_data, axis=0)
         plt.imshow(map_data, cmap='gray', vmin=-1, vmax=1, extent=[0, w, 0, h], alpha=0.5)
         ax.set_xlim([0, w])
@@ -152,7 +187,7 @@ def main(json_file: str, run_id: str, draw_start_goal=True, draw_start_goal_thet
         matplotlib.use('Agg')
     import matplotlib.pyplot as plt
 
-    data = json.load(open(json_file, 'r'))
+    data = load_results(json_file, skip_trajectories=True, skip_intermediary=True)
     if run_id.lower() == "all":
         run_ids = list(range(len(data["runs"])))
     else:
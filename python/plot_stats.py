@@ -11,6 +11,7 @@ from utils import group, parse_metrics, parse_run_ids, print_run_info, parse_pla
     convert_planner_name, show_legend
 from definitions import stat_names, smoothers, smoother_names
 from plot_aggregate import plot_aggregate, plot_smoother_aggregate
+from results_io import load_results
 
 
 @group.command()
@@ -75,9 +76,7 @@ def plot_planner_stats(json_file: str,
         click.echo('Ignoring the following planner(s): %s' %
                    ', '.join(ignore_planners))
 
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file, skip_trajectories=True, skip_intermediary=True)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     if combine_views:
@@ -245,7 +244,7 @@ def plot_smoother_stats(json_file: str,
         click.echo('Ignoring the following smoother(s): %s' %
                    ', '.join(ignore_smoothers))
 
-    data = json.load(open(json_file, "r"))
+    data = load_results(json_file, skip_trajectories=True, skip_intermediary=True)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     if combine_views:
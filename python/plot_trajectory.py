@@ -24,7 +24,7 @@ def plot_trajectory(traj, planner: str, settings, color, add_label=True, alpha:
     planner = convert_planner_name(planner)
     if traj is None or len(traj) == 0:
         return
-    traj = np.array(traj)
+    traj = np.asarray(traj)
     if settings["env"]["collision"]["collision_model"] == 0:
         # point collision model
         if add_label:
@@ -67,7 +67,7 @@ def plot_nodes(traj, planner: str, settings, color, node_alpha: float = 1., sile
         if not silence:
             click.echo("Planner %s found no solution!" % planner)
         return
-    traj = np.array(traj)
+    traj = np.asarray(traj)
     if draw_arrows:
         import math
         for i in range(traj.shape[0]):
@@ -9,6 +9,7 @@ from plot_trajectory import plot_trajectory, plot_nodes, plot_trajectory_options
 from color import get_color, get_colors, color_options
 
 from utils import add_options, group, parse_run_ids, parse_planners, print_run_info, convert_planner_name
+from results_io import load_results
 
 
 @group.command()
@@ -70,9 +71,7 @@ def visualize_traj_convergence(json_file: str, run_id: str = 'all',
 
     planners = parse_planners(planners)
 
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     if combine_views:
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Racing of planners (F-Race).
+
+The planners of every benchmark are evaluated round by round, where a round is one run index (the same
+environment and seeds for all planners) with all steer functions and start-goal queries, each of which is
+a block of the test. Once a race has run its minimum number of rounds, the Friedman test is applied to
+the ranks of the planners on the objective after every round.
+If the planners differ significantly, every planner whose rank sum is significantly worse than that of the
+best planner (Conover's post-hoc test) is eliminated and none of its further runs are started. The race of
+a benchmark ends when a single planner is left or all runs have been evaluated.
+
+Reference: M. Birattari, T. Stützle, L. Paquete, K. Varrentrapp. A Racing Algorithm for Configuring
+Metaheuristics. GECCO 2002.
+"""
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from scipy import stats
+
+from results_io import iter_runs
+from utils import convert_planner_name
+
+RACE_EXTENSION = '_race.json'
+
+
+def friedman_eliminate(blocks: [[float]], alpha: float = 0.05) -> ([int], float):
+    """
+    Applies the Friedman test to the blocks (the objective of every candidate per block, lower is better)
+    and, if the candidates differ significantly, Conover's post-hoc test against the best candidate.
+    :return: Indices of the candidates that are significantly worse than the best one, and the p-value
+        of the Friedman test.
+    """
+    n = len(blocks)
+    k = len(blocks[0]) if blocks else 0
+    if n < 2 or k < 2:
+        return [], 1.
+    # ranks within every block, tied values get their mean rank
+    ranks = np.array([stats.rankdata(block) for block in blocks])
+    rank_sums = ranks.sum(axis=0)
+    a = (ranks ** 2).sum()
+    c = n * k * (k + 1) ** 2 / 4.
+    if a - c <= 0:
+        # all candidates are tied in every block
+        return [], 1.
+    statistic = (k - 1) * ((rank_sums - n * (k + 1) / 2.) ** 2).sum() / (a - c)
+    p_value = float(stats.chi2.sf(statistic, k - 1))
+    if p_value >= alpha:
+        return [], p_value
+    # Conover's post-hoc test of every candidate against the best one
+    best = int(np.argmin(rank_sums))
+    df = (n - 1) * (k - 1)
+    scale = math.sqrt(2 * n * (1 - statistic / (n * (k - 1))) * (a - c) / df)
+    critical = stats.t.ppf(1 - alpha / 2, df)
+    worse = []
+    for j in range(k):
+        if j != best and (scale == 0 or abs(rank_sums[j] - rank_sums[best]) / scale > critical):
+            worse.append(j)
+    return worse, p_value
+
+
+class RacingRule:
+    def __init__(self, objective: str = "path_length", maximize: bool = False, min_rounds: int = 5,
+                 alpha: float = 0.05):
+        """
+        :param objective: Key of the plan stats the planners are ranked by. Plans that did not find a path
+            (or whose job failed) are ranked worst.
+        :param maximize: Whether larger values of the objective are better.
+        :param min_rounds: Number of rounds before the first test.
+        :param alpha: Significance level of the Friedman and post-hoc tests.
+        """
+        self.objective = objective  # type: str
+        self.maximize = maximize  # type: bool
+        self.min_rounds = max(2, min_rounds)  # type: int
+        self.alpha = alpha  # type: float
+
+    def value(self, stats: dict) -> float:
+        if not stats.get("path_found", False) or stats.get(self.objective) is None:
+            return math.inf
+        value = float(stats[self.objective])
+        return -value if self.maximize else value
+
+
+class Race:
+    def __init__(self, rule: RacingRule, jobs: list):
+        """
+        Decides which jobs (see scheduler.PlannerJob) of the run-granularity scheduler are started: the jobs
+        of every benchmark are released round by round (run index by run index) for the planners that have
+        not been eliminated yet. The jobs of eliminated planners are dropped.
+        """
+        self.rule = rule  # type: RacingRule
+        self.races = {}  # type: {str: dict}
+        for job in jobs:
+            race = self.races.get(job.mpb.id)
+            if race is None:
+                race = self.races[job.mpb.id] = {"mpb": job.mpb, "rounds": {}, "planners": [], "released": 0,
+                                                 "pending": 0, "values": {}, "eliminated": {}, "p_values": []}
+            race["rounds"].setdefault(job.run, []).append(job)
+            if job.planner not in race["planners"]:
+                race["planners"].append(job.planner)
+        for race in self.races.values():
+            race["order"] = sorted(race["rounds"].keys())
+            race["alive"] = list(race["planners"])
+
+    @staticmethod
+    def key(job) -> tuple:
+        return job.mpb.id, job.planner, job.steer_function
+
+    def _release(self, race: dict, rounds: int) -> list:
+        jobs = []
+        for run in race["order"][race["released"]:race["released"] + rounds]:
+            jobs += [job for job in race["rounds"][run] if job.planner in race["alive"]]
+            race["released"] += 1
+        race["pending"] += len(jobs)
+        return jobs
+
+    def initial(self) -> list:
+        """
+        Returns the jobs of the first rounds of every race, which run before the first test.
+        """
+        jobs = []
+        for race in self.races.values():
+            jobs += self._release(race, self.rule.min_rounds)
+        return jobs
+
+    def _record(self, race: dict, job):
+        # objective per start-goal query (None if the benchmark has no queries)
+        values = {}
+        if job.code == 0 and os.path.exists(job.results_filename):
+            for _, run in iter_runs(job.results_filename, skip_trajectories=True, skip_intermediary=True):
+                for plan in (run.get("plans") or {}).values():
+                    values[run.get("query")] = self.rule.value(plan.get("stats") or {})
+        race["values"][(job.run, job.steer_function, job.planner)] = values
+
+    def _test(self, race: dict) -> [str]:
+        """
+        Applies the test to the finished rounds of the planners that are still racing. Every start-goal query
+        of a round is a separate block, plans missing from a block (e.g. of failed jobs) are ranked worst.
+        :return: The eliminated planners.
+        """
+        alive = race["alive"]
+        blocks = []
+        for run in race["order"][:race["released"]]:
+            steer_functions = sorted(set(job.steer_function for job in race["rounds"][run]), key=str)
+            for steer_function in steer_functions:
+                values = [race["values"].get((run, steer_function, planner), {}) for planner in alive]
+                queries = sorted(set(query for v in values for query in v.keys()), key=str)
+                for query in queries:
+                    blocks.append([v.get(query, math.inf) for v in values])
+        worse, p_value = friedman_eliminate(blocks, alpha=self.rule.alpha)
+        race["p_values"].append(p_value)
+        return [alive[j] for j in worse]
+
+    def finished(self, job) -> (list, list):
+        """
+        Records the objective of a finished job. Once all jobs of the released rounds of its benchmark have
+        finished, the planners are tested and the next round is released for the remaining planners.
+        :return: Tuple of the released and the dropped jobs.
+        """
+        race = self.races[job.mpb.id]
+        race["pending"] -= 1
+        self._record(race, job)
+        if race["pending"] > 0:
+            return [], []
+        rounds = race["released"]
+        eliminated = self._test(race) if len(race["alive"]) > 1 else []
+        for planner in eliminated:
+            race["eliminated"][planner] = rounds
+            race["alive"].remove(planner)
+        if rounds < len(race["order"]) and len(race["alive"]) > 1:
+            released = self._release(race, 1)
+        else:
+            released = []
+        # the remaining rounds of eliminated planners, or of all planners once the race has ended
+        dropped = []
+        for run in race["order"][rounds:]:
+            for other in race["rounds"][run]:
+                if other.planner in eliminated or (not released and other.planner in race["alive"]):
+                    dropped.append(other)
+        for other in dropped:
+            race["rounds"][other.run].remove(other)
+        return released, dropped
+
+    def stopped(self, job) -> dict:
+        """
+        Returns the description of the rounds of a planner after its runs were dropped.
+        """
+        race = self.races[job.mpb.id]
+        return {"runs": race["eliminated"].get(job.planner, race["released"]),
+                "eliminated": job.planner in race["eliminated"]}
+
+    def report(self) -> dict:
+        """
+        Returns per benchmark and planner the number of rounds it raced and after which round it was
+        eliminated (None for the planners that were not eliminated), together with the objective and the
+        significance level of the race.
+        """
+        report = {}
+        for id, race in self.races.items():
+            report[id] = {
+                "objective": self.rule.objective,
+                "alpha": self.rule.alpha,
+                "rounds": race["released"],
+                "p_values": race["p_values"],
+                "survivors": list(race["alive"]),
+                "planners": {planner: {"eliminated_after": race["eliminated"].get(planner),
+                                       "rounds": race["eliminated"].get(planner, race["released"])}
+                             for planner in race["planners"]}
+            }
+        return report
+
+    def save_report(self, filename: str):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+
+    def print_summary(self, file=sys.stdout):
+        for id, race in self.races.items():
+            print("%s: %s won the race on %s after %i rounds." % (
+                id, ", ".join(convert_planner_name(p) for p in race["alive"]), self.rule.objective,
+                race["released"]), file=file)
+            for planner, rounds in sorted(race["eliminated"].items(), key=lambda x: x[1]):
+                print("\t%s was eliminated after %i rounds." % (convert_planner_name(planner), rounds), file=file)
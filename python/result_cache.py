@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of benchmark results.
+
+The results of a benchmark are stored under a hash of everything that determines them: the effective
+configuration (including the seeds), the benchmark binary and the files the configuration refers to
+(maps, robot shapes, scenarios, motion primitives). Running a benchmark whose hash is cached copies
+the cached results instead of running the binary. The least recently used results are evicted once
+the cache exceeds its size limit.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+from copy import deepcopy
+from typing import Optional
+
+from results_io import COMPRESSION_EXTENSIONS, ResultsWriter, compression_extension, iter_runs
+
+CACHE_DIR = os.environ.get('MPB_RESULT_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'mpb', 'results'))
+# maximum size of the cache in bytes
+MAX_CACHE_SIZE = 1 << 30
+
+# file hashes keyed by (path, mtime, size)
+_file_hashes = {}
+
+
+def file_hash(filename: str) -> str:
+    """
+    Returns the SHA-1 hash of a file's contents, computed once per modification of the file.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+    if key not in _file_hashes:
+        h = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+def _referenced_files(config, base_dir: str) -> {str: str}:
+    """
+    Returns the hashes of all files the string values of the configuration refer to, relative to the
+    working directory of the binary.
+    """
+    files = {}
+    if isinstance(config, dict):
+        for value in config.values():
+            files.update(_referenced_files(value, base_dir))
+    elif isinstance(config, list):
+        for value in config:
+            files.update(_referenced_files(value, base_dir))
+    elif isinstance(config, str) and config:
+        filename = os.path.join(base_dir, config)
+        if os.path.isfile(filename):
+            files[config] = file_hash(filename)
+    return files
+
+
+class ResultCache:
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = MAX_CACHE_SIZE):
+        """
+        :param directory: Directory the cached results files are stored in.
+        :param max_size: Size in bytes above which the least recently used results are evicted.
+        """
+        self.directory = directory  # type: str
+        self.max_size = max_size  # type: int
+
+    @staticmethod
+    def key(mpb, binary: str, binary_dir: str) -> str:
+        """
+        Returns the hash of the effective configuration of a benchmark, the binary and the files the
+        configuration refers to.
+        """
+        config = deepcopy(mpb.config)
+        # the location of the results does not change them
+        config["benchmark"].pop("log_file", None)
+        binary_filename = os.path.join(binary_dir, binary)
+        description = {
+            "config": config,
+            "binary": file_hash(binary_filename) if os.path.isfile(binary_filename) else None,
+            "files": _referenced_files(config, binary_dir),
+            "compact": bool(mpb.compact_results),
+            "compression": mpb.compression
+        }
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def filename(self, key: str, compression: str = '') -> str:
+        """
+        Returns the name of the cache entry with the given key, which keeps the compression extension
+        (see results_io.compression_extension) of the results file it was stored from.
+        """
+        return os.path.join(self.directory, key + ".results" + compression)
+
+    def _find(self, key: str) -> Optional[str]:
+        for compression in ('',) + COMPRESSION_EXTENSIONS:
+            filename = self.filename(key, compression)
+            if os.path.exists(filename):
+                return filename
+        return None
+
+    def fetch(self, key: str, results_filename: str, log_file: Optional[str] = None,
+              compact: bool = False) -> bool:
+        """
+        Copies the cached results with the given key to results_filename.
+        :param log_file: Log file of the benchmark the results are fetched for, which replaces the log file
+            of the cached benchmark in the settings of the results.
+        :param compact: Write the results in the compact format (see results_io.ResultsWriter).
+        :return: Whether cached results existed.
+        """
+        filename = self._find(key)
+        if filename is None:
+            return False
+        if log_file is None:
+            shutil.copyfile(filename, results_filename)
+        else:
+            with ResultsWriter(results_filename, compact=compact) as writer:
+                for _, run in iter_runs(filename, header=writer.header, resolve_arrays=False,
+                                        resolve_environments=False):
+                    settings = run.get("settings") if isinstance(run, dict) else None
+                    if isinstance(settings, dict) and "log_file" in settings.get("benchmark", {}):
+                        settings["benchmark"]["log_file"] = log_file
+                    writer.write_run(run)
+                if "log_file" in writer.header.get("settings", {}).get("benchmark", {}):
+                    writer.header["settings"]["benchmark"]["log_file"] = log_file
+        # mark as recently used
+        os.utime(filename)
+        return True
+
+    def store(self, key: str, results_filename: str):
+        """
+        Adds a results file to the cache and evicts the least recently used results if the cache
+        exceeds its size limit. Only the results of benchmarks that succeeded without timeouts are to be
+        stored, since the results of a rerun could differ.
+        """
+        if not os.path.exists(results_filename):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            filename = self.filename(key, compression_extension(results_filename))
+            tmp_filename = filename + ".tmp"
+            shutil.copyfile(results_filename, tmp_filename)
+            os.replace(tmp_filename, filename)
+        except OSError as e:
+            print("Could not cache results %s: %s" % (results_filename, e), file=sys.stderr)
+            return
+        self.evict()
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        Removes the cached results with the given key, or all cached results if key is None.
+        """
+        if key is not None:
+            filename = self._find(key)
+            if filename is not None:
+                os.remove(filename)
+            return
+        for filename in self._entries():
+            os.remove(filename)
+
+    def _entries(self) -> [str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                if f.endswith(tuple(".results" + c for c in ('',) + COMPRESSION_EXTENSIONS))]
+
+    def size(self) -> int:
+        return sum(os.path.getsize(filename) for filename in self._entries())
+
+    def evict(self):
+        """
+        Removes the least recently used results until the cache is within its size limit.
+        """
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        size = sum(os.path.getsize(filename) for filename in entries)
+        while entries and size > self.max_size:
+            filename = entries.pop(0)
+            size -= os.path.getsize(filename)
+            os.remove(filename)
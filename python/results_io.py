@@ -0,0 +1,947 @@
+#!/usr/bin/env python3
+"""
+Incremental reading and merging of MPB results files.
+
+A results file holds a single JSON object of the form {"runs": [...], "settings": {...}, ...}.
+Instead of decoding the whole document at once, the functions in this module parse one run at a
+time, so that peak memory tracks the size of a single run rather than the size of the file.
+"""
+import bz2
+import hashlib
+import gzip
+import json
+import lzma
+import os
+import re
+import shutil
+import sys
+from typing import IO, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+# number of characters read from the results file at once
+CHUNK_SIZE = 1 << 20
+
+# results files with these extensions are transparently (de-)compressed
+COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+
+# separators of the compact results format (no whitespace)
+COMPACT_SEPARATORS = (',', ':')
+
+# extension of the binary file holding externalized trajectories (see externalize_arrays)
+SIDECAR_EXTENSION = '.arrays'
+
+# environment entries that stay with each run when environments are deduplicated
+RUN_ENVIRONMENT_KEYS = ('start', 'goal')
+# key of the content hash that references a shared environment (see deduplicate_environments)
+SHARED_ENVIRONMENT_KEY = 'shared_environment'
+
+# keys holding lists of states which are not needed when only statistics are analyzed
+TRAJECTORY_KEYS = ('trajectory', 'path')
+INTERMEDIARY_KEYS = ('intermediary_solutions',)
+
+# statistics the benchmark binary reports as NaN (null) for plans without a solution
+UNDEFINED_STATS = ('planning_time', 'collision_time', 'steering_time', 'path_length', 'max_curvature',
+                   'normalized_curvature', 'aol', 'smoothness', 'mean_clearing_distance',
+                   'median_clearing_distance', 'min_clearing_distance', 'max_clearing_distance')
+
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|["\[\]{}]')
+_SCALAR = re.compile(r'[^\s,:\]}]*')
+_WHITESPACE = re.compile(r'\s*')
+
+
+def compression_extension(filename: str) -> str:
+    """
+    Returns the compression extension of a results file name (e.g. ".gz"), or "" if uncompressed.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if ext in COMPRESSION_EXTENSIONS else ''
+
+
+def open_results(filename: str, mode: str = 'r', compression: str = None) -> IO[str]:
+    """
+    Opens a results file in text mode, transparently (de-)compressing it depending on its extension
+    (.gz, .bz2, .xz or .zst).
+    :param filename: Name of the results file.
+    :param mode: "r" for reading or "w" for writing.
+    :param compression: Compression extension to use instead of the one derived from the file name.
+    """
+    if compression is None:
+        compression = compression_extension(filename)
+    if compression == '.gz':
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+    if compression == '.bz2':
+        return bz2.open(filename, mode + 't', encoding='utf-8')
+    if compression == '.xz':
+        return lzma.open(filename, mode + 't', encoding='utf-8')
+    if compression == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('Error: The "zstandard" package is required to open %s. ' % filename +
+                            'Install it via pip3 install zstandard.')
+        return zstandard.open(filename, mode + 't', encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+
+def _find_value_end(text: str, pos: int, depth: int = 0) -> (Optional[int], int, int):
+    """
+    Scans the JSON array or object starting at (or continuing from) `pos` for its end.
+    :param text: Text to scan.
+    :param pos: Position from which to scan.
+    :param depth: Nesting depth at `pos` (0 if `pos` points at the opening bracket).
+    :return: Tuple (end, resume, depth) where end is the index after the closing bracket, or None
+             if the text ends before the value is complete. In this case, scanning can be resumed
+             at `resume` with the returned nesting depth once more text is available.
+    """
+    for m in _TOKEN.finditer(text, pos):
+        token = m.group()
+        if token == '"':
+            # string is cut off at the end of the text
+            return None, m.start(), depth
+        if token[0] == '"':
+            continue
+        if token in '[{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return m.end(), m.end(), 0
+    return None, len(text), depth
+
+
+def _null_values(text: str, keys: [str]) -> str:
+    """
+    Replaces the values of all object entries with the given keys by null, without decoding them.
+    """
+    pattern = re.compile(r'(?<=[{,])\s*"(?:%s)"\s*:\s*' % '|'.join(map(re.escape, keys)))
+    pieces = []
+    last = 0
+    for m in pattern.finditer(text):
+        if m.start() < last:
+            # key is nested in a value that has already been removed
+            continue
+        start = m.end()
+        if text[start] in '[{':
+            end, _, _ = _find_value_end(text, start)
+        else:
+            end = _SCALAR.match(text, start).end()
+        if end is None:
+            raise json.JSONDecodeError('Unterminated value for key', text, start)
+        pieces.append(text[last:start])
+        pieces.append('null')
+        last = end
+    if last == 0:
+        return text
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+class _Scanner:
+    """
+    Reads a JSON document from a file in chunks and extracts complete values from it.
+    """
+
+    def __init__(self, file, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        # read at least as much as is already buffered so that large values are assembled in
+        # amortized linear time
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message: str):
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise self._error('Unexpected end of results file')
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self._error('Expected "%s"' % char)
+        self.pos += 1
+
+    def accept(self, char: str) -> bool:
+        if self.peek() != char:
+            return False
+        self.pos += 1
+        return True
+
+    def _value_end(self) -> int:
+        first = self.peek()
+        if first in '[{':
+            offset, depth = 0, 0
+            while True:
+                end, resume, depth = _find_value_end(self.buffer, self.pos + offset, depth)
+                if end is not None:
+                    return end
+                offset = resume - self.pos
+                if not self._fill():
+                    raise self._error('Unterminated value')
+        if first == '"':
+            pattern = _TOKEN
+        else:
+            pattern = _SCALAR
+        while True:
+            m = pattern.match(self.buffer, self.pos)
+            if m.end() < len(self.buffer) and m.group() != '"':
+                return m.end()
+            if not self._fill():
+                if m.group() == '"':
+                    raise self._error('Unterminated string')
+                return m.end()
+
+    def read_value(self, skip_keys: [str] = (), base_dir: str = None):
+        text = self.read_text()
+        if skip_keys:
+            text = _null_values(text, skip_keys)
+        if base_dir is not None and '"sidecar"' in text:
+            return json.loads(text, object_hook=lambda obj: _resolve_array(obj, base_dir))
+        return json.loads(text)
+
+    def read_text(self) -> str:
+        end = self._value_end()
+        text = self.buffer[self.pos:end]
+        self.pos = end
+        return text
+
+    def skip_value(self):
+        self.pos = self._value_end()
+
+
+_sidecars = {}  # type: {str: (float, np.ndarray)}
+
+
+def _sidecar_array(filename: str) -> np.ndarray:
+    """
+    Returns the memory-mapped contents of a sidecar file, reusing the mapping while the file is unchanged.
+    """
+    mtime = os.path.getmtime(filename)
+    if filename not in _sidecars or _sidecars[filename][0] != mtime:
+        if os.path.getsize(filename) == 0:
+            _sidecars[filename] = (mtime, np.zeros(0, dtype='<f8'))
+        else:
+            _sidecars[filename] = (mtime, np.memmap(filename, dtype='<f8', mode='r'))
+    return _sidecars[filename][1]
+
+
+def _resolve_array(obj: dict, base_dir: str):
+    """
+    Replaces a reference {"sidecar": file, "offset": bytes, "shape": [rows, cols]} by a read-only
+    float64 view into the memory-mapped sidecar file.
+    """
+    if not _is_array_reference(obj):
+        return obj
+    data = _sidecar_array(os.path.join(base_dir, obj["sidecar"]))
+    start = obj["offset"] // 8
+    return data[start:start + int(np.prod(obj["shape"]))].reshape(obj["shape"])
+
+
+def _is_array_reference(obj) -> bool:
+    return isinstance(obj, dict) and "sidecar" in obj and "offset" in obj and "shape" in obj
+
+
+def _rebase_arrays(obj, source_dir: str, target_dir: str):
+    """
+    Rewrites the sidecar file names of the array references in obj (given relative to source_dir) so that
+    they are relative to target_dir, where the results are written to.
+    """
+    if source_dir == target_dir:
+        return
+    if isinstance(obj, list):
+        for item in obj:
+            _rebase_arrays(item, source_dir, target_dir)
+    elif _is_array_reference(obj):
+        obj["sidecar"] = os.path.relpath(os.path.join(source_dir, obj["sidecar"]), target_dir)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _rebase_arrays(value, source_dir, target_dir)
+
+
+def _rebase_run_text(run_text: str, source_dir: str, target_dir: str) -> Union[str, dict]:
+    """
+    Returns the JSON text of a run copied from a results file in source_dir to one in target_dir. Runs that
+    reference sidecar arrays are decoded so that their references can be rebased (see `_rebase_arrays`).
+    """
+    if source_dir == target_dir or '"sidecar"' not in run_text:
+        return run_text
+    run = json.loads(run_text)
+    _rebase_arrays(run, source_dir, target_dir)
+    return run
+
+
+def _results_dir(results_filename: str) -> str:
+    return os.path.dirname(os.path.abspath(results_filename))
+
+
+def _json_default(obj):
+    """
+    Encodes the memory-mapped arrays the readers resolve sidecar references to (see externalize_arrays).
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("Object of type %s is not JSON serializable" % type(obj).__name__)
+
+
+def _environment_hash(run) -> Optional[str]:
+    if not isinstance(run, dict) or not isinstance(run.get("environment"), dict):
+        return None
+    return run["environment"].get(SHARED_ENVIRONMENT_KEY)
+
+
+def environment_hash(environment: dict) -> str:
+    """
+    Computes the content hash of the parts of an environment that are shared between runs.
+    """
+    shared = {key: value for key, value in environment.items()
+              if key not in RUN_ENVIRONMENT_KEYS and key != SHARED_ENVIRONMENT_KEY}
+    return hashlib.sha1(json.dumps(shared, sort_keys=True, separators=COMPACT_SEPARATORS).encode()).hexdigest()
+
+
+def resolve_environment(environment: dict, environments: {str: dict}) -> dict:
+    """
+    Combines the run-specific entries of an environment reference with the shared environment it references.
+    The shared entries are not copied, so that runs referencing the same environment share its map data.
+    The hash is kept so that decoded maps can be cached per environment (see plot_env).
+    """
+    key = environment.get(SHARED_ENVIRONMENT_KEY)
+    if key is None:
+        return environment
+    if key not in environments:
+        raise Exception("Shared environment %s is missing in the results file." % key)
+    resolved = dict(environments[key])
+    resolved.update(environment)
+    return resolved
+
+
+def _skipped_keys(skip_trajectories: bool, skip_intermediary: bool) -> [str]:
+    keys = []
+    if skip_trajectories:
+        keys += TRAJECTORY_KEYS
+    if skip_intermediary:
+        keys += INTERMEDIARY_KEYS
+    return keys
+
+
+def _iter_document(results_filename: str, header: dict, skip_keys: [str] = (),
+                   mode: str = 'decode', resolve_arrays: bool = True,
+                   resolve_environments: bool = True) -> Iterator[Tuple[int, Union[dict, str, None]]]:
+    """
+    Iterates over the runs of a results file.
+    :param mode: "decode" yields the decoded runs, "raw" yields their JSON text, and "skip"
+                 yields None for each run without extracting it.
+    :param resolve_arrays: Resolve sidecar references to memory-mapped arrays when decoding.
+    :param resolve_environments: Resolve references to shared environments when decoding.
+    """
+    base_dir = _results_dir(results_filename) if resolve_arrays else None
+    environments = None
+    with open_results(results_filename, 'r') as rf:
+        scanner = _Scanner(rf)
+        scanner.expect('{')
+        if scanner.accept('}'):
+            return
+        while True:
+            key = scanner.read_value()
+            scanner.expect(':')
+            if key == "runs" and scanner.peek() == '[':
+                scanner.expect('[')
+                run_id = 0
+                while not scanner.accept(']'):
+                    if run_id > 0:
+                        scanner.expect(',')
+                    if mode == 'decode':
+                        run = scanner.read_value(skip_keys, base_dir)
+                        if resolve_environments and _environment_hash(run) is not None:
+                            if environments is None:
+                                # shared environments are stored after the runs
+                                environments = header.get("environments") or \
+                                               read_header(results_filename).get("environments", {})
+                            run["environment"] = resolve_environment(run["environment"], environments)
+                        yield run_id, run
+                    elif mode == 'raw':
+                        yield run_id, scanner.read_text()
+                    else:
+                        scanner.skip_value()
+                        yield run_id, None
+                    run_id += 1
+            else:
+                header[key] = scanner.read_value()
+            if not scanner.accept(','):
+                scanner.expect('}')
+                return
+
+
+def iter_runs(results_filename: str, skip_trajectories: bool = False, skip_intermediary: bool = False,
+              header: dict = None, resolve_arrays: bool = True,
+              resolve_environments: bool = True) -> Iterator[Tuple[int, dict]]:
+    """
+    Iterates over the runs of a results file, decoding one run at a time.
+    :param results_filename: Name of the JSON results file.
+    :param skip_trajectories: Replace all "trajectory" and "path" entries by None without decoding them.
+    :param skip_intermediary: Replace all "intermediary_solutions" entries by None without decoding them.
+    :param header: Optional dictionary that is filled with the top-level entries other than "runs"
+                   (e.g. "settings") as they are encountered in the file.
+    :param resolve_arrays: Resolve sidecar references (see externalize_arrays) to memory-mapped arrays;
+                           otherwise the references are kept as they are stored in the file.
+    :param resolve_environments: Resolve references to shared environments (see deduplicate_environments);
+                                 otherwise the environments of the runs are kept as references.
+    :return: Iterator over tuples (run_id, run).
+    """
+    if header is None:
+        header = {}
+    return _iter_document(results_filename, header, _skipped_keys(skip_trajectories, skip_intermediary),
+                          resolve_arrays=resolve_arrays, resolve_environments=resolve_environments)
+
+
+def iter_plans(results_filename: str, skip_trajectories: bool = False, skip_intermediary: bool = False,
+               header: dict = None) -> Iterator[Tuple[int, dict, str, dict]]:
+    """
+    Iterates over all plans of all runs in a results file, decoding one run at a time.
+    :return: Iterator over tuples (run_id, run, planner, plan).
+    """
+    for run_id, run in iter_runs(results_filename, skip_trajectories, skip_intermediary, header):
+        if run is None or "plans" not in run or run["plans"] is None:
+            continue
+        for planner, plan in run["plans"].items():
+            yield run_id, run, planner, plan
+
+
+def read_header(results_filename: str) -> dict:
+    """
+    Reads the top-level entries other than "runs" (e.g. "settings") without decoding any run.
+    """
+    header = {}
+    for _ in _iter_document(results_filename, header, mode='skip'):
+        pass
+    return header
+
+
+def count_runs(results_filename: str) -> int:
+    """
+    Counts the runs stored in a results file without decoding them.
+    """
+    return sum(1 for _ in _iter_document(results_filename, {}, mode='skip'))
+
+
+def load_results(results_filename: str, skip_trajectories: bool = False, skip_intermediary: bool = False) -> dict:
+    """
+    Loads a whole results file, optionally leaving out trajectories and intermediary solutions.
+    With skip_trajectories=True the result only holds the statistics of the runs which is typically
+    orders of magnitude smaller than the file itself.
+    """
+    data = {}
+    runs = [run for _, run in iter_runs(results_filename, skip_trajectories, skip_intermediary, data)]
+    if "runs" not in data:
+        data["runs"] = runs
+    return data
+
+
+def iter_raw_runs(results_filename: str, header: dict = None) -> Iterator[Tuple[int, str]]:
+    """
+    Iterates over the runs of a results file, yielding the JSON text of each run without decoding it.
+    """
+    if header is None:
+        header = {}
+    return _iter_document(results_filename, header, mode='raw')
+
+
+def _find_key(text: str, key: str) -> Optional[int]:
+    """
+    Returns the position of the value of `key` in the JSON object `text` (only considering the
+    top level of the object), or None if the key does not exist.
+    """
+    depth = 0
+    for m in _TOKEN.finditer(text):
+        token = m.group()
+        if token[0] == '"':
+            if depth == 1 and token[1:-1] == key:
+                colon = _WHITESPACE.match(text, m.end()).end()
+                if text[colon] == ':':
+                    return _WHITESPACE.match(text, colon + 1).end()
+            continue
+        depth += 1 if token in '[{' else -1
+    return None
+
+
+def splice_plans(run_text: str, plans: [Tuple[str, str]], replace: bool = False) -> str:
+    """
+    Adds plans to the JSON text of a run without decoding it.
+    :param run_text: JSON text of a run object.
+    :param plans: List of (planner, JSON text of the plan) tuples.
+    :param replace: Replace the existing plans of the run instead of adding to them.
+    :return: JSON text of the run with the plans added to its "plans" object.
+    """
+    if len(plans) == 0 and not replace:
+        return run_text
+    entries = ', '.join('%s: %s' % (json.dumps(planner), plan) for planner, plan in plans)
+    start = _find_key(run_text, "plans")
+    if start is None:
+        end = run_text.rindex('}')
+        separator = ', ' if run_text[:end].strip() != '{' else ''
+        return run_text[:end] + '%s"plans": {%s}' % (separator, entries) + run_text[end:]
+    if run_text[start] != '{':
+        # "plans" is null
+        end = _SCALAR.match(run_text, start).end()
+        return run_text[:start] + '{%s}' % entries + run_text[end:]
+    end, _, _ = _find_value_end(run_text, start)
+    if replace or run_text[start + 1:end - 1].strip() == '':
+        return run_text[:start] + '{%s}' % entries + run_text[end:]
+    return run_text[:end - 1] + ', %s' % entries + run_text[end - 1:]
+
+
+class ResultsWriter:
+    """
+    Writes a results file progressively, one run at a time.
+
+    The file is written to a temporary location and moved to its final name once it is complete,
+    so that the target may also be one of the files being read. Files with a compression extension
+    are compressed on the fly.
+    """
+
+    def __init__(self, filename: str, indent: Optional[int] = 2, compact: bool = False):
+        """
+        :param filename: Name of the results file to write.
+        :param indent: Indentation of the runs and other entries that are given as dictionaries.
+        :param compact: Write without any whitespace; runs given as JSON text are re-encoded.
+        """
+        self.filename = filename
+        self.indent = None if compact else indent
+        self.compact = compact
+        self.header = {}  # type: dict
+        self.count = 0
+        self._newline = '' if compact else '\n'
+        self._colon = ':' if compact else ': '
+        self._tmp_filename = filename + '.tmp'
+        self._file = open_results(self._tmp_filename, 'w', compression_extension(filename))
+        self._file.write('{%s"runs"%s[%s' % (self._newline, self._colon, self._newline))
+
+    def _dumps(self, value) -> str:
+        if self.compact:
+            return json.dumps(value, separators=COMPACT_SEPARATORS, default=_json_default)
+        return json.dumps(value, indent=self.indent, default=_json_default)
+
+    def write_run(self, run: Union[dict, str]):
+        """
+        Writes a run given as dictionary or as JSON text.
+        """
+        if self.count > 0:
+            self._file.write(',' + self._newline)
+        if isinstance(run, str):
+            if self.compact:
+                run = self._dumps(json.loads(run))
+        else:
+            run = self._dumps(run)
+        self._file.write(run)
+        self.count += 1
+
+    def close(self):
+        self._file.write(self._newline + ']')
+        for key, value in self.header.items():
+            if key == "runs":
+                continue
+            self._file.write(',%s%s%s%s' % (self._newline, json.dumps(key), self._colon, self._dumps(value)))
+        self._file.write(self._newline + '}\n')
+        self._file.close()
+        os.replace(self._tmp_filename, self.filename)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self._tmp_filename):
+            os.remove(self._tmp_filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class PlanLog:
+    """
+    Append-only log of plans that are merged into a results file in a single pass.
+
+    Instead of rewriting the target results file each time the plans of another planner become
+    available, the plans are appended to a log file, and only the (small) index of their locations
+    is kept in memory. `splice_into` finally inserts all logged plans into their runs while
+    streaming the target file once.
+    """
+
+    def __init__(self, log_filename: str, target_filename: str, keep_target_plans: bool = True):
+        """
+        :param log_filename: File to append the plans to.
+        :param target_filename: Results file the logged plans are merged into.
+        :param keep_target_plans: Keep the plans already stored in the target file; otherwise the
+                                  merged runs only contain the logged plans.
+        """
+        self.log_filename = log_filename
+        self.target_filename = target_filename
+        self.keep_target_plans = keep_target_plans
+        self.index = {}  # type: {int: [(str, int, int)]}
+        self._target_indexed = not keep_target_plans
+        self._file = open(log_filename, 'wb')
+
+    def _index_target(self):
+        # register the planners of the target file so that duplicates are detected
+        for run_id, run in iter_runs(self.target_filename, skip_trajectories=True, skip_intermediary=True):
+            if run is None or "plans" not in run or run["plans"] is None:
+                continue
+            self.index[run_id] = [(planner, -1, 0) for planner in run["plans"].keys()]
+        self._target_indexed = True
+
+    def append(self, results_filename: str, plan_name: str = None, silence: bool = False) -> int:
+        """
+        Appends the plans of all runs in the given results file to the log.
+        :param plan_name: Store all plans under this name (later plans replace earlier ones of the same
+                          name), instead of their planner names (where duplicates are skipped).
+        :return: Number of runs read from the results file.
+        """
+        if not os.path.exists(self.target_filename):
+            # nothing to merge into yet, the given results become the target
+            if _results_dir(results_filename) == _results_dir(self.target_filename):
+                shutil.copyfile(results_filename, self.target_filename)
+            else:
+                _copy_results(results_filename, self.target_filename, compact=False)
+            return 0
+        if not self._target_indexed:
+            self._index_target()
+        runs = 0
+        for run_id, run in iter_runs(results_filename):
+            runs += 1
+            if run is None or "plans" not in run or run["plans"] is None:
+                continue
+            entries = self.index.setdefault(run_id, [])
+            for planner, plan in run["plans"].items():
+                if plan_name is not None:
+                    entries[:] = [entry for entry in entries if entry[0] != plan_name]
+                    planner = plan_name
+                elif any(planner == p for p, _, _ in entries):
+                    if not silence:
+                        print("Planner %s already exists in run #%i of %s. Skipping."
+                              % (planner, run_id, self.target_filename), file=sys.stderr)
+                    continue
+                # arrays from a sidecar file are inlined since the merged file has no sidecar of its own
+                data = json.dumps(plan, default=_json_default).encode('utf-8')
+                entries.append((planner, self._file.tell(), len(data)))
+                self._file.write(data)
+        return runs
+
+    def splice_into(self, output_filename: str = None, indent: Optional[int] = 2, compact: bool = False,
+                    silence: bool = False):
+        """
+        Inserts all logged plans into the runs of the target results file.
+        :param output_filename: File to write the merged results to (by default the target file itself).
+        :param compact: Write the merged results in the compact format (see `ResultsWriter`).
+        """
+        self._file.flush()
+        if not os.path.exists(self.target_filename):
+            return
+        if output_filename is None:
+            output_filename = self.target_filename
+        source_dir, target_dir = _results_dir(self.target_filename), _results_dir(output_filename)
+        with open(self.log_filename, 'rb') as log, ResultsWriter(output_filename, indent, compact) as writer:
+            for run_id, run_text in iter_raw_runs(self.target_filename, writer.header):
+                plans = []
+                for planner, offset, length in self.index.get(run_id, []):
+                    if offset < 0:
+                        # plan is already stored in the target file
+                        continue
+                    log.seek(offset)
+                    plans.append((planner, log.read(length).decode('utf-8')))
+                # the logged plans hold no sidecar references, only those of the target file are rebased
+                run_text = splice_plans(run_text, plans, replace=not self.keep_target_plans)
+                writer.write_run(_rebase_run_text(run_text, source_dir, target_dir))
+        for run_id, entries in self.index.items():
+            if run_id >= writer.count and len(entries) > 0 and not silence:
+                print("Run #%i does not exist in %s. Skipping." % (run_id, self.target_filename), file=sys.stderr)
+        self.index = {}
+
+    def close(self, remove: bool = True):
+        self._file.close()
+        if remove and os.path.exists(self.log_filename):
+            os.remove(self.log_filename)
+
+
+def merge_results(results_filenames: [str], target_filename: str, make_separate_runs: bool = False,
+                  plan_names: [Optional[str]] = None, compact: bool = False, silence: bool = False,
+                  deduplicate: bool = False) -> [str]:
+    """
+    Merges results files while holding at most one run in memory.
+    :param results_filenames: Results files to merge; missing files are skipped.
+    :param target_filename: File to write the merged results to.
+    :param make_separate_runs: Concatenate the runs of all files instead of merging the plans of
+                               runs with the same index.
+    :param plan_names: Optional name per results file under which its plans are stored.
+    :param compact: Write the merged results in the compact format (see `ResultsWriter`).
+    :param deduplicate: Store each distinct environment of the merged runs only once (see `deduplicate_environments`).
+    :return: List of results files that have been merged.
+    """
+    merged = []
+    existing = [i for i, filename in enumerate(results_filenames) if os.path.exists(filename)]
+    if not silence and len(existing) < len(results_filenames):
+        print("Skipping missing results files %s." % ", ".join(
+            filename for filename in results_filenames if not os.path.exists(filename)), file=sys.stderr)
+    results_filenames = [results_filenames[i] for i in existing]
+    if plan_names is not None:
+        plan_names = [plan_names[i] for i in existing]
+    if make_separate_runs:
+        target_dir = _results_dir(target_filename)
+        with ResultsWriter(target_filename, compact=compact) as writer:
+            environments = {}
+            for filename in results_filenames:
+                header = {}
+                source_dir = _results_dir(filename)
+                try:
+                    for _, run_text in iter_raw_runs(filename, header):
+                        writer.write_run(_rebase_run_text(run_text, source_dir, target_dir))
+                except json.JSONDecodeError:
+                    print("Error while decoding JSON file %s." % filename, file=sys.stderr)
+                    continue
+                if len(merged) == 0:
+                    writer.header = header
+                # keep the shared environments referenced by the copied runs of every file
+                environments.update(header.get("environments") or {})
+                merged.append(filename)
+            if environments:
+                writer.header["environments"] = environments
+        if deduplicate and merged:
+            deduplicate_environments(target_filename, compact=compact)
+        return merged
+
+    # the first file with runs provides the settings and environments of the merged runs
+    skeleton = None
+    for i, filename in enumerate(results_filenames):
+        try:
+            if count_runs(filename) > 0:
+                skeleton = i
+                break
+            print("Results file %s contains no runs. Skipping." % filename, file=sys.stderr)
+        except json.JSONDecodeError:
+            print("Error while decoding JSON file %s." % filename, file=sys.stderr)
+    if skeleton is None:
+        return merged
+    results_filenames = results_filenames[skeleton:]
+    if plan_names is not None:
+        plan_names = plan_names[skeleton:]
+    log = PlanLog(target_filename + '.plans', results_filenames[0], keep_target_plans=plan_names is None)
+    try:
+        for i, filename in enumerate(results_filenames):
+            if i == 0 and plan_names is None:
+                # the plans of the first file are already part of the target
+                merged.append(filename)
+                continue
+            try:
+                log.append(filename, plan_name=None if plan_names is None else plan_names[i], silence=silence)
+                merged.append(filename)
+            except json.JSONDecodeError:
+                print("Error while decoding JSON file %s." % filename, file=sys.stderr)
+        log.splice_into(target_filename, compact=compact, silence=silence)
+    finally:
+        log.close()
+    if deduplicate:
+        deduplicate_environments(target_filename, compact=compact)
+    return merged
+
+
+def _copy_results(results_filename: str, target_filename: str, compact: bool):
+    source_dir, target_dir = _results_dir(results_filename), _results_dir(target_filename)
+    with ResultsWriter(target_filename, compact=compact) as writer:
+        for _, run_text in iter_raw_runs(results_filename, writer.header):
+            writer.write_run(_rebase_run_text(run_text, source_dir, target_dir))
+
+
+def compact_results(results_filename: str, target_filename: str):
+    """
+    Rewrites a results file in the compact format, compressed according to the extension of the target
+    file name (e.g. "x_results.json.gz").
+    """
+    _copy_results(results_filename, target_filename, compact=True)
+
+
+def failed_plan(planner_name: str, **stats) -> dict:
+    """
+    Returns a plan entry for a planner that did not produce a solution, in the form the benchmark binary
+    writes for failed planners, with the given additional statistics (e.g. timed_out=True).
+    """
+    plan_stats = {key: None for key in UNDEFINED_STATS}
+    plan_stats.update({
+        "path_found": False,
+        "path_collides": True,
+        "exact_goal_path": True,
+        "total_cost": 0.0,
+        "planner": planner_name,
+        "planner_settings": {},
+        "cusps": [],
+        "collisions": []
+    })
+    plan_stats.update(stats)
+    return {
+        "path": [],
+        "stats": plan_stats,
+        "trajectory": [],
+        "intermediary_solutions": [],
+        "params": {}
+    }
+
+
+def fill_missing_environments(results_filename: str, source_filenames: [str]) -> int:
+    """
+    Sets the environments of the runs without one (e.g. runs recorded for a planner that was killed)
+    to the environment of the run with the same index in one of the source files.
+    :return: Number of runs whose environment was filled in.
+    """
+    missing = set()
+    header = {}
+    for run_id, run in iter_runs(results_filename, skip_trajectories=True, skip_intermediary=True,
+                                 header=header):
+        if isinstance(run, dict) and run.get("environment") is None:
+            missing.add(run_id)
+    if not missing:
+        return 0
+    environments = {}
+    for filename in source_filenames:
+        if not os.path.exists(filename):
+            continue
+        for run_id, run in iter_runs(filename, skip_trajectories=True, skip_intermediary=True):
+            if run_id in missing and run_id not in environments and isinstance(run, dict) \
+                    and run.get("environment") is not None:
+                environments[run_id] = run["environment"]
+    if not environments:
+        return 0
+    shared = header.get("environments")
+    with ResultsWriter(results_filename) as writer:
+        # environments that are already shared stay references
+        for run_id, run in iter_runs(results_filename, header=writer.header, resolve_arrays=False,
+                                     resolve_environments=False):
+            if run_id in environments:
+                environment = environments[run_id]
+                if shared is not None:
+                    # the results are deduplicated, share the filled environment as well
+                    key = environment_hash(environment)
+                    shared.setdefault(key, {k: v for k, v in environment.items()
+                                            if k not in RUN_ENVIRONMENT_KEYS and k != SHARED_ENVIRONMENT_KEY})
+                    environment = {k: v for k, v in environment.items() if k in RUN_ENVIRONMENT_KEYS}
+                    environment[SHARED_ENVIRONMENT_KEY] = key
+                run["environment"] = environment
+            writer.write_run(run)
+        if shared is not None:
+            writer.header["environments"] = shared
+    return len(environments)
+
+
+def results_basename(results_filename: str) -> str:
+    """
+    Returns the name of a results file without its extension and compression extension,
+    e.g. "x_results" for "x_results.json.gz". Sidecar files are named after it.
+    """
+    filename = results_filename
+    if compression_extension(filename):
+        filename = os.path.splitext(filename)[0]
+    return os.path.splitext(filename)[0]
+
+
+def sidecar_filename(results_filename: str) -> str:
+    """
+    Returns the name of the sidecar file holding the externalized arrays of a results file,
+    e.g. "x_results.arrays" for "x_results.json.gz".
+    """
+    return results_basename(results_filename) + SIDECAR_EXTENSION
+
+
+def externalize_arrays(results_filename: str, target_filename: str = None, compact: bool = False,
+                       keys: [str] = TRAJECTORY_KEYS) -> str:
+    """
+    Moves all trajectories and paths of a results file into a binary sidecar file of float64 values.
+    In the JSON file, each array is replaced by a reference {"sidecar": file, "offset": bytes,
+    "shape": [rows, cols]}, which the readers in this module resolve to memory-mapped views.
+    Statistics-only analyses therefore never read the arrays.
+    :param results_filename: Results file to convert.
+    :param target_filename: File to write the converted results to (by default the results file itself).
+    :param compact: Write the converted results in the compact format (see `ResultsWriter`).
+    :param keys: Keys of the arrays to externalize.
+    :return: Name of the sidecar file.
+    """
+    if target_filename is None:
+        target_filename = results_filename
+    sidecar = sidecar_filename(target_filename)
+    sidecar_name = os.path.basename(sidecar)
+    tmp_sidecar = sidecar + '.tmp'
+
+    with open(tmp_sidecar, 'wb') as bf:
+        def externalize(obj):
+            if isinstance(obj, list):
+                for item in obj:
+                    externalize(item)
+                return
+            if not isinstance(obj, dict):
+                return
+            for key, value in obj.items():
+                if key in keys and isinstance(value, (list, np.ndarray)) and len(value) > 0:
+                    try:
+                        array = np.asarray(value, dtype='<f8')
+                    except (TypeError, ValueError):
+                        continue
+                    if array.ndim != 2:
+                        continue
+                    obj[key] = {"sidecar": sidecar_name, "offset": bf.tell(), "shape": list(array.shape)}
+                    bf.write(np.ascontiguousarray(array).tobytes())
+                else:
+                    externalize(value)
+
+        with ResultsWriter(target_filename, compact=compact) as writer:
+            # shared environments (see deduplicate_environments) stay references
+            for _, run in iter_runs(results_filename, header=writer.header, resolve_environments=False):
+                externalize(run)
+                writer.write_run(run)
+    os.replace(tmp_sidecar, sidecar)
+    _sidecars.pop(os.path.abspath(sidecar), None)
+    return sidecar
+
+
+def deduplicate_environments(results_filename: str, target_filename: str = None, compact: bool = False) -> int:
+    """
+    Stores each distinct environment of a results file only once. The shared entries of every environment
+    (everything except start and goal, e.g. the grid map and distances) are moved to the top-level entry
+    "environments" under their content hash, and the environment of each run is replaced by its start, goal
+    and the hash. The readers in this module resolve these references transparently.
+    :param results_filename: Results file to convert.
+    :param target_filename: File to write the converted results to (by default the results file itself).
+    :param compact: Write the converted results in the compact format (see `ResultsWriter`).
+    :return: Number of distinct environments.
+    """
+    if target_filename is None:
+        target_filename = results_filename
+    source_dir, target_dir = _results_dir(results_filename), _results_dir(target_filename)
+    environments = {}
+    with ResultsWriter(target_filename, compact=compact) as writer:
+        # externalized arrays stay in their sidecar file
+        for _, run in iter_runs(results_filename, header=writer.header, resolve_arrays=False):
+            _rebase_arrays(run, source_dir, target_dir)
+            environment = run.get("environment") if isinstance(run, dict) else None
+            if isinstance(environment, dict):
+                key = environment_hash(environment)
+                if key not in environments:
+                    environments[key] = {k: v for k, v in environment.items()
+                                         if k not in RUN_ENVIRONMENT_KEYS and k != SHARED_ENVIRONMENT_KEY}
+                run["environment"] = {k: v for k, v in environment.items() if k in RUN_ENVIRONMENT_KEYS}
+                run["environment"][SHARED_ENVIRONMENT_KEY] = key
+            writer.write_run(run)
+        writer.header["environments"] = environments
+    return len(environments)
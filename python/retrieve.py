@@ -1,11 +1,9 @@
 from utils import parse_run_ids, parse_steer_functions, parse_planners
-import json
+from results_io import load_results
 
 
 def retrieve_planner_stats_by_run(json_file: str, planners: str = 'all', run_id: str = 'all'):
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file, skip_trajectories=True)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
     all_planners = (planners == 'all')
     planners = parse_planners(planners)
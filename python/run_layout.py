@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Layout of the runs the benchmark binary evaluates for a configuration.
+
+Within every run (environment), the binary evaluates each planner on every start-goal query and, per
+query, with every steer function (or forward propagation model). MPB uses this layout to continue a
+planner after a killed run, the scheduler to decompose benchmarks into jobs and reassemble their results.
+"""
+import itertools
+from copy import deepcopy
+from typing import Optional
+
+from results_io import failed_plan
+
+
+def steer_axis(config: dict) -> (str, list):
+    """
+    Returns the configuration key and values the binary iterates over within each run.
+    """
+    if config["benchmark"]["control_planners_on"]:
+        return "forward_propagations", list(config["benchmark"]["forward_propagations"]) or [None]
+    return "steer_functions", list(config["benchmark"]["steer_functions"]) or [None]
+
+
+def run_indices(config: dict) -> [int]:
+    moving_ai = config["benchmark"]["moving_ai"]
+    if moving_ai["active"]:
+        return list(range(moving_ai["start"], moving_ai["end"]))
+    return list(range(config["benchmark"]["runs"]))
+
+
+def query_names(config: dict) -> [Optional[str]]:
+    """
+    Returns the names of the start-goal queries the binary evaluates on the environment of every run
+    ([None] if the start and goal of the environment settings are used).
+    """
+    if config["benchmark"]["moving_ai"]["active"]:
+        return [None]
+    return [query["name"] for query in config["benchmark"].get("queries") or []] or [None]
+
+
+def evaluations(config: dict) -> int:
+    """
+    Returns the number of evaluations of every planner (the "<stats>" lines the binary prints per planner).
+    """
+    return len(run_indices(config)) * len(steer_axis(config)[1]) * len(query_names(config))
+
+
+def timed_out_runs(config: dict, plan_names: [str], steer_functions: list) -> [dict]:
+    """
+    Returns the runs of a single environment in which the given planners were killed after their timeout,
+    in the order the binary writes them: one run per start-goal query and steer function, holding failed
+    plans (stats "timed_out": true) and no environment (see results_io.fill_missing_environments).
+    """
+    axis, _ = steer_axis(config)
+    runs = []
+    for query, steer_function in itertools.product(query_names(config), steer_functions):
+        settings = deepcopy(config)
+        if steer_function is not None:
+            if axis == "steer_functions":
+                settings["steer"]["steering_type"] = steer_function
+            else:
+                settings["forwardpropagation"]["forward_propagation_type"] = steer_function
+        run = {
+            "environment": None,
+            "plans": {plan_name: failed_plan(plan_name, timed_out=True) for plan_name in plan_names},
+            "settings": settings
+        }
+        if query is not None:
+            run["query"] = query
+        runs.append(run)
+    return runs
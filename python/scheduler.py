@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Fine-grained scheduling of benchmarks.
+
+Every benchmark is decomposed into independent jobs that each run the binary for a single
+(planner, steer function, run index) combination with a deterministic seed. The jobs of all
+benchmarks share one pool of binary processes, so a slow planner only occupies a single core while
+the remaining jobs keep the other cores busy. Once all jobs of a benchmark have finished, their
+results are reassembled into the usual results file layout (one run per run index and steer
+function, holding the plans of all planners).
+"""
+import asyncio
+import itertools
+import os
+import shutil
+import sys
+import zlib
+from collections import deque
+from copy import deepcopy
+from typing import Callable, Optional
+
+from adaptive import AdaptiveRuns, StoppingRule
+from checkpoint import CheckpointManifest
+from racing import Race, RacingRule
+from executor import AsyncExecutor, BinaryJob
+from history import RuntimeHistory, steer_function_name
+from results_io import ResultsWriter, compact_results, failed_plan, iter_runs
+from run_layout import evaluations, query_names, run_indices, steer_axis, timed_out_runs
+from utils import convert_planner_name
+from definitions import planner_internal_names
+
+
+def job_seed(seed: int, planner: str, steer_function, run: int) -> int:
+    """
+    Derives the OMPL seed of a job from the seed of its benchmark, so that every job is reproducible
+    independently of the order in which the jobs are run.
+    """
+    key = "%i/%s/%s/%i" % (seed, planner, steer_function, run)
+    return zlib.crc32(key.encode()) & 0x7fffffff
+
+
+class PlannerJob(BinaryJob):
+    def __init__(self, mpb, planner: str, steer_function, run: int, config: dict,
+                 config_filename: str, results_filename: str, **kwargs):
+        """
+        Job running a single planner for a single run and steer function (or forward propagation
+        model) of a benchmark.
+        :param mpb: The MPB instance the job belongs to.
+        :param steer_function: Index of the steer function (or robot model), None to use the default.
+        :param run: Index of the run (for Moving AI scenarios, the scenario index).
+        :param config: Configuration of the job.
+        """
+        kwargs.setdefault("info", {
+            "benchmark": mpb.id,
+            "planner": planner,
+            "steer_function": steer_function,
+            "run": run,
+            "expected_runs": len(query_names(config))
+        })
+        super().__init__(config_filename, **kwargs)
+        self.mpb = mpb
+        self.planner = planner  # type: str
+        self.steer_function = steer_function
+        self.run = run  # type: int
+        self.config = config  # type: dict
+        self.results_filename = results_filename  # type: str
+
+    @property
+    def key(self) -> str:
+        return "%s/%s/%s" % (self.planner, self.steer_function, self.run)
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the job that is unique among all benchmarks, used for its files.
+        """
+        return "%s_%s_%s_%i" % (self.mpb.id, self.planner, self.steer_function, self.run)
+
+    @property
+    def category(self) -> (str, str, str):
+        """
+        Planner, environment type and steer function name of the job, under which its resources are
+        recorded in the RuntimeHistory.
+        """
+        return self.planner, self.config["env"]["type"], steer_function_name(self.config, self.steer_function)
+
+
+def decompose(mpb, jobs_folder: str, kill_after_timeout: bool = True, memory_limit=0,
+              executor: Optional[AsyncExecutor] = None) -> [PlannerJob]:
+    """
+    Decomposes a benchmark into one job per planner, steer function and run index, and writes the
+    configuration files of the jobs to jobs_folder.
+    :param executor: Executor the jobs run on, which determines the cores multi-threaded planners are
+        restricted to (see MPB.planner_config).
+    """
+    os.makedirs(jobs_folder, exist_ok=True)
+    axis, steer_functions = steer_axis(mpb.config)
+    jobs = []
+    for planner in mpb._planners:
+        for steer_function in steer_functions:
+            for run in run_indices(mpb.config):
+                name = "%s_%s_%s_%i" % (mpb.id, planner, steer_function, run)
+                results_filename = os.path.join(jobs_folder, name + "_results.json")
+                reserved_threads = None
+                if executor is not None:
+                    reserved_threads = executor.reserved_threads(mpb.planner_threads(planner))
+                config = mpb.planner_config(planner, results_filename, reserved_threads)
+                if steer_function is not None:
+                    config["benchmark"][axis] = [steer_function]
+                if config["benchmark"]["moving_ai"]["active"]:
+                    config["benchmark"]["moving_ai"]["start"] = run
+                    config["benchmark"]["moving_ai"]["end"] = run + 1
+                else:
+                    # the binary increments the grid seed after creating the environment of each run
+                    config["benchmark"]["runs"] = 1
+                    config["env"]["grid"]["seed"] = mpb.config["env"]["grid"]["seed"] + run
+                config["ompl"]["seed"] = job_seed(mpb.config["ompl"]["seed"], planner, steer_function, run)
+                config_filename = os.path.join(jobs_folder, name + "_config.json")
+                mpb.save_settings(config_filename, config)
+                job = PlannerJob(mpb, planner, steer_function, run, config, config_filename, results_filename,
+                                 label="%s with planner %s (steer function %s, run %i)" % (
+                                     mpb.id, planner, steer_function, run),
+                                 memory_limit=memory_limit, threads=mpb.planner_threads(planner))
+                if kill_after_timeout:
+                    # the job evaluates the planner on every query
+                    job.timeout = mpb["max_planning_time"] * 2 * len(query_names(config))
+                jobs.append(job)
+    return jobs
+
+
+def assemble(mpb, jobs: [PlannerJob], raw_results_filename: str, silence: bool = False) -> int:
+    """
+    Combines the results of the jobs of a benchmark into one results file with the layout the binary
+    produces: the runs are ordered by run index, then by start-goal query and then by steer function, and
+    each run holds the plans of all planners. Planners whose job was killed after its timeout are recorded
+    with failed plans, also in runs where all planners timed out, so that every scheduled run is written.
+    :return: Number of runs written.
+    """
+    _, steer_functions = steer_axis(mpb.config)
+    by_key = {(job.planner, job.steer_function, job.run): job for job in jobs}
+    count = 0
+    with ResultsWriter(raw_results_filename) as writer:
+        for run in run_indices(mpb.config):
+            # runs of every query per steer function
+            combined_per_steer_function = []
+            for steer_function in steer_functions:
+                combined = None
+                timed_out = []
+                scheduled = False
+                for planner in mpb._planners:
+                    job = by_key.get((planner, steer_function, run))
+                    scheduled |= job is not None
+                    if job is not None and job.code == -9:
+                        timed_out.append(planner_internal_names.get(planner, planner))
+                    if job is None or job.code != 0 or not os.path.exists(job.results_filename):
+                        continue
+                    header = {}
+                    job_runs = [job_run for _, job_run in iter_runs(job.results_filename, header=header)]
+                    if combined is None:
+                        combined = job_runs
+                        for job_run in combined:
+                            job_run.setdefault("plans", {})
+                        if "settings" not in writer.header:
+                            writer.header = header
+                    else:
+                        # the runs of every job are the same queries in the same order
+                        for combined_run, job_run in zip(combined, job_runs):
+                            combined_run["plans"].update(job_run.get("plans") or {})
+                if combined is None and timed_out:
+                    # keep the run indices aligned with the other benchmarks
+                    job = next(by_key[(planner, steer_function, run)] for planner in mpb._planners
+                               if (planner, steer_function, run) in by_key)
+                    combined_per_steer_function.append(timed_out_runs(job.config, timed_out, [steer_function]))
+                    continue
+                if combined is None:
+                    # runs without any jobs were dropped by adaptive scheduling or racing
+                    if not silence and scheduled:
+                        print("No planner finished run %i (steer function %s) of %s." % (
+                            run, steer_function, mpb.id), file=sys.stderr)
+                    continue
+                for combined_run in combined:
+                    for plan_name in timed_out:
+                        combined_run["plans"][plan_name] = failed_plan(plan_name, timed_out=True)
+                combined_per_steer_function.append(combined)
+            # runs in which all planners timed out hold no environment, take it from the other steer functions
+            for query_runs in zip(*combined_per_steer_function):
+                environment = next((r["environment"] for r in query_runs if r.get("environment") is not None), None)
+                for combined_run in query_runs:
+                    if combined_run.get("environment") is None:
+                        combined_run["environment"] = environment
+            # the binary evaluates all steer functions on a query before it moves on to the next query
+            for query_runs in itertools.zip_longest(*combined_per_steer_function):
+                for combined_run in query_runs:
+                    if combined_run is not None:
+                        writer.write_run(combined_run)
+                        count += 1
+        writer.header["settings"] = deepcopy(mpb.config)
+        writer.header["settings"]["benchmark"]["log_file"] = os.path.abspath(raw_results_filename)
+    return count
+
+
+class Scheduler:
+    def __init__(self, executor: AsyncExecutor):
+        """
+        Runs jobs on the binary processes of an executor. Whenever a process becomes available, the next
+        pending job is started, so that no process idles while jobs of any benchmark are left.
+        """
+        self.executor = executor  # type: AsyncExecutor
+        self.running = set()  # type: {PlannerJob}
+        self.pending = deque()  # type: deque
+
+    def order(self, jobs: [PlannerJob]) -> [PlannerJob]:
+        """
+        Returns the jobs in the order in which they are started.
+        """
+        return list(jobs)
+
+    def can_start(self, job: PlannerJob) -> bool:
+        return self.executor.available(job)
+
+    def select(self, pending: deque) -> Optional[int]:
+        """
+        Returns the index of the pending job to start next, or None if no job can be started now.
+        """
+        if self.can_start(pending[0]):
+            return 0
+        return None
+
+    def finished(self, job: PlannerJob):
+        """
+        Called after a job has finished.
+        """
+        pass
+
+    async def _run(self, job: PlannerJob, on_finished: Optional[Callable[[PlannerJob], None]]):
+        self.running.add(job)
+        try:
+            await self.executor.run_job(job)
+        finally:
+            self.running.discard(job)
+        self.finished(job)
+        if on_finished is not None:
+            on_finished(job)
+
+    def add(self, jobs: [PlannerJob]):
+        """
+        Adds jobs to a running scheduler (e.g. from on_finished).
+        """
+        self.pending.extend(self.order(jobs))
+
+    async def run(self, jobs: [PlannerJob], on_finished: Callable[[PlannerJob], None] = None):
+        """
+        Runs all jobs, and the jobs added while they run, calling on_finished(job) after each job has finished.
+        """
+        self.pending = pending = deque(self.order(jobs))
+        tasks = set()
+        while pending or tasks:
+            while pending:
+                index = self.select(pending)
+                if index is None:
+                    break
+                job = pending[index]
+                del pending[index]
+                tasks.add(asyncio.ensure_future(self._run(job, on_finished)))
+                # let the job register as running before the next one is selected
+                await asyncio.sleep(0)
+            if not tasks:
+                # nothing can be started although no job is running
+                raise Exception("Job %s can never be started." % pending[0].label)
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+
+class PredictiveScheduler(Scheduler):
+    def __init__(self, executor: AsyncExecutor, history: RuntimeHistory, memory_budget: float = None):
+        """
+        Scheduler that predicts the wall time and peak memory of every job from the history of previous
+        jobs. Jobs are started longest-predicted first, which keeps long jobs from becoming stragglers at
+        the end of a sweep, and are packed so that the predicted memory of the running jobs stays within
+        the memory budget (if a job does not fit, the longest pending job that fits is started instead).
+        The measured wall time and peak memory of every finished job are added to the history.
+        :param memory_budget: Memory in bytes available to all running jobs (None for no limit).
+        """
+        super().__init__(executor)
+        self.history = history  # type: RuntimeHistory
+        self.memory_budget = memory_budget  # type: Optional[float]
+        # predictions of the history per (planner, environment type, steer function, "time" or "memory"),
+        # computed once until a job of the planner finishes
+        self._predictions = {}  # type: {tuple: Optional[float]}
+
+    def _prediction(self, category: (str, str, str), name: str) -> Optional[float]:
+        key = category + (name,)
+        if key not in self._predictions:
+            if name == "time":
+                self._predictions[key] = self.history.predict_time(*category)
+            else:
+                self._predictions[key] = self.history.predict_memory(*category, default=None)
+        return self._predictions[key]
+
+    def predicted_time(self, job: PlannerJob) -> float:
+        # the history holds the time per evaluation (query), without any history assume the job takes its
+        # whole planning time
+        time = self._prediction(job.category, "time")
+        if time is None:
+            time = job.config["max_planning_time"]
+        return time * evaluations(job.config)
+
+    def predicted_memory(self, job: PlannerJob) -> float:
+        return self._prediction(job.category, "memory") or 0.
+
+    def order(self, jobs: [PlannerJob]) -> [PlannerJob]:
+        return sorted(jobs, key=self.predicted_time, reverse=True)
+
+    def select(self, pending: deque) -> Optional[int]:
+        if self.executor.free_cores == 0:
+            return None
+        used = sum(job.base_memory + max(job.memory, self.predicted_memory(job)) for job in self.running)
+        for index, job in enumerate(pending):
+            if not self.executor.available(job):
+                continue
+            if self.memory_budget is None or used + self.predicted_memory(job) <= self.memory_budget:
+                return index
+        if len(self.running) == 0:
+            # the job exceeds the budget on its own, run it alone
+            return 0
+        return None
+
+    def finished(self, job: PlannerJob):
+        if job.code == 0:
+            # like the planning times learned from results files, the time is recorded per evaluation
+            self.history.add(*job.category, time=job.duration / evaluations(job.config),
+                             memory=job.peak_memory or None)
+            # the predictions of other categories of the planner fall back to its measurements as well
+            for key in [key for key in self._predictions if key[0] == job.planner]:
+                del self._predictions[key]
+
+
+async def run_benchmarks(benchmarks: list, scheduler: Scheduler, subfolder: str = '',
+                         kill_after_timeout: bool = True, memory_limit=0, silence: bool = False,
+                         show_progress_bar: bool = True, checkpoint: Optional[CheckpointManifest] = None,
+                         resume: bool = False, adaptive: Optional[StoppingRule] = None,
+                         racing: Optional[RacingRule] = None, race_filename: Optional[str] = None) -> [int]:
+    """
+    Runs the benchmarks as fine-grained jobs on a shared scheduler and reassembles the results file of
+    each benchmark once its jobs have finished.
+    :param checkpoint: Manifest the completed jobs and benchmarks are recorded in.
+    :param resume: Skip the jobs and benchmarks the checkpoint manifest records as completed.
+    :param adaptive: Start the runs of every planner in batches until the confidence intervals of its
+        metrics meet the stopping rule, instead of running all runs of the benchmarks (see adaptive.py).
+        The number of runs of the benchmarks is the maximum number of runs.
+    :param racing: Race the planners of every benchmark round by round and stop running the planners that
+        are significantly worse than the best one on the objective of the rule (see racing.py).
+    :param race_filename: JSON file the report of the races (where each planner was eliminated) is saved to.
+    :return: Return code per benchmark (0 if all of its jobs succeeded, otherwise the first error code).
+    """
+    if resume and checkpoint is None:
+        raise Exception("A checkpoint manifest is required to resume benchmarks.")
+    jobs_per_benchmark = []
+    for mpb in benchmarks:
+        if resume and checkpoint.completed_benchmark(mpb.id) is not None:
+            jobs_per_benchmark.append([])
+            continue
+        jobs_folder = os.path.join(subfolder, mpb.id + "_jobs")
+        jobs_per_benchmark.append(decompose(mpb, jobs_folder, kill_after_timeout, memory_limit,
+                                            scheduler.executor))
+    skipped = set()
+    if resume:
+        for jobs in jobs_per_benchmark:
+            for job in jobs:
+                if checkpoint.completed_job(job) is not None:
+                    job.code = 0
+                    skipped.add(job)
+    all_jobs = [job for jobs in jobs_per_benchmark for job in jobs if job not in skipped]
+    controller = None
+    if adaptive is not None and racing is not None:
+        raise Exception("Adaptive runs and racing cannot be combined.")
+    if adaptive is not None:
+        controller = AdaptiveRuns(adaptive, [job for jobs in jobs_per_benchmark for job in jobs])
+    elif racing is not None:
+        controller = Race(racing, [job for jobs in jobs_per_benchmark for job in jobs])
+    if resume and scheduler.executor.events is not None:
+        completed_runs = sum(len(mpb._planners) * evaluations(mpb.config)
+                             for mpb, jobs in zip(benchmarks, jobs_per_benchmark) if not jobs)
+        scheduler.executor.events.emit("runs_skipped", runs=completed_runs + sum(
+            job.info["expected_runs"] for job in skipped))
+    if not silence:
+        if resume:
+            print("Resuming %i jobs of %i benchmarks (%i jobs and %i benchmarks completed before)." % (
+                len(all_jobs), len(benchmarks), len(skipped), sum(len(jobs) == 0 for jobs in jobs_per_benchmark)))
+        else:
+            print("Running %i jobs of %i benchmarks." % (len(all_jobs), len(benchmarks)))
+        if adaptive is not None:
+            print("Adaptive runs: %i to %i runs per planner in batches of %i." % (
+                adaptive.min_runs, adaptive.max_runs, adaptive.batch_size))
+        elif racing is not None:
+            print("Racing planners on %s, testing at significance level %g after every round from round %i on." % (
+                racing.objective, racing.alpha, racing.min_rounds))
+
+    pbar = None
+    if show_progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(all_jobs), desc="jobs")
+    log_files = {}
+    for mpb in benchmarks:
+        mpb.log_filename = os.path.join(subfolder, mpb.id + ".log")
+        log_files[mpb.id] = open(mpb.log_filename, 'a' if resume else 'w')
+    for job in all_jobs:
+        def on_line(line: str, job=job):
+            log_files[job.mpb.id].write("[%s] %s" % (job.key, line))
+
+        job.on_line = on_line
+
+    remaining = [len([job for job in jobs if job not in skipped]) for jobs in jobs_per_benchmark]
+    codes = [0] * len(benchmarks)
+    index = {id(mpb): i for i, mpb in enumerate(benchmarks)}
+
+    def finish(i: int):
+        mpb = benchmarks[i]
+        finish_benchmark(mpb, jobs_per_benchmark[i], subfolder, silence)
+        if checkpoint is not None and all(job.code == 0 for job in jobs_per_benchmark[i]):
+            checkpoint.record_benchmark(mpb.id, mpb.results_filename)
+        log_files[mpb.id].close()
+
+    def drop(jobs: [PlannerJob]):
+        # jobs the adaptive stopping rule or the race does not need anymore
+        for job in jobs:
+            i = index[id(job.mpb)]
+            jobs_per_benchmark[i].remove(job)
+            if job not in skipped:
+                remaining[i] -= 1
+                if pbar is not None:
+                    pbar.update(1)
+        if scheduler.executor.events is None:
+            return
+        groups = {}
+        for job in jobs:
+            groups.setdefault(controller.key(job), []).append(job)
+        for group in groups.values():
+            job = group[0]
+            scheduler.executor.events.emit("runs_stopped", benchmark=job.mpb.id, planner=job.planner,
+                                           steer_function=job.steer_function,
+                                           dropped=len([job for job in group if job not in skipped]),
+                                           **controller.stopped(job))
+
+    def release(jobs: [PlannerJob]) -> [PlannerJob]:
+        # returns the released jobs that still need to run, completed (resumed) jobs are evaluated immediately
+        to_run = []
+        for job in jobs:
+            if job not in skipped:
+                to_run.append(job)
+                continue
+            released, dropped = controller.finished(job)
+            drop(dropped)
+            to_run += release(released)
+        return to_run
+
+    def on_finished(job: PlannerJob):
+        i = index[id(job.mpb)]
+        if pbar is not None:
+            pbar.update(1)
+        if job.code == 0 and checkpoint is not None:
+            checkpoint.record_job(job)
+        if job.code != 0:
+            print("Error (%i) occurred for MPB with ID %s using planner %s (steer function %s, run %i)." % (
+                job.code, job.mpb.id, convert_planner_name(job.planner), job.steer_function, job.run),
+                  file=sys.stderr)
+            if codes[i] == 0:
+                codes[i] = job.code
+        remaining[i] -= 1
+        if controller is not None:
+            released, dropped = controller.finished(job)
+            drop(dropped)
+            scheduler.add(release(released))
+        if remaining[i] == 0:
+            finish(i)
+
+    if controller is not None:
+        all_jobs = release(controller.initial())
+
+    for i, jobs in enumerate(jobs_per_benchmark):
+        if remaining[i] == 0:
+            if jobs:
+                # all jobs had completed before, but their results were not assembled yet
+                finish(i)
+            else:
+                log_files[benchmarks[i].id].close()
+
+    try:
+        await scheduler.run(all_jobs, on_finished)
+    finally:
+        if pbar is not None:
+            pbar.close()
+        for f in log_files.values():
+            f.close()
+    if controller is not None and not silence:
+        controller.print_summary()
+    if racing is not None and race_filename is not None:
+        controller.save_report(race_filename)
+    return codes
+
+
+def finish_benchmark(mpb, jobs: [PlannerJob], subfolder: str, silence: bool):
+    """
+    Assembles the results file of a benchmark whose jobs have all finished, and removes the results of
+    its jobs if all of them succeeded.
+    """
+    raw_results_filename = os.path.join(subfolder, mpb.id) + "_results.json"
+    assemble(mpb, jobs, raw_results_filename, silence=silence)
+    if (mpb.compact_results or mpb.compression) and os.path.exists(raw_results_filename):
+        compact_results(raw_results_filename, mpb.results_filename)
+        if raw_results_filename != mpb.results_filename:
+            os.remove(raw_results_filename)
+    if all(job.code == 0 for job in jobs):
+        shutil.rmtree(os.path.join(subfolder, mpb.id + "_jobs"), ignore_errors=True)
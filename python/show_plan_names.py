@@ -1,12 +1,13 @@
 import argparse
 import json
 from argparse import ArgumentParser
+from results_io import load_results
 
 parser = argparse.ArgumentParser(description="Prints plan names in results file.")
 parser.add_argument("results_file", nargs="*", type=str, help="Results file to check plan names.")
 args = parser.parse_args()
 
-res = json.load(open(args.results_file))
+res = load_results(args.results_file, skip_trajectories=True, skip_intermediary=True)
 name_components = args.results_file.split("_")[-2]
 name_components = name_components[name_components.rfind("/")+1:]
 
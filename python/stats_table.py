@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Columnar storage of plan statistics.
+
+Converts one or more results files into a table with one row per plan and per smoothing result.
+Every field of the "stats" entries becomes a typed NumPy column, and each row is annotated by the
+results file, run ID, planner, smoother, steer function, environment name and seed. Tables are
+stored as one .npy file per column and memory-mapped when loaded, so that queries such as the
+mean path length per planner are vectorized column operations instead of loops over data["runs"].
+"""
+import json
+import os
+
+import numpy as np
+
+from definitions import steer_functions
+from results_io import iter_runs, results_basename
+
+# columns describing where a row comes from; all other columns are statistics
+CATEGORICAL_COLUMNS = ('source', 'planner', 'smoother', 'steer_function', 'environment')
+INDEX_COLUMNS = ('run_id', 'seed')
+
+TABLE_SUFFIX = '.stats'
+
+
+def _steer_function(settings: dict) -> str:
+    try:
+        return steer_functions[settings["steer"]["steering_type"]]
+    except (KeyError, IndexError, TypeError):
+        return ''
+
+
+def _seed(settings: dict) -> int:
+    try:
+        return int(settings["ompl"]["seed"])
+    except (KeyError, TypeError, ValueError):
+        return -1
+
+
+def _stat_value(value):
+    """
+    Maps a statistic to a scalar: lists (e.g. cusps, collisions) are represented by their length,
+    nested objects are dropped.
+    """
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    if isinstance(value, dict):
+        return None
+    return value
+
+
+def _column_array(values: list) -> np.ndarray:
+    present = [v for v in values if v is not None]
+    if len(present) == 0:
+        return np.full(len(values), np.nan)
+    if all(isinstance(v, bool) for v in present):
+        if len(present) == len(values):
+            return np.array(values, dtype=bool)
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=np.int64)
+    if all(isinstance(v, (int, float)) for v in present):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return None
+
+
+class StatsTable:
+    def __init__(self, columns: {str: np.ndarray}, categories: {str: [str]}):
+        """
+        :param columns: Mapping from column names to equally long 1D arrays. Categorical columns
+                        hold integer codes into the corresponding list in `categories`.
+        :param categories: Mapping from categorical column names to the list of their values.
+        """
+        self.columns = columns  # type: {str: np.ndarray}
+        self.categories = categories  # type: {str: [str]}
+
+    def __len__(self) -> int:
+        if len(self.columns) == 0:
+            return 0
+        return len(next(iter(self.columns.values())))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Returns the column with the given name. Categorical columns are returned as integer codes,
+        use `values(name)` to obtain the decoded strings.
+        """
+        return self.columns[name]
+
+    @property
+    def stat_names(self) -> [str]:
+        return [name for name in self.columns if name not in CATEGORICAL_COLUMNS and name not in INDEX_COLUMNS]
+
+    def values(self, name: str) -> np.ndarray:
+        """
+        Returns the decoded values of a categorical column.
+        """
+        return np.array(self.categories[name], dtype=object)[self.columns[name]]
+
+    def code(self, name: str, value: str) -> int:
+        """
+        Returns the integer code of a categorical value, or -1 if it does not occur in the table.
+        """
+        try:
+            return self.categories[name].index(value)
+        except ValueError:
+            return -1
+
+    def mask(self, **conditions) -> np.ndarray:
+        """
+        Selects rows by column values, e.g. mask(steer_function='reeds_shepp', smoother='').
+        A condition can be a single value or a list of accepted values.
+        """
+        selection = np.ones(len(self), dtype=bool)
+        for name, accepted in conditions.items():
+            if not isinstance(accepted, (list, tuple, set)):
+                accepted = [accepted]
+            if name in self.categories:
+                accepted = [self.code(name, value) for value in accepted]
+            selection &= np.isin(self.columns[name], accepted)
+        return selection
+
+    def select(self, mask: np.ndarray) -> 'StatsTable':
+        return StatsTable({name: column[mask] for name, column in self.columns.items()}, self.categories)
+
+    def aggregate(self, stat: str, by: str = 'planner', mask: np.ndarray = None, func: str = 'mean') -> {str: float}:
+        """
+        Aggregates a statistic per value of a categorical column, ignoring missing (NaN) entries.
+        :param stat: Name of the statistics column, e.g. "path_length".
+        :param by: Name of the categorical column to group by.
+        :param mask: Optional boolean row selection (see `mask`).
+        :param func: One of "mean", "std", "sum", "count", "min", "max".
+        :return: Mapping from group values to the aggregated statistic.
+        """
+        values = self.columns[stat].astype(np.float64)
+        codes = self.columns[by]
+        valid = ~np.isnan(values)
+        if mask is not None:
+            valid &= mask
+        values, codes = values[valid], codes[valid]
+        groups = len(self.categories[by])
+        counts = np.bincount(codes, minlength=groups)
+        if func in ('mean', 'sum', 'std'):
+            sums = np.bincount(codes, weights=values, minlength=groups)
+            if func == 'sum':
+                result = sums
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    means = sums / counts
+                    if func == 'mean':
+                        result = means
+                    else:
+                        sq = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=groups)
+                        result = np.sqrt(sq / counts)
+        elif func == 'count':
+            result = counts
+        elif func in ('min', 'max'):
+            result = np.full(groups, np.inf if func == 'min' else -np.inf)
+            (np.minimum if func == 'min' else np.maximum).at(result, codes, values)
+        else:
+            raise ValueError('Unknown aggregation function "%s".' % func)
+        return {self.categories[by][i]: result[i] for i in range(groups) if counts[i] > 0}
+
+    @staticmethod
+    def from_results(results_filenames: [str], include_smoothers: bool = True) -> 'StatsTable':
+        """
+        Builds a table from the given results files, reading one run at a time.
+        """
+        if isinstance(results_filenames, str):
+            results_filenames = [results_filenames]
+        categories = {name: [] for name in CATEGORICAL_COLUMNS}
+        codes = {name: {} for name in CATEGORICAL_COLUMNS}
+        rows = {name: [] for name in CATEGORICAL_COLUMNS + INDEX_COLUMNS}
+        stats = {}
+
+        def encode(name: str, value: str) -> int:
+            if value not in codes[name]:
+                codes[name][value] = len(categories[name])
+                categories[name].append(value)
+            return codes[name][value]
+
+        def add_row(source, run_id, planner, smoother, steer_function, environment, seed, row_stats):
+            index = len(rows['run_id'])
+            for name, value in zip(CATEGORICAL_COLUMNS, (source, planner, smoother, steer_function, environment)):
+                rows[name].append(encode(name, value))
+            rows['run_id'].append(run_id)
+            rows['seed'].append(seed)
+            for key, value in row_stats.items():
+                if key in rows:
+                    continue
+                if key not in stats:
+                    stats[key] = [None] * index
+                stats[key].append(_stat_value(value))
+            for column in stats.values():
+                if len(column) == index:
+                    column.append(None)
+
+        for filename in results_filenames:
+            header = {}
+            for run_id, run in iter_runs(filename, skip_trajectories=True, skip_intermediary=True, header=header):
+                if run is None or not run.get("plans"):
+                    continue
+                settings = run.get("settings", header.get("settings", {}))
+                environment = run.get("environment") or {}
+                env_name = str(environment.get("name", ""))
+                steer_function = _steer_function(settings)
+                seed = _seed(settings)
+                for planner, plan in run["plans"].items():
+                    if plan is None or plan.get("stats") is None:
+                        continue
+                    add_row(filename, run_id, planner, '', steer_function, env_name, seed, plan["stats"])
+                    if not include_smoothers or not plan.get("smoothing"):
+                        continue
+                    for smoother, smoothing in plan["smoothing"].items():
+                        if smoothing is None or smoothing.get("stats") is None:
+                            continue
+                        row_stats = dict(smoothing["stats"])
+                        row_stats["smoothing_time"] = smoothing.get("time")
+                        add_row(filename, run_id, planner, smoother, steer_function, env_name, seed, row_stats)
+
+        columns = {name: np.array(rows[name], dtype=np.int32) for name in CATEGORICAL_COLUMNS}
+        for name in INDEX_COLUMNS:
+            columns[name] = np.array(rows[name], dtype=np.int64)
+        for name, values in stats.items():
+            column = _column_array(values)
+            if column is not None:
+                columns[name] = column
+        return StatsTable(columns, categories)
+
+    def save(self, path: str):
+        """
+        Saves the table as a directory holding one .npy file per column.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, column in self.columns.items():
+            np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(column))
+        with open(os.path.join(path, 'columns.json'), 'w') as f:
+            json.dump({
+                "columns": list(self.columns.keys()),
+                "categories": self.categories
+            }, f, indent=2)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'StatsTable':
+        with open(os.path.join(path, 'columns.json'), 'r') as f:
+            meta = json.load(f)
+        columns = {}
+        for name in meta["columns"]:
+            columns[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+        return StatsTable(columns, meta["categories"])
+
+
+def stats_table(results_filename: str, rebuild: bool = False) -> StatsTable:
+    """
+    Returns the statistics table for a results file. The table is stored next to the results file
+    (e.g. "x_results.stats" for "x_results.json.gz") and only rebuilt if it is missing or older than the results file.
+    """
+    path = results_basename(results_filename) + TABLE_SUFFIX
+    meta_filename = os.path.join(path, 'columns.json')
+    if not rebuild and os.path.exists(meta_filename) and \
+            os.path.getmtime(meta_filename) >= os.path.getmtime(results_filename):
+        return StatsTable.load(path)
+    table = StatsTable.from_results([results_filename])
+    table.save(path)
+    return StatsTable.load(path)
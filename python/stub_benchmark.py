@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Pure-Python stand-in for the benchmark binary, for testing the execution of benchmarks without building
+the planners. It accepts the same configuration files, prints the same progress lines and writes results
+files with the same layout, where every plan has random (but reproducible) statistics.
+
+    ./stub_benchmark.py config.json     # runs one configuration like `benchmark config.json`
+    ./stub_benchmark.py --worker        # persistent worker like `benchmark --worker` (see executor.py)
+
+Use it in place of the binary by pointing mpb.MPB_BINARY to it, e.g.
+mpb.MPB_BINARY = os.path.abspath('stub_benchmark.py').
+
+To test how a binary that gets stuck is handled, set the environment variable STUB_BENCHMARK_HANG_SEED to
+the seed of an environment; the stub hangs before planning in it.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+import click
+
+from definitions import planner_internal_names
+from executor import WORKER_JOB_FINISHED
+
+
+def _plan(planner_name: str, rng: random.Random) -> dict:
+    found = rng.random() < 0.9
+    return {
+        "path": [[0., 0.], [1., 1.]] if found else [],
+        "trajectory": [[0., 0., 0.], [1., 1., 0.]] if found else [],
+        "intermediary_solutions": [],
+        "params": {},
+        "stats": {
+            "planner": planner_name,
+            "planner_settings": {},
+            "path_found": found,
+            "path_collides": False,
+            "exact_goal_path": found,
+            "planning_time": rng.random(),
+            "collision_time": rng.random() * 0.1,
+            "steering_time": rng.random() * 0.1,
+            "path_length": 10 + rng.random() * 10 if found else None,
+            "max_curvature": rng.random(),
+            "normalized_curvature": rng.random(),
+            "aol": rng.random(),
+            "smoothness": rng.random(),
+            "mean_clearing_distance": rng.random(),
+            "median_clearing_distance": rng.random(),
+            "min_clearing_distance": rng.random(),
+            "max_clearing_distance": rng.random(),
+            "total_cost": rng.random() * 20,
+            "cusps": [],
+            "collisions": []
+        },
+        "smoothing": {}
+    }
+
+
+def run_benchmark(config_filename: str, delay: float = 0.) -> int:
+    """
+    Runs the configuration like the benchmark binary and saves the results to its log file.
+    """
+    with open(config_filename, 'r') as f:
+        config = json.load(f)["settings"]
+    print("Loaded the following settings from %s:" % config_filename, flush=True)
+    benchmark = config["benchmark"]
+    planners = [planner for planner, used in benchmark["planning"].items() if used]
+    if benchmark["control_planners_on"]:
+        steer_functions = benchmark["forward_propagations"] or [None]
+    else:
+        steer_functions = benchmark["steer_functions"] or [config["steer"]["steering_type"]]
+    moving_ai = benchmark["moving_ai"]
+    if moving_ai["active"]:
+        run_ids = list(range(moving_ai["start"], moving_ai["end"]))
+    else:
+        run_ids = list(range(benchmark["runs"]))
+    queries = [] if moving_ai["active"] else benchmark.get("queries") or []
+    results = {"globals": {"time": time.strftime("%Y-%m-%d %H:%M:%S")}, "runs": [], "settings": config}
+    seed = config["env"]["grid"]["seed"]
+    hang_seed = os.environ.get("STUB_BENCHMARK_HANG_SEED")
+    for i, run_id in enumerate(run_ids):
+        print("# Benchmark Run %i / %i" % (i + 1, len(run_ids)), flush=True)
+        env = config["env"]
+        if hang_seed is not None and not moving_ai["active"] and seed == int(hang_seed):
+            while True:
+                time.sleep(1)
+        for query in queries or [None]:
+            environment = {
+                "type": env["type"],
+                "width": env["grid"]["width"],
+                "height": env["grid"]["height"],
+                "seed": seed if not moving_ai["active"] else run_id,
+                "start": [env["start"]["x"], env["start"]["y"], env["start"]["theta"]],
+                "goal": [env["goal"]["x"], env["goal"]["y"], env["goal"]["theta"]]
+            }
+            if query is not None:
+                print("# Query %s" % query["name"], flush=True)
+                environment["start"] = query["start"]
+                environment["goal"] = query["goal"]
+            for steer_function in steer_functions:
+                plans = {}
+                for planner in planners:
+                    planner_name = planner_internal_names.get(planner, planner)
+                    rng = random.Random("%s/%s/%s/%s/%s" % (config["ompl"]["seed"], planner, steer_function,
+                                                            environment["seed"], environment["start"]))
+                    time.sleep(delay)
+                    plans[planner_name] = _plan(planner_name, rng)
+                    print("<stats> %s </stats>" % planner_name, flush=True)
+                settings = json.loads(json.dumps(config))
+                if steer_function is not None:
+                    settings["steer"]["steering_type"] = steer_function
+                run = {"environment": environment, "plans": plans, "settings": settings}
+                if query is not None:
+                    run["query"] = query["name"]
+                results["runs"].append(run)
+        seed += 1
+        with open(benchmark["log_file"], 'w') as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+@click.command()
+@click.argument('config_file', required=False, type=click.Path())
+@click.option('--worker', is_flag=True, help='Read configuration file names from stdin, one per line.')
+@click.option('--delay', default=0., help='Seconds every planner takes.', type=float)
+def main(config_file: str, worker: bool, delay: float):
+    if not worker:
+        if config_file is None:
+            print("Usage: %s configuration.json" % sys.argv[0])
+            sys.exit(1)
+        sys.exit(run_benchmark(config_file, delay))
+    for line in sys.stdin:
+        config_file = line.strip()
+        if not config_file:
+            continue
+        try:
+            code = run_benchmark(config_file, delay)
+        except Exception as e:
+            print("Error while running %s: %s" % (config_file, e), file=sys.stderr, flush=True)
+            code = 1
+        print("%s %i </job_finished>" % (WORKER_JOB_FINISHED, code), flush=True)
+
+
+if __name__ == '__main__':
+    main()
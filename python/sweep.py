@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Declarative parameter sweeps over benchmark configurations.
+
+A Sweep combines axes over dotted configuration keys of a base benchmark:
+
+    sweep = Sweep(mpb, id_prefix="mod")
+    sweep.zip({"env.start": starts, "env.goal": goals}, labels=names)   # start/goal pairs
+    sweep.grid({"ompl.optimization_objective": ["dtc", "cliff", "gmmt", "intensity"]})
+    sweep.grid({"ompl.sampler": ["dijkstra", "ellipse", "intensity"]})
+    sweep.variants({"coarse": {"mod.dijkstra_cell_size": 1.0}, "fine": {"mod.dijkstra_cell_size": 0.5}})
+    sweep.latin_hypercube(8, {"mod.sampling_bias": (0.0, 0.2)}, seed=1)
+
+The benchmarks of the sweep are the Cartesian product of its axes. They are generated lazily, one at a
+time, as copy-on-write overlays of the base benchmark (see MPB.overlay), so that a large sweep does not
+hold a full copy of the configuration per benchmark. Values given as dictionaries set their entries
+individually, e.g. {"env.start": {"x": 1, "y": 2, "theta": 0}} sets env.start.x, env.start.y and
+env.start.theta.
+"""
+import itertools
+import os
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+
+def _flatten(key: str, value) -> dict:
+    if isinstance(value, dict):
+        flat = {}
+        for k, v in value.items():
+            flat.update(_flatten("%s.%s" % (key, k), v))
+        return flat
+    return {key: value}
+
+
+def _label(value) -> str:
+    if isinstance(value, float):
+        return "%g" % value
+    if isinstance(value, (dict, list, tuple)):
+        return "-".join(_label(v) for v in (value.values() if isinstance(value, dict) else value))
+    if isinstance(value, str) and os.sep in value:
+        # file names are labeled without their directory and extension
+        value = os.path.splitext(os.path.basename(value))[0]
+    return str(value).replace(' ', '-') or 'none'
+
+
+def _scale(u: float, value_range: Union[tuple, list]):
+    """
+    Maps a number in [0, 1) to a value of the range: a (low, high) tuple of floats or integers
+    (inclusive for integers), or a list of choices.
+    """
+    if isinstance(value_range, list):
+        return value_range[min(int(u * len(value_range)), len(value_range) - 1)]
+    low, high = value_range
+    if isinstance(low, int) and isinstance(high, int):
+        return low + min(int(u * (high - low + 1)), high - low)
+    return float(low + u * (high - low))
+
+
+class Axis:
+    def __init__(self, points: [dict], labels: [str]):
+        """
+        One dimension of a sweep.
+        :param points: Overrides (dotted key -> value) of every point along the axis.
+        :param labels: Label of every point, used in the IDs of the benchmarks.
+        """
+        self.points = points  # type: [dict]
+        self.labels = labels  # type: [str]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+
+class Sweep:
+    def __init__(self, base, id_prefix: str = None,
+                 id_format: Callable[[int, [str], dict], str] = None):
+        """
+        :param base: MPB instance the configurations of the sweep are derived from.
+        :param id_prefix: Prefix of the benchmark IDs (default: the ID of the base benchmark or "sweep").
+        :param id_format: Function (index, labels, overrides) -> ID of a benchmark, by default the prefix
+                          followed by the labels of the benchmark's points on all axes.
+        """
+        self.base = base
+        self.id_prefix = id_prefix or base.id or "sweep"  # type: str
+        self.id_format = id_format
+        self.axes = []  # type: [Axis]
+
+    def __len__(self) -> int:
+        n = 1
+        for axis in self.axes:
+            n *= len(axis)
+        return n
+
+    def grid(self, values: {str: list}) -> 'Sweep':
+        """
+        Adds the Cartesian product of the values of the given keys.
+        """
+        keys = list(values.keys())
+        points, labels = [], []
+        for combination in itertools.product(*[values[key] for key in keys]):
+            point = {}
+            for key, value in zip(keys, combination):
+                point.update(_flatten(key, value))
+            points.append(point)
+            labels.append("-".join(_label(value) for value in combination))
+        self.axes.append(Axis(points, labels))
+        return self
+
+    def zip(self, values: {str: list}, labels: [str] = None) -> 'Sweep':
+        """
+        Adds an axis whose points set the i-th value of every key together (e.g. start/goal pairs).
+        :param labels: Labels of the points (default: their indices).
+        """
+        lengths = set(len(v) for v in values.values())
+        if len(lengths) != 1:
+            raise Exception("All zipped keys of a sweep need the same number of values.")
+        n = lengths.pop()
+        points = []
+        for i in range(n):
+            point = {}
+            for key, key_values in values.items():
+                point.update(_flatten(key, key_values[i]))
+            points.append(point)
+        self.axes.append(Axis(points, list(labels) if labels is not None else [str(i) for i in range(n)]))
+        return self
+
+    def variants(self, variants: {str: dict}) -> 'Sweep':
+        """
+        Adds an axis of named variants that each set their own keys, e.g. samplers with different
+        parameters: {"dijkstra1": {"ompl.sampler": "dijkstra", "mod.sampling_bias": 0.05},
+        "uniform": {"ompl.sampler": ""}}. The names are the labels of the points.
+        """
+        points = []
+        for overrides in variants.values():
+            point = {}
+            for key, value in overrides.items():
+                point.update(_flatten(key, value))
+            points.append(point)
+        self.axes.append(Axis(points, list(variants.keys())))
+        return self
+
+    def _sampled(self, samples: np.ndarray, ranges: {str: Union[tuple, list]}) -> 'Sweep':
+        keys = list(ranges.keys())
+        points = []
+        for row in samples:
+            point = {}
+            for key, u in zip(keys, row):
+                point.update(_flatten(key, _scale(u, ranges[key])))
+            points.append(point)
+        self.axes.append(Axis(points, ["s%i" % i for i in range(len(points))]))
+        return self
+
+    def random(self, n: int, ranges: {str: Union[tuple, list]}, seed: Optional[int] = None) -> 'Sweep':
+        """
+        Adds n points with values drawn uniformly at random.
+        :param ranges: (low, high) tuple or list of choices per key.
+        """
+        rng = np.random.default_rng(seed)
+        return self._sampled(rng.random((n, len(ranges))), ranges)
+
+    def latin_hypercube(self, n: int, ranges: {str: Union[tuple, list]}, seed: Optional[int] = None) -> 'Sweep':
+        """
+        Adds n points sampled by Latin hypercube sampling, i.e. for every key, each of n equally sized
+        strata of its range contains exactly one point.
+        :param ranges: (low, high) tuple or list of choices per key.
+        """
+        rng = np.random.default_rng(seed)
+        samples = np.empty((n, len(ranges)))
+        for d in range(len(ranges)):
+            samples[:, d] = (rng.permutation(n) + rng.random(n)) / n
+        return self._sampled(samples, ranges)
+
+    def overrides(self) -> Iterator[tuple]:
+        """
+        Iterates over the points of the sweep as tuples (index, labels, overrides).
+        """
+        for index, combination in enumerate(itertools.product(*[range(len(axis)) for axis in self.axes])):
+            overrides, labels = {}, []
+            for axis, i in zip(self.axes, combination):
+                overrides.update(axis.points[i])
+                labels.append(axis.labels[i])
+            yield index, labels, overrides
+
+    def __iter__(self):
+        """
+        Iterates over the benchmarks of the sweep, created lazily as overlays of the base benchmark.
+        """
+        for index, labels, overrides in self.overrides():
+            if self.id_format is not None:
+                id = self.id_format(index, labels, overrides)
+            else:
+                id = "_".join([self.id_prefix] + labels)
+            yield self.base.overlay(overrides, id=id)
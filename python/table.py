@@ -1,5 +1,6 @@
 from utils import *
 from definitions import *
+from results_io import iter_runs
 import sys
 
 
@@ -22,22 +23,20 @@ def latex_table(results_filename: str,
         return 'No planners were selected for %s.' % results_filename
     stats = {metric: {planner: [] for planner in planners} for metric in metrics}
     stats["colliding"] = {planner: [] for planner in planners}
-    total_runs = 1
-    with open(results_filename, 'r') as rf:
-        runs = json.load(rf)["runs"]
-        total_runs = len(runs)
-        for run in runs:
-            for planner, plan in run["plans"].items():
-                if planner not in planners:
-                    continue
-                for metric in metrics:
-                    if metric == "path_found":
-                        stats[metric][planner].append(int(plan["stats"][metric]))
-                    elif metric == "cusps":
-                        stats[metric][planner].append(len(plan["stats"][metric]))
-                    else:
-                        stats[metric][planner].append(plan["stats"][metric])
-                stats["colliding"][planner].append(1 - int(plan["stats"]["path_collides"]))
+    total_runs = 0
+    for _, run in iter_runs(results_filename, skip_trajectories=True, skip_intermediary=True):
+        total_runs += 1
+        for planner, plan in run["plans"].items():
+            if planner not in planners:
+                continue
+            for metric in metrics:
+                if metric == "path_found":
+                    stats[metric][planner].append(int(plan["stats"][metric]))
+                elif metric == "cusps":
+                    stats[metric][planner].append(len(plan["stats"][metric]))
+                else:
+                    stats[metric][planner].append(plan["stats"][metric])
+            stats["colliding"][planner].append(1 - int(plan["stats"]["path_collides"]))
     for metric in metrics:
         metric_properties[metric]["max"] = safe_max([safe_mean(stats[metric][planner]) for planner in planners])
         metric_properties[metric]["min"] = safe_min([safe_mean(stats[metric][planner]) for planner in planners])
@@ -60,8 +59,10 @@ def latex_table(results_filename: str,
             elif metric == 'path_found':
                 nc = safe_sum(stats["colliding"][planner])
                 pf = safe_sum(stats["path_found"][planner])
+                # planners may have different numbers of runs (see adaptive.py)
+                planner_runs = len(stats["colliding"][planner]) or total_runs
                 output += '\t{\\hspace{-1.5cm}\\databartwo{%.2f}{%.2f}\\makebox[0pt][c]{\\hspace{1cm}%i / %i}}' \
-                          % (pf / total_runs, nc / total_runs, nc, pf)                
+                          % (pf / planner_runs, nc / planner_runs, nc, pf)
                 output += (' &' if i < len(metrics) - 1 else ' %') + '\n'
             else:
                 mu = safe_mean(stats[metric][planner])
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from adaptive import AdaptiveRuns, StoppingRule, mean_half_width, t_quantile, wilson_half_width
+
+
+def test_t_quantile():
+    assert t_quantile(1) == pytest.approx(12.706, abs=1e-3)
+    assert t_quantile(10) == pytest.approx(2.228, abs=1e-3)
+    assert t_quantile(0) == math.inf
+
+
+def test_mean_half_width_is_relative_to_the_mean():
+    # mean 2, standard deviation 1, t quantile with 2 degrees of freedom 4.303
+    assert mean_half_width([1., 2., 3.]) == pytest.approx(4.303 / math.sqrt(3) / 2, abs=1e-3)
+    assert mean_half_width([5., 5., None, float('nan'), 5.]) == 0.
+    assert mean_half_width([5.]) == math.inf
+    assert mean_half_width([-1., 1.]) == math.inf
+
+
+def test_wilson_half_width_does_not_collapse_without_failures():
+    assert wilson_half_width(10, 10) == pytest.approx(0.1388, abs=1e-4)
+    assert wilson_half_width(0, 10) == wilson_half_width(10, 10)
+    assert wilson_half_width(5, 10) > wilson_half_width(10, 10)
+    assert wilson_half_width(0, 0) == math.inf
+
+
+def test_stopping_rule():
+    rule = StoppingRule()
+    stable = {"path_found": [1] * 10, "path_length": [20.] * 10, "planning_time": [1.] * 10}
+    assert rule.converged(stable)
+    # the success rate of 5 runs is not known precisely enough
+    assert not rule.converged({key: values[:5] for key, values in stable.items()})
+    # the path lengths vary by more than 10% of their mean
+    assert not rule.converged(dict(stable, path_length=[10., 30.] * 5))
+    # without paths, only the success rate needs to converge
+    assert rule.converged({"path_found": [0] * 20})
+
+
+def _jobs(count: int) -> list:
+    mpb = SimpleNamespace(id="b")
+    return [SimpleNamespace(mpb=mpb, planner="rrt", steer_function=0, run=run, code=None,
+                            results_filename="missing.json") for run in range(count)]
+
+
+def _finish(adaptive: AdaptiveRuns, jobs: list) -> (list, list):
+    released, dropped = [], []
+    for job in jobs:
+        # every job timed out, which counts as a failed plan
+        job.code = -9
+        r, d = adaptive.finished(job)
+        released += r
+        dropped += d
+    return released, dropped
+
+
+def test_adaptive_runs_stop_once_the_rule_is_met():
+    jobs = _jobs(20)
+    adaptive = AdaptiveRuns(StoppingRule({"path_found": 0.15}, min_runs=10, batch_size=5, max_runs=20), jobs)
+    initial = adaptive.initial()
+    assert [job.run for job in initial] == list(range(10))
+    released, dropped = _finish(adaptive, initial)
+    assert released == [] and [job.run for job in dropped] == list(range(10, 20))
+    assert adaptive.stopped(jobs[0])["runs"] == 10
+
+
+def test_adaptive_runs_continue_until_the_rule_is_met():
+    jobs = _jobs(20)
+    adaptive = AdaptiveRuns(StoppingRule({"path_found": 0.15}, min_runs=5, batch_size=5, max_runs=20), jobs)
+    released, dropped = _finish(adaptive, adaptive.initial())
+    # the Wilson interval of 5 failed runs is wider than the target
+    assert [job.run for job in released] == list(range(5, 10)) and dropped == []
+    released, dropped = _finish(adaptive, released)
+    assert released == [] and [job.run for job in dropped] == list(range(10, 20))
+    assert adaptive.stopped(jobs[0])["half_widths"]["path_found"] <= 0.15
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import os
+
+from events import EVENTS_EXTENSION, ProgressView, read_events
+from mpb import MultipleMPB
+
+
+def test_sweep_reports_every_job_and_run(make_mpb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = MultipleMPB()
+    pool.benchmarks = [make_mpb(['rrt', 'prm'], id="b%i" % i) for i in range(2)]
+    assert pool.run_parallel(id="sweep", runs=2, processes=2, silence=True, limit_memory=False, pin_cpus=False,
+                             show_plot=False, job_granularity='run')
+    events = list(read_events(os.path.join("sweep", "sweep" + EVENTS_EXTENSION)))
+    assert events[0]["event"] == "sweep_started" and events[-1]["event"] == "sweep_finished"
+    assert events[0]["benchmarks"] == ["b0", "b1"]
+    # 2 benchmarks x 2 planners x 2 runs, one job per planner run
+    assert events[0]["total"] == 8
+    assert events[-1]["codes"] == [0, 0]
+    started = [e for e in events if e["event"] == "job_started"]
+    finished = [e for e in events if e["event"] == "job_finished"]
+    assert len(started) == len(finished) == 8
+    assert sorted(e["job"] for e in started) == sorted(e["job"] for e in finished)
+    assert all(e["code"] == 0 and e["runs"] == 1 and e["expected_runs"] == 1 for e in finished)
+    assert sorted((e["benchmark"], e["planner"], e["run"]) for e in finished) == \
+        sorted((b, p, r) for b in ("b0", "b1") for p in ("rrt", "prm") for r in (0, 1))
+    assert len([e for e in events if e["event"] == "run_finished"]) == 8
+
+    # the progress view shown during the sweep can be reconstructed from the event log
+    view = ProgressView()
+    for event in events:
+        view(event)
+    assert (view.bar.n, view.bar.total) == (8, 8)
+    assert (view.jobs, view.failed, view.running) == (8, 0, set())
+    view.close()
+
+
+def test_progress_view_counts_missing_and_retried_runs():
+    view = ProgressView()
+    view({"event": "sweep_started", "total": 6})
+    view({"event": "job_started", "job": "a", "expected_runs": 3})
+    view({"event": "job_started", "job": "b", "expected_runs": 3})
+    view({"event": "run_finished", "job": "a"})
+    view({"event": "run_finished", "job": "b"})
+    assert view.bar.n == 2 and view.running == {"a", "b"}
+    # a stopped binary runs its runs again
+    view({"event": "job_retried", "job": "b"})
+    assert view.bar.n == 1 and view.running == {"a"}
+    # the runs a killed binary did not finish count as done
+    view({"event": "job_finished", "job": "a", "code": -9, "expected_runs": 3, "peak_memory": 2e9})
+    assert view.bar.n == 3
+    assert (view.jobs, view.failed, view.peak_memory) == (1, 1, 2e9)
+    view.close()
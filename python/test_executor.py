@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import mpb
+from admission import MemoryAdmission
+from conftest import PYTHON_DIR, STUB_BINARY
+from executor import AsyncExecutor, BinaryJob, closing, run_coroutine
+from results_io import iter_runs
+
+
+def test_persistent_worker_memory_excludes_earlier_jobs(make_config):
+    executor = AsyncExecutor(1, STUB_BINARY, PYTHON_DIR, persistent=True)
+    jobs = [BinaryJob(make_config("job%i" % i), label="job %i" % i) for i in range(2)]
+
+    async def run_all():
+        return [await executor.run_job(job) for job in jobs]
+
+    assert run_coroutine(closing(executor, run_all())) == [0, 0]
+    assert jobs[0].base_memory == 0
+    # the second job runs on the worker of the first one
+    assert jobs[1].pid == jobs[0].pid
+    assert jobs[1].base_memory > 0
+    assert jobs[1].peak_memory < jobs[1].base_memory
+
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(mpb.MPB_BINARY_DIR, mpb.MPB_BINARY)),
+                    reason="the benchmark binary has not been built")
+def test_benchmark_worker_plans_the_query_of_every_job(tmp_path):
+    # both jobs use the same map, the second one reuses the environment loaded by the first one
+    executor = AsyncExecutor(1, mpb.MPB_BINARY, mpb.MPB_BINARY_DIR, persistent=True)
+    queries = [((10., 10., 0.), (40., 40., 0.)), ((15., 40., 1.), (45., 12., -1.))]
+    jobs = []
+    for i, (start, goal) in enumerate(queries):
+        m = mpb.MPB()
+        m.set_planners(['rrt'])
+        m.set_smoothers([])
+        m.set_image_grid_env("image_mazes/intel-lab.png")
+        m.set_start(*start)
+        m.set_goal(*goal)
+        m["benchmark.runs"] = 1
+        m["max_planning_time"] = 0.5
+        m.set_id("job%i" % i)
+        m.set_subfolder(str(tmp_path))
+        m.save_settings(m.config_filename)
+        jobs.append((m, BinaryJob(os.path.abspath(m.config_filename), label="job %i" % i)))
+
+    async def run_all():
+        return [await executor.run_job(job) for _, job in jobs]
+
+    assert run_coroutine(closing(executor, run_all())) == [0, 0]
+    assert jobs[1][1].pid == jobs[0][1].pid
+    for (m, _), (start, goal) in zip(jobs, queries):
+        for _, run in iter_runs(m.results_filename, skip_trajectories=True):
+            assert run["environment"]["start"] == list(start[:2])
+            assert run["environment"]["goal"] == list(goal[:2])
+            assert run["settings"]["env"]["start"]["theta"] == start[2]
+            assert run["settings"]["env"]["goal"]["theta"] == goal[2]
+
+def test_admission_counts_the_memory_of_persistent_workers():
+    admission = MemoryAdmission(budget=100)
+    running = {1: SimpleNamespace(memory=10, peak_memory=10, base_memory=50),
+               2: SimpleNamespace(memory=30, peak_memory=30, base_memory=0)}
+    assert admission.used_memory(running) == 90
+    assert admission.victim(running) is None
+    running[2].memory = 45
+    # stopping the worker frees its cached environments as well
+    assert admission.victim(running) is running[1]
+
+
+def _slow_stub(tmp_path, delay: float) -> str:
+    """
+    Returns a binary that runs the stub benchmark with every planner run taking `delay` seconds.
+    """
+    binary = str(tmp_path / "slow_benchmark.sh")
+    with open(binary, 'w') as f:
+        f.write('#!/bin/sh\nexec "%s" "%s" --delay %f "$@"\n' % (sys.executable, STUB_BINARY, delay))
+    os.chmod(binary, 0o755)
+    return binary
+
+
+def test_run_jobs_concurrently(make_config):
+    executor = AsyncExecutor(2, STUB_BINARY, PYTHON_DIR)
+    lines = []
+    jobs = [BinaryJob(make_config("job%i" % i, runs=3), label="job %i" % i, on_line=lines.append)
+            for i in range(3)]
+
+    async def run_all():
+        return await asyncio.gather(*[executor.run_job(job) for job in jobs])
+
+    assert run_coroutine(run_all()) == [0, 0, 0]
+    assert [job.runs for job in jobs] == [3, 3, 3]
+    assert sum('<stats>' in line for line in lines) == 9
+    assert all(os.path.exists(job.config_filename.replace("_config", "_results")) for job in jobs)
+    assert executor.running == {} and executor.free_cores == 2
+
+
+def test_jobs_reserve_disjoint_cores(make_config, tmp_path):
+    executor = AsyncExecutor(4, _slow_stub(tmp_path, 0.3), PYTHON_DIR)
+    executor.cpus = [0, 1, 2, 3]
+    jobs = [BinaryJob(make_config("job%i" % i), label="job %i" % i, threads=threads)
+            for i, threads in enumerate([2, 2, 3])]
+
+    async def run_all():
+        return await asyncio.gather(*[executor.run_job(job) for job in jobs])
+
+    assert run_coroutine(run_all()) == [0, 0, 0]
+    assert [len(job.cpus) for job in jobs] == [2, 2, 3]
+    # the first two jobs run at the same time on different CPUs, the third one waits for their cores
+    assert set(jobs[0].cpus).isdisjoint(jobs[1].cpus)
+    assert jobs[2].start_time >= max(jobs[0].end_time, jobs[1].end_time) - 0.05
+    assert executor.threads(BinaryJob("x", threads=8)) == 4
+
+
+@pytest.mark.parametrize("timeout, run_timeout", [(0.5, None), (None, 0.5)])
+def test_jobs_are_killed_after_their_timeout(make_config, tmp_path, timeout, run_timeout):
+    executor = AsyncExecutor(1, _slow_stub(tmp_path, 2.), PYTHON_DIR)
+    job = BinaryJob(make_config("job"), label="job", timeout=timeout, run_timeout=run_timeout)
+    start = time.time()
+    assert run_coroutine(executor.run_job(job)) == -9
+    assert time.time() - start < 1.5
+    assert job.timed_out and job.run_timed_out == (run_timeout is not None)
+    assert job.runs == 0
+
+
+def test_admission_stops_the_largest_job(make_config, tmp_path):
+    binary = _slow_stub(tmp_path, 2.)
+    alone = BinaryJob(make_config("alone"), label="alone")
+    run_coroutine(AsyncExecutor(1, binary, PYTHON_DIR).run_job(alone))
+    # two binaries fit one after the other, but not next to each other
+    admission = MemoryAdmission(budget=alone.peak_memory * 1.5, max_retries=0, grace_period=0.1,
+                                check_interval=0.1)
+    executor = AsyncExecutor(2, binary, PYTHON_DIR, admission=admission)
+    jobs = [BinaryJob(make_config("job%i" % i), label="job %i" % i) for i in range(2)]
+
+    async def run_all():
+        return await asyncio.gather(*[executor.run_job(job) for job in jobs])
+
+    assert sorted(run_coroutine(run_all())) == [-15, 0]
+    assert sum(job.evicted for job in jobs) == 1
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import json
+import os
+
+from definitions import planner_internal_names
+from history import RuntimeHistory, steer_function_name
+from stub_benchmark import run_benchmark
+
+TEMPLATE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmark_template.json')
+
+
+def test_learn_from_results_uses_config_planner_names(tmp_path):
+    with open(TEMPLATE_FILENAME, 'r') as f:
+        config = json.load(f)["settings"]
+    planners = ['rrt_star', 'informed_rrt_star', 'prm']
+    for planner in config["benchmark"]["planning"].keys():
+        config["benchmark"]["planning"][planner] = planner in planners
+    config["benchmark"]["runs"] = 3
+    config["benchmark"]["log_file"] = str(tmp_path / "test_results.json")
+    config_filename = str(tmp_path / "test_config.json")
+    with open(config_filename, 'w') as f:
+        json.dump({"settings": config}, f)
+    assert run_benchmark(config_filename) == 0
+
+    history = RuntimeHistory(filename=None)
+    assert history.learn_from_results(config["benchmark"]["log_file"], persist=False) == 3 * len(planners)
+    # jobs are predicted by their category (see scheduler.PlannerJob.category)
+    steer_function = steer_function_name(config, config["benchmark"]["steer_functions"][0])
+    for planner in planners:
+        assert history.predict_time(planner, config["env"]["type"], steer_function) is not None
+        assert history.predict_time(planner_internal_names[planner], config["env"]["type"], steer_function) is None
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+
+from conftest import PYTHON_DIR, STUB_BINARY
+from definitions import planner_internal_names
+from executor import AsyncExecutor, run_coroutine
+from job_queue import FileJobQueue, distribute, work
+from results_io import load_results
+
+
+def test_jobs_are_claimed_once_and_requeued_without_heartbeat(tmp_path):
+    queue = FileJobQueue(str(tmp_path / "queue"))
+    queue.put("a", {"benchmark": {}}, timeout=10., threads=2)
+    queue.put("b", {"benchmark": {}})
+    first, second = queue.claim("worker1"), queue.claim("worker2")
+    assert sorted([first["name"], second["name"]]) == ["a", "b"]
+    assert queue.claim("worker3") is None
+
+    results_filename = str(tmp_path / "a_results.json")
+    with open(results_filename, 'w') as f:
+        f.write('{"runs": []}')
+    queue.complete(first, results_filename, 0, worker="worker1", time=1.5)
+    assert queue.done() == {first["name"]: {"name": first["name"], "code": 0, "worker": "worker1", "time": 1.5}}
+    assert os.path.exists(queue.results_filename(first["name"]))
+
+    # worker2 stopped sending heartbeats
+    assert queue.requeue_stale(timeout=0.) == [second["name"]]
+    assert queue.claim("worker3")["name"] == second["name"]
+
+
+def test_distribute_benchmarks_over_workers(make_mpb, tmp_path):
+    benchmarks = []
+    for i in range(2):
+        m = make_mpb(['rrt_star', 'prm'], runs=2, id="bench%i" % i)
+        m.set_steer_functions(['reeds_shepp', 'dubins'])
+        benchmarks.append(m)
+    queue = FileJobQueue(str(tmp_path / "queue"))
+
+    async def run_all():
+        # a second worker claims jobs next to the coordinator's own executor
+        other = AsyncExecutor(1, STUB_BINARY, PYTHON_DIR)
+        coordinator = distribute(benchmarks, queue, str(tmp_path), executor=AsyncExecutor(1, STUB_BINARY, PYTHON_DIR),
+                                 silence=True, show_progress_bar=False, poll_interval=0.05)
+        worker = work(queue, other, str(tmp_path / "other"), worker="other", poll_interval=0.05, silence=True)
+        return await asyncio.gather(coordinator, worker)
+
+    codes, count = run_coroutine(run_all())
+    assert codes == [0, 0]
+    assert queue.closed
+    records = queue.done()
+    assert len(records) == 2 * 2 * 2 * 2
+    assert sum(record["worker"] == "other" for record in records.values()) == count
+    for m in benchmarks:
+        runs = load_results(m.results_filename)["runs"]
+        assert len(runs) == 2 * 2
+        assert all(sorted(run["plans"].keys()) == sorted(planner_internal_names[p] for p in m._planners)
+                   for run in runs)
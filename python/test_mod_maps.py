@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import os
+
+import numpy as np
+import pytest
+
+from conftest import PYTHON_DIR
+from mod_maps import CLiFFMap, GMMTMap, IntensityMap, load_cliff_map, load_gmmt_map, load_intensity_map, \
+    load_mod_map
+
+MAPS_DIR = os.path.join(PYTHON_DIR, '..', 'maps')
+CLIFF_FILENAME = os.path.join(MAPS_DIR, 'office_cubicles_cliffmap.xml')
+GMMT_FILENAME = os.path.join(MAPS_DIR, 'office_cubicles_gmmtmap.xml')
+INTENSITY_FILENAME = os.path.join(MAPS_DIR, 'office_cubicles_intensitymap.xml')
+
+
+@pytest.fixture
+def parsed(monkeypatch) -> [str]:
+    """
+    Returns the list of the map types whose XML files were parsed.
+    """
+    parsed = []
+    for map_class, map_type in ((CLiFFMap, 'cliff'), (GMMTMap, 'gmmt'), (IntensityMap, 'intensity')):
+        def parse(self, filename, map_type=map_type, original=map_class.parse):
+            parsed.append(map_type)
+            original(self, filename)
+
+        monkeypatch.setattr(map_class, 'parse', parse)
+    return parsed
+
+
+def test_cliff_map(tmp_path):
+    cliff = load_cliff_map(CLIFF_FILENAME, cache_dir=str(tmp_path))
+    assert (cliff.x_min, cliff.x_max, cliff.y_min, cliff.y_max, cliff.step) == (-10, 20, -10, 20, 1)
+    assert cliff.positions.shape == (961, 2)
+    assert len(cliff.offsets) == 962 and cliff.offsets[-1] == len(cliff.weights)
+    assert cliff.means.shape == (len(cliff.weights), 2)
+    assert cliff.covariances.shape == (len(cliff.weights), 2, 2)
+    # the first location with distributions has the ID 22
+    location = 21
+    assert cliff.ids[location] == 22
+    assert cliff.positions[location].tolist() == [-10, 11]
+    assert cliff.q[location] == pytest.approx(0.097203)
+    distributions = cliff.distributions(location)
+    assert cliff.weights[distributions].tolist() == pytest.approx([0.51799, 0.30935, 0.17266])
+    assert cliff.means[distributions][0].tolist() == pytest.approx([2.6561, 1.3094])
+    assert np.allclose(cliff.covariances[distributions][1], [[0.0010589, -0.00178], [-0.00178, 0.025762]])
+
+
+def test_gmmt_map(tmp_path):
+    gmmt = load_gmmt_map(GMMT_FILENAME, cache_dir=str(tmp_path))
+    assert (gmmt.M, gmmt.K, gmmt.stddev) == (6, 25, 1.5)
+    assert gmmt.pi.tolist() == pytest.approx([0.24, 0.14, 0.24, 0.06, 0.26, 0.06])
+    assert gmmt.means.shape == (6, 25, 2)
+    assert gmmt.means[0, 0].tolist() == pytest.approx([14.46392687174099, -9.969559326477032])
+
+
+def test_intensity_map(tmp_path):
+    intensity = load_intensity_map(INTENSITY_FILENAME, cache_dir=str(tmp_path))
+    assert intensity.values.shape == (31, 31)
+    assert not np.isnan(intensity.values).any()
+    assert intensity.values[0, 23] == pytest.approx(0.027777777777777776)
+    assert intensity.value(-10 + 23.5, -9.5) == intensity.values[0, 23]
+    assert np.isnan(intensity.value(-11, 0))
+
+
+def test_second_load_reads_the_cache(tmp_path, parsed):
+    first = load_mod_map(CLIFF_FILENAME, cache_dir=str(tmp_path))
+    assert parsed == ['cliff']
+    assert len(os.listdir(str(tmp_path))) == 1
+    # the type is stored in the cache as well
+    second = load_mod_map(CLIFF_FILENAME, cache_dir=str(tmp_path))
+    assert parsed == ['cliff']
+    assert isinstance(second, CLiFFMap)
+    for key, value in vars(first).items():
+        assert np.array_equal(getattr(second, key), value)
+    # the cache is keyed by the contents of the file
+    copied = str(tmp_path / "copy.xml")
+    with open(CLIFF_FILENAME, 'rb') as src, open(copied, 'wb') as dst:
+        dst.write(src.read())
+    load_cliff_map(copied, cache_dir=str(tmp_path))
+    assert parsed == ['cliff']
+
+
+def test_other_map_type_overwrites_the_cache(tmp_path, parsed):
+    load_intensity_map(INTENSITY_FILENAME, cache_dir=str(tmp_path))
+    # a map of another type than the cached one is parsed again and replaces the cache entry
+    cliff = load_cliff_map(INTENSITY_FILENAME, cache_dir=str(tmp_path))
+    assert isinstance(cliff, CLiFFMap) and cliff.positions.shape == (0, 2)
+    assert parsed == ['intensity', 'cliff']
+    assert len(os.listdir(str(tmp_path))) == 1
+    assert isinstance(load_mod_map(INTENSITY_FILENAME, cache_dir=str(tmp_path)), CLiFFMap)
+    assert parsed == ['intensity', 'cliff']
+
+
+def test_load_without_cache(tmp_path, parsed):
+    cache_dir = str(tmp_path / "cache")
+    load_gmmt_map(GMMT_FILENAME, cache_dir=cache_dir, use_cache=False)
+    load_gmmt_map(GMMT_FILENAME, cache_dir=cache_dir, use_cache=False)
+    assert parsed == ['gmmt', 'gmmt']
+    assert not os.path.exists(cache_dir)
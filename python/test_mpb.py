@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import os
+from functools import partial
+
+import pytest
+
+from executor import AsyncExecutor
+from result_cache import ResultCache
+from results_io import load_results
+from stub_benchmark import run_benchmark
+
+
+def _num_threads(config: dict) -> str:
+    return config["ompl"]["geometric_planner_settings"]["CForest"]["num_threads"]
+
+
+def test_planner_config_keeps_the_default_thread_count_without_pinned_cores(make_mpb):
+    m = make_mpb(['cforest'])
+    assert _num_threads(m.config) == ""
+    executor = AsyncExecutor(16, pin_cpus=False)
+    config = m.planner_config('cforest', 'x_results.json', executor.reserved_threads(m.planner_threads('cforest')))
+    assert _num_threads(config) == ""
+
+
+def test_planner_config_uses_the_pinned_cores(make_mpb):
+    m = make_mpb(['cforest'])
+    assert _num_threads(m.planner_config('cforest', 'x_results.json', reserved_threads=4)) == "4"
+    # explicitly configured thread counts are never changed
+    m["ompl.geometric_planner_settings.CForest.num_threads"] = "2"
+    assert m.planner_threads('cforest') == 2
+    assert _num_threads(m.planner_config('cforest', 'x_results.json', reserved_threads=4)) == "2"
+
+
+@pytest.mark.parametrize('compression', [None, 'gz'])
+def test_run_reuses_cached_results(make_mpb, tmp_path, compression):
+    cache = ResultCache(str(tmp_path / "cache"))
+    m = make_mpb(['rrt'], runs=2)
+    run = partial(m.run, subfolder=str(tmp_path), show_progress_bar=False, silence=True, use_cache=cache,
+                  compression=compression)
+    assert run(id="first") == 0
+    first = load_results(m.results_filename)
+    assert run(id="second") == 0
+    # the binary did not run again, only the log file in the settings differs
+    assert not os.path.exists(str(tmp_path / "second.log"))
+    second = load_results(m.results_filename)
+    assert second["settings"]["benchmark"]["log_file"] == m["benchmark.log_file"]
+    for results in (first, second):
+        del results["settings"]["benchmark"]["log_file"]
+        for run_results in results["runs"]:
+            del run_results["settings"]["benchmark"]["log_file"]
+    assert second == first
+
+    # a different configuration is not served from the cache
+    m["ompl.seed"] = m["ompl.seed"] + 1
+    assert run(id="third") == 0
+    assert os.path.exists(str(tmp_path / "third.log"))
+
+
+def test_run_keeps_the_runs_around_a_stuck_run(make_mpb, tmp_path, monkeypatch):
+    m = make_mpb(['rrt'], runs=4)
+    m["max_planning_time"] = 0.5
+    run = partial(m.run, subfolder=str(tmp_path), show_progress_bar=False, silence=True)
+    assert run(id="complete") == 0
+    complete = load_results(m.results_filename)["runs"]
+    seed = m["env.grid.seed"]
+    # the binary gets stuck in the second run and is killed
+    monkeypatch.setenv("STUB_BENCHMARK_HANG_SEED", str(seed + 1))
+    assert run(id="salvaged") == 0
+    salvaged = load_results(m.results_filename)["runs"]
+    assert [r["environment"]["seed"] if r["environment"] else None for r in salvaged] == \
+        [seed, None, seed + 2, seed + 3]
+    stats = salvaged[1]["plans"]["RRT"]["stats"]
+    assert stats["timed_out"] and not stats["path_found"]
+    # the binary is restarted with the environments it would have created after the stuck run
+    for i in (0, 2, 3):
+        assert salvaged[i]["plans"] == complete[i]["plans"]
+    assert not [f for f in os.listdir(str(tmp_path)) if ".part" in f or ".failed" in f]
+
+
+def test_incremental_merge_appends_the_plans_of_every_planner(make_mpb, tmp_path):
+    planners = ['rrt', 'prm', 'sst']
+    m = make_mpb(planners, runs=3)
+    # the results of the binary running all planners at once
+    expected_filename = str(tmp_path / "expected_results.json")
+    config = m.planner_config(planners[0], expected_filename)
+    for planner in planners:
+        config["benchmark"]["planning"][planner] = True
+    m.save_settings(str(tmp_path / "expected_config.json"), config)
+    run_benchmark(str(tmp_path / "expected_config.json"))
+    expected = [run["plans"] for run in load_results(expected_filename)["runs"]]
+
+    run = partial(m.run, subfolder=str(tmp_path), show_progress_bar=False, silence=True, incremental_merge=True)
+    for _ in range(2):
+        # running again replaces the results instead of appending the plans to the previous ones
+        assert run(id="incremental") == 0
+        assert [r["plans"] for r in load_results(m.results_filename)["runs"]] == expected
+        assert sorted(os.listdir(str(tmp_path))) == sorted(
+            ["expected_config.json", "expected_results.json", "incremental.log", "incremental_config.json",
+             "incremental_results.json"])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import os
+
+import numpy as np
+import pytest
+
+import occmap
+from occmap import OccMap, _downsample
+
+IMAGE = np.array([[0, 0, 254, 254, 10],
+                  [0, 2, 254, 254, 10],
+                  [100, 100, 50, 51, 10],
+                  [100, 100, 50, 51, 10],
+                  [7, 7, 7, 7, 7]], dtype=np.uint8)
+
+
+@pytest.fixture
+def map_yaml(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(occmap, 'CACHE_DIR', str(tmp_path / "cache"))
+    monkeypatch.setattr(occmap, '_loaded', {})
+    with open(str(tmp_path / "test.pgm"), 'wb') as f:
+        f.write(b"P5\n5 5\n255\n" + IMAGE.tobytes())
+    filename = str(tmp_path / "test.yaml")
+    with open(filename, 'w') as f:
+        f.write("image: test.pgm\nresolution: 0.5\norigin: [-1.0, -2.0, 0.0]\n")
+    return filename
+
+
+def test_downsample_averages_blocks_of_pixels():
+    # the last row and column do not fill a block and are dropped
+    assert _downsample(IMAGE).tolist() == [[0, 254], [100, 50]]
+    assert np.allclose(_downsample(IMAGE.astype(np.float32) / 255), [[0.5 / 255, 254 / 255],
+                                                                     [100 / 255, 50.5 / 255]])
+    # images of a single row or column cannot be downsampled further
+    row = IMAGE[:1]
+    assert _downsample(row) is row
+
+
+def test_pyramid(map_yaml):
+    m = OccMap()
+    m.load(map_yaml)
+    assert np.array_equal(m.image, IMAGE)
+    assert (m.x_min, m.y_min, m.x_max, m.y_max) == (-1., -2., 2.5, 1.5)
+    assert m.level(0) is m.image
+    assert m.level(2).shape == (1, 1) and m.level(2)[0, 0] == 101
+    assert len(m.levels) == 3
+    assert [m.level_for_width(width) for width in (None, 10, 5, 3, 2, 1)] == [0, 0, 0, 0, 1, 2]
+
+
+def test_loaded_maps_are_shared(map_yaml, tmp_path):
+    first = OccMap()
+    first.load(map_yaml)
+    assert isinstance(first.image, np.memmap)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 1
+    second = OccMap()
+    second.load(map_yaml)
+    assert second.image is first.image
+    # the decoded image is memory-mapped from the cache in other processes
+    occmap._loaded.clear()
+    third = OccMap()
+    third.load(map_yaml)
+    assert third.image is not first.image and np.array_equal(third.image, IMAGE)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 1
+
+    uncached = OccMap()
+    uncached.load(map_yaml, use_cache=False)
+    assert not isinstance(uncached.image, np.memmap) and np.array_equal(uncached.image, IMAGE)
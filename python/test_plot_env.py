@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import json
+
+import matplotlib
+import numpy as np
+from click.testing import CliRunner
+
+matplotlib.use('Agg')
+
+from plot_env import decode_map, grid_map, main
+from results_io import SHARED_ENVIRONMENT_KEY, deduplicate_environments, load_results
+
+MAP = np.array([[0, 1, 1], [0, 0, 1]])
+
+
+def _environment(start: [float]) -> dict:
+    return {
+        "type": "grid",
+        "generator": "random",
+        "seed": 1,
+        "width": 3,
+        "height": 2,
+        "map": "".join(str(cell) for cell in MAP.flatten()),
+        "start": start,
+        "goal": [2.5, 0.5, 0.]
+    }
+
+
+def test_decode_map():
+    assert np.array_equal(decode_map("011001", 3, 2), MAP)
+    # separators between the rows are ignored
+    assert np.array_equal(decode_map("011\n001", 3, 2), MAP)
+    assert not decode_map("011001", 3, 2).flags.writeable
+
+
+def test_grid_map_of_shared_environments(tmp_path):
+    filename = str(tmp_path / "test_results.json")
+    with open(filename, 'w') as f:
+        json.dump({"runs": [{"environment": _environment([0.5, i + 0.5, 0.]), "plans": {}} for i in range(2)]}, f)
+    assert deduplicate_environments(filename, compact=True) == 1
+    runs = load_results(filename)["runs"]
+    assert runs[0]["environment"][SHARED_ENVIRONMENT_KEY] == runs[1]["environment"][SHARED_ENVIRONMENT_KEY]
+    assert [run["environment"]["start"] for run in runs] == [[0.5, 0.5, 0.], [0.5, 1.5, 0.]]
+    maps = [grid_map(run["environment"]) for run in runs]
+    assert np.array_equal(maps[0], MAP)
+    # the map of a shared environment is decoded once
+    assert maps[1] is maps[0]
+
+    result = CliRunner().invoke(main, ["--json_file", filename, "--run_id", "all", "--headless", "true",
+                                       "--show_distances", "false", "--save_file", str(tmp_path / "env.png")])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "env_0.png").exists() and (tmp_path / "env_1.png").exists()
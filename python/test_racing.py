@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from types import SimpleNamespace
+
+import pytest
+
+from racing import Race, RacingRule, friedman_eliminate
+
+# path lengths of 4 planners on 12 runs
+BLOCKS = [[0.09, 0.39, 1.1, 1.18], [0.09, 0.58, 0.78, 0.76], [0.73, 0.26, 0.69, 1.12], [0.43, 0.74, 1.04, 1.56],
+          [0.28, 0.8, 1.0, 0.89], [0.0, 1.12, 0.6, 0.91], [0.89, 0.74, 0.77, 1.37], [0.03, 0.86, 0.67, 0.69],
+          [0.66, 1.08, 0.51, 1.23], [0.3, 0.89, 1.02, 0.82], [0.83, 0.81, 0.98, 1.42], [0.43, 0.91, 1.18, 0.7]]
+# reference p-values from scipy.stats.friedmanchisquare and scikit_posthocs.posthoc_conover_friedman
+FRIEDMAN_P_VALUE = 0.004223463658686329
+# Conover's test of planners 1, 2 and 3 against the best planner 0
+CONOVER_P_VALUES = [0.065901, 0.004565, 0.000198]
+
+
+def test_friedman_p_value():
+    _, p_value = friedman_eliminate(BLOCKS)
+    assert p_value == pytest.approx(FRIEDMAN_P_VALUE)
+
+
+@pytest.mark.parametrize("alpha, worse", [
+    (0.0044, [3]),
+    (0.0047, [2, 3]),
+    (0.065, [2, 3]),
+    (0.067, [1, 2, 3]),
+])
+def test_conover_eliminates_at_reference_p_values(alpha, worse):
+    # every candidate is eliminated iff its reference p-value is below alpha
+    assert friedman_eliminate(BLOCKS, alpha=alpha)[0] == worse
+
+
+def test_no_elimination_without_significant_difference():
+    assert friedman_eliminate(BLOCKS, alpha=0.004)[0] == []
+    assert friedman_eliminate([[1., 1., 1.]] * 10) == ([], 1.)
+
+
+def _race(alpha: float) -> Race:
+    mpb = SimpleNamespace(id="test")
+    jobs = [SimpleNamespace(mpb=mpb, planner="planner%i" % j, steer_function=None, run=run)
+            for run in range(len(BLOCKS)) for j in range(len(BLOCKS[0]))]
+    race = Race(RacingRule(alpha=alpha), jobs)
+    state = race.races["test"]
+    state["released"] = len(BLOCKS)
+    for run, block in enumerate(BLOCKS):
+        for j, value in enumerate(block):
+            state["values"][(run, None, "planner%i" % j)] = {None: value}
+    return race
+
+
+@pytest.mark.parametrize("alpha, worse", [(0.0044, ["planner3"]), (0.067, ["planner1", "planner2", "planner3"])])
+def test_race_tests_at_the_significance_level_of_its_rule(alpha, worse):
+    race = _race(alpha)
+    assert race._test(race.races["test"]) == worse
+    assert race.report()["test"]["alpha"] == alpha
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import json
+import os
+
+import numpy as np
+import pytest
+
+import results_io
+from results_io import SHARED_ENVIRONMENT_KEY, ResultsWriter, compact_results, count_runs, \
+    deduplicate_environments, externalize_arrays, failed_plan, iter_runs, load_results, merge_results, read_header
+
+
+def _plan(planner: str, offset: float) -> dict:
+    plan = failed_plan(planner)
+    plan["trajectory"] = [[offset, 0., 0.], [offset + 1., 1., 0.]]
+    plan["path"] = [[offset, 0.], [offset + 1., 1.]]
+    return plan
+
+
+def _write_results(filename: str, planner: str, runs: int = 3):
+    with ResultsWriter(filename) as writer:
+        for run in range(runs):
+            writer.write_run({"environment": {"type": "grid", "start": [0, 0, 0], "goal": [1, 1, 0]},
+                              "plans": {planner: _plan(planner, float(run))}})
+        writer.header["settings"] = {"benchmark": {"runs": runs}}
+
+
+@pytest.fixture
+def externalized_results(tmp_path):
+    """
+    Results file in a subfolder whose trajectories and paths are stored in a sidecar file.
+    """
+    os.makedirs(str(tmp_path / "sub"))
+    filename = str(tmp_path / "sub" / "x_results.json")
+    _write_results(filename, "RRTstar")
+    externalize_arrays(filename)
+    assert '"sidecar"' in open(filename).read()
+    return filename
+
+
+def _assert_trajectories(results: dict, planner: str = "RRTstar"):
+    for i, run in enumerate(results["runs"]):
+        np.testing.assert_array_equal(run["plans"][planner]["trajectory"], [[i, 0., 0.], [i + 1., 1., 0.]])
+
+
+def test_merge_separate_runs_across_directories(tmp_path, externalized_results):
+    target = str(tmp_path / "merged_results.json")
+    assert merge_results([externalized_results, externalized_results], target, make_separate_runs=True)
+    results = load_results(target)
+    assert len(results["runs"]) == 6
+    _assert_trajectories({"runs": results["runs"][:3]})
+    _assert_trajectories({"runs": results["runs"][3:]})
+
+
+def test_merge_plans_across_directories(tmp_path, externalized_results):
+    other = str(tmp_path / "sub" / "y_results.json")
+    _write_results(other, "PRM")
+    target = str(tmp_path / "merged_results.json")
+    merge_results([externalized_results, other], target)
+    results = load_results(target)
+    assert [sorted(run["plans"].keys()) for run in results["runs"]] == [["PRM", "RRTstar"]] * 3
+    _assert_trajectories(results)
+    _assert_trajectories(results, "PRM")
+
+
+@pytest.mark.parametrize("target", ["compact_results.json", "compact_results.json.gz"])
+def test_compact_across_directories(tmp_path, externalized_results, target):
+    target = str(tmp_path / target)
+    compact_results(externalized_results, target)
+    _assert_trajectories(load_results(target))
+
+
+def _binary_results(filename: str) -> dict:
+    """
+    Writes a results file the way the benchmark binary does, with settings before and globals after the runs.
+    """
+    results = {
+        "settings": {"benchmark": {"runs": 3}, "name": 'with "quotes", \\ and {braces} ]'},
+        "runs": [{"environment": {"type": "grid", "name": "run {%i}" % i},
+                  "plans": {"RRTstar": _plan("RRTstar", float(i)), "PRM": failed_plan("PRM")}}
+                 for i in range(3)],
+        "globals": {"time": "2020-01-01 00:00:00"}
+    }
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=4)
+    return results
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, results_io.CHUNK_SIZE])
+def test_iter_runs_matches_json_load(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(results_io._Scanner.__init__, '__defaults__', (chunk_size,))
+    filename = str(tmp_path / "x_results.json")
+    results = _binary_results(filename)
+    header = {}
+    assert [run for _, run in iter_runs(filename, header=header)] == results["runs"]
+    assert header == {"settings": results["settings"], "globals": results["globals"]}
+    assert read_header(filename) == header
+    assert count_runs(filename) == 3
+    assert load_results(filename) == results
+
+
+def test_iter_runs_skips_trajectories(tmp_path):
+    filename = str(tmp_path / "x_results.json")
+    results = _binary_results(filename)
+    for (run_id, run), expected in zip(iter_runs(filename, skip_trajectories=True, skip_intermediary=True),
+                                       results["runs"]):
+        for planner, plan in run["plans"].items():
+            assert plan["trajectory"] is None and plan["path"] is None and plan["intermediary_solutions"] is None
+            assert plan["stats"] == expected["plans"][planner]["stats"]
+
+
+def _planner_results(tmp_path, planners: [str], runs: int = 3) -> [str]:
+    filenames = []
+    for planner in planners:
+        filename = str(tmp_path / ("%s_results.json" % planner))
+        _write_results(filename, planner, runs)
+        filenames.append(filename)
+    return filenames
+
+
+@pytest.mark.parametrize("target", ["merged_results.json", "merged_results.json.gz"])
+def test_merge_round_trip(tmp_path, target):
+    filenames = _planner_results(tmp_path, ["RRTstar", "PRM", "SST"])
+    target = str(tmp_path / target)
+    assert merge_results(filenames, target) == filenames
+    merged = load_results(target)
+    assert merged["settings"] == load_results(filenames[0])["settings"]
+    sources = [load_results(filename) for filename in filenames]
+    assert len(merged["runs"]) == 3
+    for i, run in enumerate(merged["runs"]):
+        assert run["environment"] == sources[0]["runs"][i]["environment"]
+        expected = {}
+        for source in sources:
+            expected.update(source["runs"][i]["plans"])
+        assert run["plans"] == expected
+
+
+def test_merge_skips_duplicate_and_renames_plans(tmp_path):
+    filenames = _planner_results(tmp_path, ["RRTstar", "PRM"])
+    target = str(tmp_path / "merged_results.json")
+    merge_results(filenames + [filenames[1]], target, silence=True)
+    assert [sorted(run["plans"].keys()) for run in load_results(target)["runs"]] == [["PRM", "RRTstar"]] * 3
+
+    merge_results(filenames, target, plan_names=["first", "second"])
+    merged = load_results(target)
+    assert [sorted(run["plans"].keys()) for run in merged["runs"]] == [["first", "second"]] * 3
+    assert merged["runs"][1]["plans"]["second"] == load_results(filenames[1])["runs"][1]["plans"]["PRM"]
+
+
+def test_merge_separate_runs_round_trip(tmp_path):
+    filenames = _planner_results(tmp_path, ["RRTstar", "PRM"], runs=2)
+    missing = str(tmp_path / "missing_results.json")
+    broken = str(tmp_path / "broken_results.json")
+    with open(broken, 'w') as f:
+        f.write('{"runs": [{"plans": ')
+    target = str(tmp_path / "merged_results.json")
+    assert merge_results(filenames + [broken], target, make_separate_runs=True) == filenames
+    assert merge_results([missing], str(tmp_path / "empty_results.json")) == []
+    runs = load_results(target)["runs"]
+    assert runs == load_results(filenames[0])["runs"] + load_results(filenames[1])["runs"]
+
+
+@pytest.mark.parametrize("extension", ["", ".gz", ".bz2", ".xz"])
+def test_compact_round_trip(tmp_path, extension):
+    filename = str(tmp_path / "x_results.json")
+    results = _binary_results(filename)
+    target = str(tmp_path / ("compact_results.json" + extension))
+    compact_results(filename, target)
+    assert load_results(target) == results
+    assert os.path.getsize(target) < os.path.getsize(filename)
+    if not extension:
+        with open(target) as f:
+            assert '\n' not in f.read().strip()
+
+
+def test_externalize_round_trip(tmp_path):
+    filename = str(tmp_path / "x_results.json")
+    results = _binary_results(filename)
+    target = str(tmp_path / "y_results.json.gz")
+    sidecar = externalize_arrays(filename, target, compact=True)
+    assert sidecar == str(tmp_path / "y_results.arrays")
+    assert os.path.getsize(sidecar) == sum(8 * np.size(plan[key]) for run in results["runs"]
+                                           for plan in run["plans"].values() for key in ("trajectory", "path"))
+    for (_, run), expected in zip(iter_runs(target), results["runs"]):
+        for planner, plan in run["plans"].items():
+            for key in ("trajectory", "path"):
+                np.testing.assert_array_equal(plan[key], expected["plans"][planner][key])
+    # the references are kept as they are stored
+    _, run = next(iter_runs(target, resolve_arrays=False))
+    reference = run["plans"]["RRTstar"]["trajectory"]
+    assert reference["sidecar"] == "y_results.arrays" and reference["shape"] == [2, 3]
+    assert run["plans"]["PRM"]["trajectory"] == []
+
+
+def _without_hashes(runs: [dict]) -> [dict]:
+    # resolved environments keep the hash of their shared environment
+    for run in runs:
+        del run["environment"][SHARED_ENVIRONMENT_KEY]
+    return runs
+
+
+def test_deduplicate_round_trip(tmp_path):
+    filename = str(tmp_path / "x_results.json")
+    with ResultsWriter(filename) as writer:
+        for i in range(4):
+            writer.write_run({"environment": {"type": "grid", "grid": [[i % 2] * 50] * 50,
+                                              "start": [i, 0, 0], "goal": [1, 1, 0]},
+                              "plans": {"PRM": failed_plan("PRM")}})
+    results = load_results(filename)
+    target = str(tmp_path / "dedup_results.json")
+    assert deduplicate_environments(filename, target) == 2
+    assert os.path.getsize(target) < os.path.getsize(filename) / 1.5
+    assert _without_hashes(load_results(target)["runs"]) == results["runs"]
+    _, run = next(iter_runs(target, resolve_environments=False))
+    assert set(run["environment"].keys()) == {"start", "goal", SHARED_ENVIRONMENT_KEY}
+
+    # runs merged from deduplicated files keep their shared environments
+    merged = str(tmp_path / "merged_results.json")
+    merge_results([target, target], merged, make_separate_runs=True, deduplicate=True)
+    assert _without_hashes(load_results(merged)["runs"]) == results["runs"] * 2
+    assert len(read_header(merged)["environments"]) == 2
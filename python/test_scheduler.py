@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import os
+from collections import deque
+
+from checkpoint import CHECKPOINT_EXTENSION, CheckpointManifest
+from conftest import PYTHON_DIR, STUB_BINARY
+from definitions import planner_internal_names
+from executor import AsyncExecutor, run_coroutine
+from history import RuntimeHistory
+from results_io import load_results
+from scheduler import PredictiveScheduler, Scheduler, assemble, decompose, run_benchmarks
+from stub_benchmark import run_benchmark
+
+QUERIES = [{"name": "a", "start": [1, 1, 0], "goal": [5, 5, 0]}, {"name": "b", "start": [5, 5, 0], "goal": [1, 1, 0]}]
+
+
+def _benchmark(make_mpb):
+    m = make_mpb(['rrt_star', 'prm'], runs=3)
+    m.set_steer_functions(['reeds_shepp', 'dubins'])
+    m.set_queries(QUERIES)
+    return m
+
+
+def _run(jobs, timed_out=lambda job: False):
+    for job in jobs:
+        if timed_out(job):
+            job.code = -9
+        else:
+            job.code = run_benchmark(job.config_filename)
+
+
+def _layout(results: dict) -> [tuple]:
+    return [(run["environment"]["seed"] if run["environment"] else None, run.get("query"),
+             run["settings"]["steer"]["steering_type"]) for run in results["runs"]]
+
+
+def test_assemble_orders_runs_by_run_query_and_steer_function(make_mpb, tmp_path):
+    m = _benchmark(make_mpb)
+    jobs = decompose(m, str(tmp_path / "jobs"))
+    assert len(jobs) == 2 * 2 * 3
+    _run(jobs, timed_out=lambda job: job.planner == 'prm' and job.run == 1)
+    filename = str(tmp_path / "test_results.json")
+    assert assemble(m, jobs, filename) == 3 * 2 * 2
+    results = load_results(filename)
+    seed = m["env.grid.seed"]
+    expected = [(seed + run, query["name"], steer_function)
+                for run in range(3) for query in QUERIES for steer_function in m["benchmark.steer_functions"]]
+    assert _layout(results) == expected
+    for i, run in enumerate(results["runs"]):
+        assert sorted(run["plans"].keys()) == sorted(planner_internal_names[p] for p in ('rrt_star', 'prm'))
+        prm = run["plans"][planner_internal_names['prm']]["stats"]
+        assert prm.get("timed_out", False) == (i // 4 == 1)
+
+
+def test_assemble_keeps_runs_in_which_all_planners_timed_out(make_mpb, tmp_path):
+    m = _benchmark(make_mpb)
+    jobs = decompose(m, str(tmp_path / "jobs"))
+    dubins = m["benchmark.steer_functions"][1]
+    _run(jobs, timed_out=lambda job: job.run == 1)
+    filename = str(tmp_path / "test_results.json")
+    assert assemble(m, jobs, filename) == 3 * 2 * 2
+    results = load_results(filename)
+    assert [seed for seed, _, _ in _layout(results)] == [m["env.grid.seed"]] * 4 + [None] * 4 + \
+        [m["env.grid.seed"] + 2] * 4
+    for run in results["runs"][4:8]:
+        assert all(plan["stats"]["timed_out"] for plan in run["plans"].values())
+        assert len(run["plans"]) == 2
+
+    # the environment of a run is taken from the steer functions in which some planner finished
+    _run(jobs, timed_out=lambda job: job.run == 1 and job.steer_function == dubins)
+    assemble(m, jobs, filename)
+    assert [seed for seed, _, _ in _layout(load_results(filename))] == \
+        [m["env.grid.seed"] + run for run in range(3) for _ in range(4)]
+
+
+def _benchmarks(make_mpb, count: int = 2):
+    benchmarks = []
+    for i in range(count):
+        m = make_mpb(['rrt_star', 'prm', 'sst'], runs=3, id="bench%i" % i)
+        m.set_steer_functions(['reeds_shepp', 'dubins'])
+        benchmarks.append(m)
+    return benchmarks
+
+
+def _binary_layout(m, tmp_path) -> [tuple]:
+    """
+    Layout of the results the binary writes when it runs the whole benchmark at once.
+    """
+    config = m.planner_config(m._planners[0], str(tmp_path / (m.id + "_binary_results.json")))
+    config_filename = str(tmp_path / (m.id + "_binary_config.json"))
+    m.save_settings(config_filename, config)
+    run_benchmark(config_filename)
+    return _layout(load_results(config["benchmark"]["log_file"]))
+
+
+def test_run_benchmarks_assembles_the_layout_of_the_binary(make_mpb, tmp_path):
+    benchmarks = _benchmarks(make_mpb)
+    scheduler = Scheduler(AsyncExecutor(2, STUB_BINARY, PYTHON_DIR))
+    codes = run_coroutine(run_benchmarks(benchmarks, scheduler, str(tmp_path), silence=True,
+                                         show_progress_bar=False))
+    assert codes == [0, 0]
+    for m in benchmarks:
+        results = load_results(m.results_filename)
+        assert _layout(results) == _binary_layout(m, tmp_path)
+        planners = sorted(planner_internal_names[p] for p in m._planners)
+        assert all(sorted(run["plans"].keys()) == planners for run in results["runs"])
+        # the results of the jobs are removed once they are assembled
+        assert not os.path.exists(str(tmp_path / (m.id + "_jobs")))
+
+
+def test_predictive_scheduler_starts_the_longest_jobs_first(make_mpb, tmp_path):
+    benchmarks = _benchmarks(make_mpb, count=1)
+    jobs = decompose(benchmarks[0], str(tmp_path / "jobs"))
+    history = RuntimeHistory(filename=None)
+    seconds = {'rrt_star': 1., 'prm': 5., 'sst': 3.}
+    for planner, time in seconds.items():
+        history.add(planner, benchmarks[0]["env.type"], '', time, memory=time * 1e9, persist=False)
+    scheduler = PredictiveScheduler(AsyncExecutor(2, STUB_BINARY, PYTHON_DIR), history, memory_budget=6e9)
+    ordered = scheduler.order(jobs)
+    assert [job.planner for job in ordered] == ['prm'] * 6 + ['sst'] * 6 + ['rrt_star'] * 6
+    # a running prm job leaves memory for a rrt_star job, but not for a sst job
+    scheduler.running = {ordered[0]}
+    assert ordered[scheduler.select(deque(ordered[1:])) + 1].planner == 'rrt_star'
+    scheduler.running = set()
+
+    codes = run_coroutine(run_benchmarks(benchmarks, scheduler, str(tmp_path), silence=True,
+                                         show_progress_bar=False))
+    assert codes == [0]
+    # the finished jobs are added to the history
+    assert len(history) == 3 + len(jobs)
+
+
+def test_predictive_scheduler_records_and_predicts_the_time_per_query(make_mpb, tmp_path):
+    m = _benchmark(make_mpb)
+    jobs = decompose(m, str(tmp_path / "jobs"))
+    history = RuntimeHistory(filename=None)
+    history.add('prm', m["env.type"], 'reeds_shepp', 2., persist=False)
+    scheduler = PredictiveScheduler(AsyncExecutor(1, STUB_BINARY, PYTHON_DIR), history)
+    job = next(job for job in jobs if job.planner == 'prm' and job.steer_function == 0)
+    # every job evaluates both queries
+    assert scheduler.predicted_time(job) == 4.
+    job.code, job.start_time, job.end_time, job.peak_memory = 0, 10., 16., 1e9
+    scheduler.finished(job)
+    assert history.records[job.category]["time"] == [2., 3.]
+    # the cached prediction of the planner is updated
+    assert scheduler.predicted_time(job) == 5.
+    assert scheduler.predicted_memory(job) == 1e9
+
+
+def test_resume_after_partial_checkpoint(make_mpb, tmp_path, monkeypatch):
+    benchmarks = _benchmarks(make_mpb)
+    executor = AsyncExecutor(2, STUB_BINARY, PYTHON_DIR)
+    checkpoint = CheckpointManifest(str(tmp_path / ("sweep" + CHECKPOINT_EXTENSION)), resume=False)
+    # the sweep was interrupted after the first benchmark and half of the jobs of the second one
+    first = run_coroutine(run_benchmarks(benchmarks[:1], Scheduler(executor), str(tmp_path), silence=True,
+                                         show_progress_bar=False, checkpoint=checkpoint))
+    assert first == [0]
+    completed = decompose(benchmarks[1], str(tmp_path / (benchmarks[1].id + "_jobs")), executor=executor)[::2]
+    for job in completed:
+        assert run_benchmark(job.config_filename) == 0
+        checkpoint.record_job(job)
+
+    started = []
+    run_job = executor.run_job
+
+    async def record_run_job(job):
+        started.append(job.key)
+        return await run_job(job)
+
+    monkeypatch.setattr(executor, 'run_job', record_run_job)
+    resumed = CheckpointManifest(checkpoint.filename)
+    codes = run_coroutine(run_benchmarks(benchmarks, Scheduler(executor), str(tmp_path), silence=True,
+                                         show_progress_bar=False, checkpoint=resumed, resume=True))
+    assert codes == [0, 0]
+    # only the missing jobs of the second benchmark run again
+    completed_keys = set(job.key for job in completed)
+    assert sorted(started) == sorted(job.key for job in decompose(benchmarks[1], str(tmp_path / "all_jobs"))
+                                     if job.key not in completed_keys)
+    assert resumed.completed_benchmark(benchmarks[1].id) == os.path.abspath(benchmarks[1].results_filename)
+    assert _layout(load_results(benchmarks[1].results_filename)) == _binary_layout(benchmarks[1], tmp_path)
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+import os
+
+from results_io import ResultsWriter, failed_plan
+from stats_table import stats_table
+
+
+def test_table_of_compressed_results_is_named_after_the_results(tmp_path):
+    results_filename = str(tmp_path / "x_results.json.gz")
+    with ResultsWriter(results_filename) as writer:
+        for _ in range(3):
+            writer.write_run({"plans": {"RRTstar": failed_plan("RRTstar", planning_time=1.5)}})
+    table = stats_table(results_filename)
+    assert os.path.exists(str(tmp_path / "x_results.stats" / "columns.json"))
+    assert len(table) == 3
+    assert table.aggregate("planning_time") == {"RRTstar": 1.5}
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import gc
+import os
+import weakref
+from copy import deepcopy
+
+import numpy as np
+
+from mpb import MPB, MultipleMPB
+from results_io import load_results
+from sweep import Sweep
+
+
+def test_overlay_copies_only_modified_dictionaries(make_mpb):
+    base = make_mpb(['rrt_star'])
+    original = deepcopy(base.config)
+    overlay = base.overlay({"env.start.x": 42., "max_planning_time": 3}, id="overlay")
+    assert overlay["env.start.x"] == 42. and overlay["max_planning_time"] == 3
+    assert overlay.id == "overlay"
+    overlay["benchmark.planning.prm"] = True
+    assert sorted(overlay._planners) == ['prm', 'rrt_star']
+    # the base benchmark is unchanged and shares all other dictionaries with the overlay
+    assert base.config == original
+    assert overlay.config["ompl"] is base.config["ompl"]
+    assert overlay.config["env"]["grid"] is base.config["env"]["grid"]
+    assert overlay.config["env"]["start"] is not base.config["env"]["start"]
+
+
+def test_sweep_expands_the_product_of_its_axes_lazily(make_mpb):
+    base = make_mpb(['rrt_star'], id="base")
+    original = deepcopy(base.config)
+    sweep = Sweep(base)
+    sweep.zip({"env.start": [{"x": 1, "y": 2}, {"x": 3, "y": 4}], "env.goal.x": [5, 6]}, labels=["p", "q"])
+    sweep.grid({"max_planning_time": [1, 2.5], "ompl.seed": [7]})
+    assert len(sweep) == 4
+    benchmarks = iter(sweep)
+    first = next(benchmarks)
+    assert first.id == "base_p_1-7"
+    assert (first["env.start.x"], first["env.start.y"], first["env.goal.x"]) == (1, 2, 5)
+    ids = [first.id] + [m.id for m in benchmarks]
+    assert ids == ["base_p_1-7", "base_p_2.5-7", "base_q_1-7", "base_q_2.5-7"]
+    assert base.config == original
+
+
+def test_latin_hypercube_covers_every_stratum(make_mpb):
+    sweep = Sweep(make_mpb(['rrt_star']), id_prefix="lhs")
+    sweep.latin_hypercube(8, {"mod.sampling_bias": (0.0, 0.4), "ompl.seed": (1, 8)}, seed=1)
+    points = [overrides for _, _, overrides in sweep.overrides()]
+    biases = np.array([point["mod.sampling_bias"] for point in points])
+    assert sorted(np.floor(biases / 0.05).astype(int)) == list(range(8))
+    assert sorted(point["ompl.seed"] for point in points) == list(range(1, 9))
+
+
+
+def test_variants_set_their_own_keys(make_mpb):
+    base = make_mpb(['rrt_star'])
+    sweep = Sweep(base, id_format=lambda index, labels, overrides: "-".join(labels))
+    sweep.variants({"cliff": {"ompl.optimization_objective": "cliff"},
+                    "gmmt": {"ompl.optimization_objective": "gmmt"}})
+    sweep.variants({"dijkstra": {"ompl.sampler": "dijkstra", "mod.dijkstra_cell_size": 1.0},
+                    "uniform": {"ompl.sampler": ""}})
+    benchmarks = list(sweep)
+    assert [m.id for m in benchmarks] == ["cliff-dijkstra", "cliff-uniform", "gmmt-dijkstra", "gmmt-uniform"]
+    assert benchmarks[0]["mod.dijkstra_cell_size"] == 1.0
+    # keys a variant does not set keep the value of the base benchmark
+    assert benchmarks[1]["mod.dijkstra_cell_size"] == base["mod.dijkstra_cell_size"]
+    assert benchmarks[3]["ompl.optimization_objective"] == "gmmt"
+
+def test_sweeps_of_a_pool_are_expanded_while_running(make_mpb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sweep = Sweep(make_mpb(['rrt']), id_prefix="seeds")
+    sweep.grid({"ompl.seed": [1, 2, 3]})
+    pool = MultipleMPB()
+    assert pool.add_sweep(sweep) == 3
+    assert pool.benchmarks == []
+
+    overlays = weakref.WeakSet()
+    overlay = MPB.overlay
+
+    def tracked_overlay(self, *args, **kwargs):
+        copied = overlay(self, *args, **kwargs)
+        overlays.add(copied)
+        return copied
+
+    alive = []
+    run_benchmark = MultipleMPB.run_benchmark
+
+    async def tracked_run_benchmark(index, mpb, *args, **kwargs):
+        gc.collect()
+        alive.append(len(overlays))
+        return await run_benchmark(index, mpb, *args, **kwargs)
+
+    monkeypatch.setattr(MPB, 'overlay', tracked_overlay)
+    monkeypatch.setattr(MultipleMPB, 'run_benchmark', staticmethod(tracked_run_benchmark))
+    assert pool.run_parallel(id="pool", processes=1, silence=True, limit_memory=False, pin_cpus=False,
+                             show_plot=False, show_progress=False)
+    # every benchmark is created when the previous one has finished
+    assert alive == [1, 1, 1]
+    assert [os.path.basename(f) for f in pool.sweep_results_filenames] == \
+        ["seeds_%i_results.json" % seed for seed in (1, 2, 3)]
+    seeds = [run["settings"]["ompl"]["seed"]
+             for filename in pool.sweep_results_filenames for run in load_results(filename)["runs"]]
+    assert sorted(set(seeds)) == [1, 2, 3]
@@ -11,6 +11,7 @@ from plot_trajectory import plot_trajectory, plot_nodes, plot_trajectory_options
 from color import get_color, get_colors, color_options
 
 from utils import add_options, group, parse_run_ids, parse_planners, parse_smoothers, show_legend, convert_planner_name
+from results_io import load_results
 
 
 @group.command()
@@ -90,9 +91,7 @@ def visualize(json_file: str,
     if len(ignore_smoothers) > 0 and not silence:
         click.echo('Ignoring the following smoother(s): %s' % ', '.join(ignore_smoothers))
 
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     axes_h, axes_v = 1, 1
@@ -311,9 +310,7 @@ def visualize_grid(json_file: str,
     if len(ignore_smoothers) > 0 and not silence:
         click.echo('Ignoring the following smoother(s): %s' % ', '.join(ignore_smoothers))
 
-    file = open(json_file, "r")
-    data = json.load(file)
-    file.close()
+    data = load_results(json_file)
     run_ids = parse_run_ids(run_id, len(data["runs"]))
 
     planners = []
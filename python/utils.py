@@ -7,6 +7,7 @@ import numpy as np
 
 from definitions import steer_functions, steer_function_names, smoother_names, smoothers, planner_names, robot_models, \
     robot_models_names
+from results_io import iter_runs
 
 # Fix random seed (used by kernel density estimation in violin plots)
 np.random.seed(123)
@@ -265,14 +266,12 @@ def latexify(text: str) -> str:
 
 def get_planners(results_filename: str) -> [str]:
     planners = []
-    with open(results_filename, 'r') as rf:
-        runs = json.load(rf)["runs"]
-        for run in runs:
-            if "plans" not in run:
-                continue
-            for planner in run["plans"].keys():
-                if planner not in planners:
-                    planners.append(planner)
+    for _, run in iter_runs(results_filename, skip_trajectories=True, skip_intermediary=True):
+        if "plans" not in run:
+            continue
+        for planner in run["plans"].keys():
+            if planner not in planners:
+                planners.append(planner)
     planners = sorted(planners, key=convert_planner_name)
     return planners
 
@@ -286,22 +285,20 @@ def get_aggregate_stats(results_filenames: [str]) -> dict:
         if not os.path.exists(filename):
             continue
         try:
-            with open(filename, 'r') as rf:
-                runs = json.load(rf)["runs"]
-                for run in runs:
-                    for j, (planner, plan) in enumerate(run["plans"].items()):
-                        planner = convert_planner_name(planner)
-                        totals[planner] = totals.get(planner, 0) + 1
-                        if plan["stats"]["path_found"]:
-                            found[planner] = found.get(planner, 0) + 1
-                            if not plan["stats"]["path_collides"]:
-                                collision_free[planner] = collision_free.get(
-                                    planner, 0) + 1
-                            if plan["stats"]["exact_goal_path"]:
-                                exact[planner] = exact.get(planner, 0) + 1
-                        else:
-                            if planner not in found:
-                                found[planner] = 0
+            for _, run in iter_runs(filename, skip_trajectories=True, skip_intermediary=True):
+                for j, (planner, plan) in enumerate(run["plans"].items()):
+                    planner = convert_planner_name(planner)
+                    totals[planner] = totals.get(planner, 0) + 1
+                    if plan["stats"]["path_found"]:
+                        found[planner] = found.get(planner, 0) + 1
+                        if not plan["stats"]["path_collides"]:
+                            collision_free[planner] = collision_free.get(
+                                planner, 0) + 1
+                        if plan["stats"]["exact_goal_path"]:
+                            exact[planner] = exact.get(planner, 0) + 1
+                    else:
+                        if planner not in found:
+                            found[planner] = 0
         except:
             pass
     return {
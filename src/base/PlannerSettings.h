@@ -295,6 +295,13 @@ struct GlobalSettings : public Group {
      */
     Property<std::vector<double>> anytime_intervals{{1., 3., 5., 10., 15., 20., 25., 30.}, "anytime_intervals", this};
 
+    /**
+     * Start-goal queries evaluated on the environment of every run, as a list
+     * of {"name": ..., "start": [x, y, theta], "goal": [x, y, theta]}. If
+     * empty, the start and goal of the environment settings are used.
+     */
+    Property<nlohmann::json> queries{nlohmann::json::array(), "queries", this};
+
     struct MovingAiSettings : public Group {
       using Group::Group;
 
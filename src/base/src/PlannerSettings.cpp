@@ -1,5 +1,7 @@
 #include "base/PlannerSettings.h"
 
+#include <map>
+
 #include <ompl/base/objectives/MaximizeMinClearanceObjective.h>
 #include <ompl/base/objectives/PathLengthOptimizationObjective.h>
 #include <ompl/base/samplers/DeterministicStateSampler.h>
@@ -168,6 +170,19 @@ void PlannerSettings::GlobalSettings::OmplSettings::initializeSampler() const {
   }
 }
 
+/**
+ * Returns the CLiFF-map of the XML file, which is parsed only the first time
+ * and reused by the further steer functions, runs and (persistent worker) jobs.
+ */
+const ::MoD::CLiFFMap &loadCLiFFMap(const std::string &filename) {
+  static std::map<std::string, ::MoD::CLiFFMap> cliff_maps;
+  auto it = cliff_maps.find(filename);
+  if (it == cliff_maps.end()) {
+    it = cliff_maps.emplace(filename, ::MoD::CLiFFMap(filename)).first;
+  }
+  return it->second;
+}
+
 void PlannerSettings::GlobalSettings::SteerSettings::initializeSteering() const {
   // Construct the robot state space in which we're planning.
   if (steering_type == Steering::STEER_TYPE_REEDS_SHEPP)
@@ -235,7 +250,7 @@ void PlannerSettings::GlobalSettings::SteerSettings::initializeSteering() const
         std::make_shared<CurvatureOptimizationObjective>(global::settings.ompl.space_info);
   } else if (opt_obj_str == std::string("cliff")) {
     global::settings.ompl.objective = std::make_shared<ompl::MoD::UpstreamCriterionOptimizationObjective>(
-        global::settings.ompl.space_info, ::MoD::CLiFFMap(global::settings.mod.mod_file_name.value()),
+        global::settings.ompl.space_info, loadCLiFFMap(global::settings.mod.mod_file_name.value()),
         global::settings.ompl.intensity_map_file_name.value(), 1.0, 1.0, global::settings.mod.weight_cliff.value(),
         global::settings.ompl.sampler.value(), global::settings.mod.sampling_bias.value(),
         global::settings.mod.uniform_valid.value(), true);